@@ -17,7 +17,6 @@
 
 from gi.repository import Gtk
 from gi.repository import GObject
-import logging
 
 from gettext import gettext as _
 
@@ -34,7 +33,8 @@ from resources import CollectResourcesWin
 from questions import PrepareQuestionsWin
 from editmap import EditMapWin
 from mapnav import MapNavView
-from game_map import GameMap
+from world import MAIN_MAP
+import tracing
 from dialogs import ResourceDialog, QuestionDialog
 
 PLAY_MODE = 0
@@ -100,6 +100,16 @@ class IngeniumMachinaActivity(activity.Activity):
         self._remove_button.connect('clicked', self.__remove_cb)
         self.toolbar_box.toolbar.insert(self._remove_button, -1)
 
+        self._undo_button = ToolButton('edit-undo')
+        self._undo_button.set_tooltip(_('Undo'))
+        self._undo_button.connect('clicked', self.__undo_cb)
+        self.toolbar_box.toolbar.insert(self._undo_button, -1)
+
+        self._redo_button = ToolButton('edit-redo')
+        self._redo_button.set_tooltip(_('Redo'))
+        self._redo_button.connect('clicked', self.__redo_cb)
+        self.toolbar_box.toolbar.insert(self._redo_button, -1)
+
         separator = Gtk.SeparatorToolItem()
         separator.props.draw = False
         separator.set_expand(True)
@@ -133,12 +143,9 @@ class IngeniumMachinaActivity(activity.Activity):
             self.main_notebook.append_page(self.create_play_view(), None)
 
     def create_play_view(self):
-        if not 'map_data' in self.model.data or \
-            self.model.data['map_data'] is None:
-            self.game_map = GameMap()
-        else:
-            self.game_map = GameMap(self.model.data['map_data'])
-        self.mapnav_game = MapNavView(self.game_map, self.model)
+        world = self.model.get_world()
+        self.game_map = world.get_map(MAIN_MAP)
+        self.mapnav_game = MapNavView(self.game_map, self.model, world=world)
         self.mapnav_game.show()
         self.mapnav_game.connect('resource-clicked',
                 self.__resource_clicked_cb)
@@ -161,7 +168,6 @@ class IngeniumMachinaActivity(activity.Activity):
         else:
             self.activity_mode = PLAY_MODE
             self.main_notebook.set_current_page(0)
-            self.mapnav_game.clear_cache()
         self.update_buttons_state()
 
     def __add_cb(self, button):
@@ -184,8 +190,23 @@ class IngeniumMachinaActivity(activity.Activity):
         elif self.action == EDIT_MAP_ACTION:
             self.edit_map_win.remove_selected_object()
 
+    def __undo_cb(self, button):
+        if self.action == EDIT_MAP_ACTION:
+            self.edit_map_win.undo()
+
+    def __redo_cb(self, button):
+        if self.action == EDIT_MAP_ACTION:
+            self.edit_map_win.redo()
+
+    def __history_changed_cb(self, history, event, keys, details):
+        self.update_buttons_state()
+
     def update_buttons_state(self):
         edit_mode = self.activity_mode == EDIT_MODE
+        map_edit_mode = edit_mode and self.action == EDIT_MAP_ACTION
+        history = self.edit_map_win.history if map_edit_mode else None
+        self._undo_button.set_sensitive(map_edit_mode and history.can_undo())
+        self._redo_button.set_sensitive(map_edit_mode and history.can_redo())
         self._resources_button.set_sensitive(edit_mode)
         self._questions_button.set_sensitive(edit_mode)
         self._map_button.set_sensitive(edit_mode)
@@ -210,6 +231,7 @@ class IngeniumMachinaActivity(activity.Activity):
                     self.__question_updated_cb)
         self.main_notebook.set_current_page(button.page)
         self.action = EDIT_QUESTIONS_ACTION
+        self.update_buttons_state()
 
     def __resources_button_cb(self, button):
         if self.collect_resources_win is None:
@@ -221,30 +243,29 @@ class IngeniumMachinaActivity(activity.Activity):
                     self.__resources_updated_cb)
         self.main_notebook.set_current_page(button.page)
         self.action = EDIT_RESOURCES_ACTION
+        self.update_buttons_state()
 
     def __resources_updated_cb(self, origin):
-        logging.error('** Resources updated signal')
+        tracing.trace(tracing.INPUT, 'resources updated')
         if self.edit_map_win is not None:
             self.edit_map_win.load_resources_and_questions()
 
     def __question_updated_cb(self, origin):
-        logging.error('** Questions updated signal')
+        tracing.trace(tracing.INPUT, 'questions updated')
         if self.edit_map_win is not None:
             self.edit_map_win.load_resources_and_questions()
 
     def __map_button_cb(self, button):
         if self.edit_map_win is None:
             self.edit_map_win = EditMapWin(self.model)
+            self.edit_map_win.history.connect_changed(
+                    self.__history_changed_cb)
             button.page = self.main_notebook.get_n_pages()
             self.main_notebook.append_page(self.edit_map_win, None)
 
-            # Try connect with the playing map
-            logging.error('Connecting signal map-updated')
-            self.edit_map_win.nav_view.connect('map-updated',
-                self.mapnav_game.receive_update_wall_info)
-
         self.main_notebook.set_current_page(button.page)
         self.action = EDIT_MAP_ACTION
+        self.update_buttons_state()
 
     def __descriptions_button_cb(self, button):
         if self.edit_descriptions_win is None:
@@ -256,15 +277,16 @@ class IngeniumMachinaActivity(activity.Activity):
 
         self.main_notebook.set_current_page(button.page)
         self.action = EDIT_DESCRIPTIONS_ACTION
+        self.update_buttons_state()
 
     def __resource_clicked_cb(self, mapnav, id_resource):
-        logging.error('** Resource %s clicked', id_resource)
+        tracing.trace(tracing.INPUT, 'resource %s clicked', id_resource)
         resource_dialog = ResourceDialog(self.model, id_resource)
         resource_dialog.set_transient_for(self.get_toplevel())
         resource_dialog.show_all()
 
     def __question_clicked_cb(self, mapnav, id_question):
-        logging.error('** Question %s clicked', id_question)
+        tracing.trace(tracing.INPUT, 'question %s clicked', id_question)
         question_dialog = QuestionDialog(self.model, id_question)
         question_dialog.set_transient_for(self.get_toplevel())
         question_dialog.connect('reply-selected', self.__question_replied_cb)
@@ -272,19 +294,20 @@ class IngeniumMachinaActivity(activity.Activity):
         self.model.register_displayed_question(id_question)
 
     def __question_replied_cb(self, dialog, id_question, valid):
-        logging.error('** Question %s replied %s', id_question, valid)
+        tracing.trace(tracing.INPUT, 'question %s replied %s', id_question,
+                valid)
         if valid:
             self.model.register_replied_question(id_question)
 
     def read_file(self, file_path):
         '''Read file from Sugar Journal.'''
-        logging.error('READING FILE %s', file_path)
+        tracing.trace(tracing.SAVE, 'read file %s', file_path)
         self.model.read(file_path)
         self.main_notebook.append_page(self.create_play_view(), None)
 
     def write_file(self, file_path):
         '''Save file on Sugar Journal. '''
-        logging.error('WRITING FILE %s', file_path)
+        tracing.trace(tracing.SAVE, 'write file %s', file_path)
         self.metadata['mime_type'] = 'application/x-ingenium-machine'
         self.model.write(file_path)
 
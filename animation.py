@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+#
+# The class AnimationScheduler run all the animations of a widget
+# from the frame clock of the widget, with a single tick callback.
+#
+# Every animation is a function receiving the seconds elapsed since the
+# previous frame, and returning True to continue running or False
+# when is finished. GTK does not call the tick callbacks while the widget
+# is not visible, then the animations are paused.
+
+# if a frame is too late (after the widget was hidden, or the system
+# was busy) the animations advance this time as maximum
+MAX_FRAME_ELAPSED = 0.25
+
+
+class AnimationScheduler():
+
+    def __init__(self, widget):
+        self._widget = widget
+        self._animations = []
+        self._tick_id = None
+        self._last_frame_time = None
+
+    def add(self, animation):
+        """ animation(elapsed) is called in every frame until return False
+        """
+        self._animations.append(animation)
+        if self._tick_id is None:
+            self._last_frame_time = None
+            self._tick_id = self._widget.add_tick_callback(self.__tick_cb,
+                    None)
+
+    def remove(self, animation):
+        if animation in self._animations:
+            self._animations.remove(animation)
+
+    def is_running(self, animation):
+        return animation in self._animations
+
+    def __tick_cb(self, widget, frame_clock, data):
+        frame_time = frame_clock.get_frame_time() / 1000000.0
+        if self._last_frame_time is None:
+            elapsed = 0.0
+        else:
+            elapsed = min(frame_time - self._last_frame_time,
+                    MAX_FRAME_ELAPSED)
+        self._last_frame_time = frame_time
+        for animation in list(self._animations):
+            if animation in self._animations and not animation(elapsed):
+                self.remove(animation)
+        if not self._animations:
+            self._tick_id = None
+            return False
+        return True
@@ -0,0 +1,306 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+#
+# The class AssetCache load the images used in the walls only one time
+# for all the application. The svg files are loaded as Rsvg handles,
+# and the other images as pixbufs.
+#
+# The images are identified by the path and the modification time,
+# then a file modified is loaded again. The views call acquire() to get
+# a image and release() when do not need it anymore. The images not used
+# are kept until the memory used is more than max_bytes, then the older
+# are removed.
+#
+# The class RasterCache store the images already rendered at the size
+# displayed in the walls, then the svg are not rendered in every draw.
+# The sizes are rounded up to multiples of RASTER_STEP pixels, then
+# while a object is resized the same surfaces are used many times.
+#
+# The class DiskRasterCache store in png files the images rendered
+# at startup (icons, smilies) in the data directory of the activity,
+# then the next time the activity is started are loaded from the png
+# without render the svg. The files are identified by the hash of the
+# content of the image, the height and if are flipped.
+
+import os
+import math
+import hashlib
+import tempfile
+from collections import OrderedDict
+
+import cairo
+from gi.repository import Gdk
+from gi.repository import Rsvg
+from gi.repository import GdkPixbuf
+
+import tracing
+from surfacecache import SurfaceCache
+
+ASSET_CACHE_BYTES = 32 * 1024 * 1024
+RASTER_CACHE_BYTES = 16 * 1024 * 1024
+RASTER_STEP = 8
+DISK_CACHE_DIRECTORY = 'raster_cache'
+
+
+class AssetCache():
+
+    def __init__(self, max_bytes=ASSET_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.loads = 0
+        self.hits = 0
+        # (path, mtime) -> [asset, size, references]
+        self._assets = OrderedDict()
+        # id(asset) -> (path, mtime), to release the assets
+        self._keys = {}
+
+    def __len__(self):
+        return len(self._assets)
+
+    def acquire(self, path):
+        """ Return the Rsvg handle or pixbuf with the image in the path,
+            the caller need call release(asset) when is not used"""
+        key = (path, os.path.getmtime(path))
+        if key in self._assets:
+            self.hits += 1
+            entry = self._assets.pop(key)
+        else:
+            self._remove_old_versions(path)
+            entry = [self._load(path), 0, 0]
+            entry[1] = self._get_asset_bytes(path, entry[0])
+            self._keys[id(entry[0])] = key
+            self.used_bytes += entry[1]
+        entry[2] += 1
+        self._assets[key] = entry
+        self._evict()
+        return entry[0]
+
+    def release(self, asset):
+        key = self._keys.get(id(asset))
+        if key is None or key not in self._assets:
+            return
+        entry = self._assets[key]
+        entry[2] = max(entry[2] - 1, 0)
+        self._evict()
+
+    def get_key(self, asset):
+        """ Return the (path, mtime) used to load the asset,
+            or None if the asset was not loaded by the cache"""
+        return self._keys.get(id(asset))
+
+    def get_references(self, asset):
+        key = self._keys.get(id(asset))
+        if key is None or key not in self._assets:
+            return 0
+        return self._assets[key][2]
+
+    def clear(self):
+        """ Remove the assets not used"""
+        for key in [key for key, entry in self._assets.items()
+                if entry[2] == 0]:
+            self._remove(key)
+
+    def _load(self, path):
+        self.loads += 1
+        tracing.trace(tracing.ASSETS, 'load %s', path)
+        with tracing.span(tracing.ASSETS, 'load'):
+            if path.endswith('.svg'):
+                return Rsvg.Handle.new_from_file(path)
+            return GdkPixbuf.Pixbuf.new_from_file(path)
+
+    def _get_asset_bytes(self, path, asset):
+        if isinstance(asset, GdkPixbuf.Pixbuf):
+            return asset.get_rowstride() * asset.get_height()
+        # we can't know the memory used by librsvg,
+        # the size of the file is a approximation
+        return os.path.getsize(path)
+
+    def _remove(self, key):
+        asset, size, references = self._assets.pop(key)
+        del self._keys[id(asset)]
+        self.used_bytes -= size
+
+    def _remove_old_versions(self, path):
+        for key in [key for key, entry in self._assets.items()
+                if key[0] == path and entry[2] == 0]:
+            self._remove(key)
+
+    def _evict(self):
+        if self.used_bytes <= self.max_bytes:
+            return
+        # the assets in use are never removed
+        for key in [key for key, entry in self._assets.items()
+                if entry[2] == 0]:
+            self._remove(key)
+            tracing.count(tracing.ASSETS, 'evicted')
+            if self.used_bytes <= self.max_bytes:
+                break
+
+
+def get_asset_size(asset):
+    if isinstance(asset, GdkPixbuf.Pixbuf):
+        return asset.get_width(), asset.get_height()
+    return asset.props.width, asset.props.height
+
+
+def quantize_height(height):
+    """ Return the height rounded up to a multiple of RASTER_STEP"""
+    return max(int(math.ceil(height / float(RASTER_STEP))) * RASTER_STEP,
+            RASTER_STEP)
+
+
+class RasterCache():
+
+    def __init__(self, asset_cache, max_bytes=RASTER_CACHE_BYTES):
+        self._asset_cache = asset_cache
+        self._surfaces = SurfaceCache(max_bytes)
+
+    def clear(self):
+        self._surfaces.clear()
+
+    def get_surface(self, asset, height):
+        """ Return (surface, raster_height), with the asset rendered
+            with a height of raster_height pixels, near to height.
+            The caller need scale by height / raster_height to draw it"""
+        raster_height = quantize_height(height)
+        asset_key = self._asset_cache.get_key(asset)
+        if asset_key is None:
+            asset_key = id(asset)
+        key = (asset_key, raster_height)
+        surface = self._surfaces.get(key)
+        if surface is None:
+            tracing.count(tracing.ASSETS, 'raster_miss')
+            surface = self._render(asset, raster_height)
+            self._surfaces.put(key, surface, surface.get_width(),
+                    raster_height)
+        return surface, raster_height
+
+    def _render(self, asset, raster_height):
+        return render_asset(asset, raster_height)
+
+
+def render_asset(asset, height):
+    """ Return a surface with the asset rendered with height pixels"""
+    asset_width, asset_height = get_asset_size(asset)
+    scale = float(height) / float(asset_height)
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32,
+            max(int(math.ceil(asset_width * scale)), 1), height)
+    ctx = cairo.Context(surface)
+    ctx.scale(scale, scale)
+    with tracing.span(tracing.ASSETS, 'rasterize'):
+        if isinstance(asset, GdkPixbuf.Pixbuf):
+            Gdk.cairo_set_source_pixbuf(ctx, asset, 0, 0)
+            ctx.paint()
+        else:
+            asset.render_cairo(ctx)
+    return surface
+
+
+def flip_surface(surface):
+    """ Return a copy of the surface flipped horizontally"""
+    width, height = surface.get_width(), surface.get_height()
+    flipped = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+    ctx = cairo.Context(flipped)
+    ctx.scale(-1, 1)
+    ctx.translate(-width, 0)
+    ctx.set_source_surface(surface, 0, 0)
+    ctx.paint()
+    return flipped
+
+
+class DiskRasterCache():
+
+    def __init__(self, path):
+        self._path = path
+        # (file_name, mtime) -> hash of the content
+        self._hashes = {}
+
+    def _get_hash(self, file_name):
+        key = (file_name, os.path.getmtime(file_name))
+        if not key in self._hashes:
+            with open(file_name, 'rb') as image_file:
+                self._hashes[key] = hashlib.sha1(image_file.read()).hexdigest()
+        return self._hashes[key]
+
+    def _get_cache_file_name(self, file_name, height, flip):
+        return os.path.join(self._path, '%s_%d%s.png' %
+                (self._get_hash(file_name), height, '_flip' if flip else ''))
+
+    def get_surface(self, file_name, height, flip=False):
+        """ Return a surface with the image rendered with height pixels,
+            and flipped horizontally if flip is True"""
+        height = int(height)
+        cache_file_name = self._get_cache_file_name(file_name, height, flip)
+        if os.path.exists(cache_file_name):
+            try:
+                surface = cairo.ImageSurface.create_from_png(cache_file_name)
+                tracing.count(tracing.ASSETS, 'disk_hit')
+                return surface
+            except (IOError, MemoryError, cairo.Error):
+                tracing.trace(tracing.ASSETS, 'can not read %s',
+                        cache_file_name)
+        tracing.count(tracing.ASSETS, 'disk_miss')
+        if flip:
+            # the image not flipped is loaded from the cache if is there
+            surface = flip_surface(self.get_surface(file_name, height))
+        elif file_name.endswith('.svg'):
+            surface = render_asset(Rsvg.Handle.new_from_file(file_name),
+                    height)
+        else:
+            surface = render_asset(GdkPixbuf.Pixbuf.new_from_file(file_name),
+                    height)
+        self._write(surface, cache_file_name)
+        return surface
+
+    def _write(self, surface, cache_file_name):
+        # write in other file and rename, to not leave a incomplete file
+        temp_file_name = '%s.%d.tmp' % (cache_file_name, os.getpid())
+        try:
+            if not os.path.exists(self._path):
+                os.makedirs(self._path)
+            surface.write_to_png(temp_file_name)
+            os.rename(temp_file_name, cache_file_name)
+        except (IOError, OSError):
+            # the cache is not needed to work
+            tracing.trace(tracing.ASSETS, 'can not write %s',
+                    cache_file_name)
+
+
+_asset_cache = None
+_raster_cache = None
+_disk_raster_cache = None
+
+
+def get_asset_cache():
+    """ Return the AssetCache shared by all the views"""
+    global _asset_cache
+    if _asset_cache is None:
+        _asset_cache = AssetCache()
+    return _asset_cache
+
+
+def get_raster_cache():
+    """ Return the RasterCache shared by all the views"""
+    global _raster_cache
+    if _raster_cache is None:
+        _raster_cache = RasterCache(get_asset_cache())
+    return _raster_cache
+
+
+def get_disk_raster_cache():
+    """ Return the DiskRasterCache, stored in the data directory
+        of the activity"""
+    global _disk_raster_cache
+    if _disk_raster_cache is None:
+        try:
+            from sugar3.activity import activity
+            path = os.path.join(activity.get_activity_root(), 'data',
+                    DISK_CACHE_DIRECTORY)
+        except (ImportError, RuntimeError):
+            # running outside of sugar
+            path = os.path.join(tempfile.gettempdir(),
+                    'ingenium-%s' % DISK_CACHE_DIRECTORY)
+        _disk_raster_cache = DiskRasterCache(path)
+    return _disk_raster_cache
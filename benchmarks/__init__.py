@@ -0,0 +1,8 @@
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+#
+# Benchmarks to measure the activity with big games.
+#
+#   python -m benchmarks.run -o results.json
+#   python -m benchmarks.run --compare results.json
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+#
+# Create synthetic games, with the same structure of the games created
+# with the activity, to measure the activity with big games.
+#
+# The map is divided in square rooms of room_size cells, with doors
+# between the neighbour rooms, and the objects are distributed in all
+# the walls. The images used by the objects, resources and questions
+# are simple svg files written in the directory of the game.
+#
+# The generator use a fixed seed, then the same parameters create
+# always the same game.
+
+import os
+import random
+
+from game_map import GameMap, DIRECTIONS
+
+# the room keys are single characters, there are more rooms than letters
+FIRST_ROOM_CHAR = 0x4e00
+
+SVG_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<svg xmlns="http://www.w3.org/2000/svg" width="%(width)d" \
+height="%(height)d">
+  <rect x="2" y="2" width="%(inner_width)d" height="%(inner_height)d"
+      fill="%(fill)s" stroke="#000000" stroke-width="4"/>
+  <circle cx="%(cx)d" cy="%(cy)d" r="%(radio)d" fill="#ffffff"/>
+</svg>
+"""
+
+
+def _write_svg(file_name, width, height, fill):
+    with open(file_name, 'w') as svg_file:
+        svg_file.write(SVG_TEMPLATE % {'width': width, 'height': height,
+                'inner_width': width - 4, 'inner_height': height - 4,
+                'fill': fill, 'cx': width / 2, 'cy': height / 2,
+                'radio': min(width, height) / 4})
+
+
+def create_images(path, count, random_generator):
+    """ Write count svg images in path and return the file names"""
+    file_names = []
+    for n in range(count):
+        file_name = os.path.join(path, 'image_%d.svg' % n)
+        fill = '#%02x%02x%02x' % (random_generator.randint(0, 255),
+                random_generator.randint(0, 255),
+                random_generator.randint(0, 255))
+        _write_svg(file_name, random_generator.randint(50, 300),
+                random_generator.randint(50, 300), fill)
+        file_names.append(file_name)
+    return file_names
+
+
+def create_map_data(max_x, max_y, room_size, random_generator):
+    """ Return the data of a GameMap with max_x x max_y cells,
+        divided in square rooms with doors between them"""
+    rooms_x = (max_x + room_size - 1) / room_size
+    rooms_y = (max_y + room_size - 1) / room_size
+
+    def room_key(room_x, room_y):
+        return unichr(FIRST_ROOM_CHAR + room_y * rooms_x + room_x)
+
+    cells = []
+    for y in range(max_y):
+        cells.append(u''.join(room_key(x / room_size, y / room_size)
+                for x in range(max_x)))
+
+    rooms = {}
+    for room_y in range(rooms_y):
+        for room_x in range(rooms_x):
+            rooms[room_key(room_x, room_y)] = {
+                    'wall_color': (random_generator.uniform(0.3, 1),
+                            random_generator.uniform(0.3, 1),
+                            random_generator.uniform(0.3, 1)),
+                    'room_name': 'Room %d %d' % (room_x, room_y)}
+
+    # a door in the middle of the east and south walls of every room
+    walls = []
+    for room_y in range(rooms_y):
+        for room_x in range(rooms_x):
+            last_x = min((room_x + 1) * room_size, max_x) - 1
+            last_y = min((room_y + 1) * room_size, max_y) - 1
+            middle_x = (room_x * room_size + last_x) / 2
+            middle_y = (room_y * room_size + last_y) / 2
+            if last_x < max_x - 1:
+                walls.append({'position': [last_x, middle_y, 'E'],
+                        'doors': ['door_%d' % len(walls)]})
+            if last_y < max_y - 1:
+                walls.append({'position': [middle_x, last_y, 'S'],
+                        'doors': ['door_%d' % len(walls)]})
+
+    return {'max_x': max_x, 'max_y': max_y, 'rooms': rooms, 'cells': cells,
+            'walls': walls}
+
+
+def add_objects(game_map, count, image_file_names, linked_objects,
+        random_generator):
+    """ Add count objects to random walls of the GameMap,
+        linked_objects is a list of (type_object, id_object,
+        image_file_name) of the resources and questions,
+        every one is added to a wall"""
+    positions = []
+    for x in range(game_map.data['max_x']):
+        for y in range(game_map.data['max_y']):
+            for direction in DIRECTIONS:
+                if game_map.get_wall_info(x, y, direction) is not None:
+                    positions.append((x, y, direction))
+    for n in range(count):
+        x, y, direction = random_generator.choice(positions)
+        wall_object = {'wall_x': random_generator.uniform(10, 80),
+                'wall_y': random_generator.uniform(10, 60),
+                'wall_scale': random_generator.uniform(0.1, 0.4)}
+        if n < len(linked_objects):
+            type_object, id_object, image_file_name = linked_objects[n]
+            wall_object['type_object'] = type_object
+            wall_object['id_object'] = id_object
+            wall_object['image_file_name'] = image_file_name
+        else:
+            wall_object['image_file_name'] = random_generator.choice(
+                    image_file_names)
+        game_map.add_object_to_wall(x, y, direction, wall_object)
+
+
+def create_game_data(path, max_x=40, max_y=40, room_size=4, objects=2000,
+        resources=200, questions=200, images=50, seed=1):
+    """ Create a game in the directory path, and return the data
+        with the same structure than GameModel.data"""
+    random_generator = random.Random(seed)
+    if not os.path.exists(path):
+        os.makedirs(path)
+    image_file_names = create_images(path, images, random_generator)
+
+    data = {'questions': [], 'resources': [], 'maps': [], 'portals': {},
+            'state': {'displayed_questions': [], 'replied_questions': [],
+                    'actions_log': []}}
+    linked_objects = []
+    for n in range(resources):
+        id_resource = n + 1
+        file_image = random_generator.choice(image_file_names)
+        file_text = os.path.join(path, 'resource_%d.html' % id_resource)
+        with open(file_text, 'w') as html_file:
+            html_file.write('<p>Resource %d</p>' % id_resource)
+        data['resources'].append({'title': 'Resource %d' % id_resource,
+                'file_image': file_image, 'file_text': file_text,
+                'show_as': None, 'id_resource': id_resource})
+        linked_objects.append(('resource', id_resource, file_image))
+
+    for n in range(questions):
+        id_question = n + 1
+        if n % 2 == 0:
+            question = {'question': 'Question %d?' % id_question,
+                    'type': 'TEXT', 'id_question': id_question,
+                    'replies': [{'text': 'Reply %d' % reply,
+                            'valid': reply == 0} for reply in range(3)]}
+        else:
+            question = {'question': 'Question %d?' % id_question,
+                    'type': 'GRAPHIC', 'id_question': id_question,
+                    'file_image': random_generator.choice(image_file_names),
+                    'file_image_reply': random_generator.choice(
+                            image_file_names)}
+        data['questions'].append(question)
+        linked_objects.append(('question', id_question,
+                os.path.join(os.path.dirname(os.path.dirname(
+                        os.path.abspath(__file__))), 'icons',
+                        'question.svg')))
+
+    data['last_resource_id'] = resources
+    data['last_question_id'] = questions
+
+    game_map = GameMap(create_map_data(max_x, max_y, room_size,
+            random_generator))
+    add_objects(game_map, max(objects, len(linked_objects)),
+            image_file_names, linked_objects, random_generator)
+    data['map_data'] = game_map.data
+    return data
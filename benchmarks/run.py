@@ -0,0 +1,228 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+#
+# Run the benchmarks with a synthetic game and write the times in json,
+# to compare the results between versions of the activity.
+#
+#   python -m benchmarks.run -o results.json
+#   python -m benchmarks.run --size 100x100 --objects 10000
+#   python -m benchmarks.run --compare old_results.json
+#
+# The benchmarks using gi (rendering) or sugar (save and load the game)
+# are skipped if the modules are not available.
+
+import os
+import sys
+import json
+import time
+import shutil
+import platform
+import tempfile
+import argparse
+
+from game_map import GameMap, DIRECTIONS
+from benchmarks.generator import create_game_data
+
+WALL_WIDTH = 1200
+WALL_HEIGHT = 900
+MINIMAP_SIZE = 400
+
+
+def measure(function, repeat):
+    """ Call function() repeat times, and return a dictionary with
+        the times in seconds"""
+    times = []
+    for n in range(repeat):
+        start = time.time()
+        function()
+        times.append(time.time() - start)
+    return {'min': min(times), 'mean': sum(times) / len(times),
+            'max': max(times), 'repeat': repeat}
+
+
+def _get_positions(game_map):
+    positions = []
+    for x in range(game_map.data['max_x']):
+        for y in range(game_map.data['max_y']):
+            for direction in DIRECTIONS:
+                if game_map.get_wall_info(x, y, direction) is not None:
+                    positions.append((x, y, direction))
+    return positions
+
+
+def bench_navigation(data, repeat):
+    game_map = GameMap(data['map_data'])
+    positions = _get_positions(game_map)
+
+    def navigate():
+        for x, y, direction in positions:
+            game_map.go_left(x, y, direction)
+            game_map.go_right(x, y, direction)
+            game_map.cross_door(x, y, direction)
+            game_map.have_door(x, y, direction)
+            game_map.get_wall_info(x, y, direction)
+
+    results = {'navigation': measure(navigate, repeat),
+            'compile': measure(game_map.compile, repeat)}
+    results['navigation']['positions'] = len(positions)
+    return results
+
+
+def bench_rendering(data, repeat, sample):
+    import cairo
+    from wallview import WallRenderer
+    import mapview
+
+    game_map = GameMap(data['map_data'])
+    positions = _get_positions(game_map)[:sample]
+    renderer = WallRenderer(game_map, WALL_WIDTH, WALL_HEIGHT)
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, WALL_WIDTH,
+            WALL_HEIGHT)
+
+    def get_information_walls():
+        renderer.clear_wall_info()
+        for x, y, direction in positions:
+            renderer.get_information_walls(x, y, direction)
+
+    def render_walls():
+        renderer.clear_wall_info()
+        for x, y, direction in positions:
+            renderer.render_wall(cairo.Context(surface), x, y, direction)
+
+    def render_walls_cached_info():
+        for x, y, direction in positions:
+            renderer.render_wall(cairo.Context(surface), x, y, direction)
+
+    minimap_surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, MINIMAP_SIZE,
+            MINIMAP_SIZE)
+    view_data = {'width': MINIMAP_SIZE, 'height': MINIMAP_SIZE,
+            'show_position': {'x': 0, 'y': 0, 'direction': 'S'}}
+
+    def draw_minimap():
+        mapview.draw(cairo.Context(minimap_surface), game_map, view_data)
+
+    results = {'get_information_walls': measure(get_information_walls,
+                    repeat),
+            'render_wall': measure(render_walls, repeat),
+            'render_wall_cached_info': measure(render_walls_cached_info,
+                    repeat),
+            'mapview_draw': measure(draw_minimap, repeat)}
+    for name in ('get_information_walls', 'render_wall',
+            'render_wall_cached_info'):
+        results[name]['walls'] = len(positions)
+    return results
+
+
+def bench_save(data, repeat, activity_root):
+    # the model use the activity root of sugar to store the files
+    os.environ['SUGAR_ACTIVITY_ROOT'] = activity_root
+    for directory in ('instance', 'data', 'tmp'):
+        if not os.path.exists(os.path.join(activity_root, directory)):
+            os.makedirs(os.path.join(activity_root, directory))
+    from model import GameModel
+
+    model = GameModel()
+    model.data.update(data)
+    file_name = os.path.join(activity_root, 'data', 'game.zip')
+
+    def read():
+        GameModel().read(file_name)
+
+    results = {'model_write': measure(lambda: model.write(file_name),
+            repeat)}
+    results['model_write']['bytes'] = os.path.getsize(file_name)
+    results['model_read'] = measure(read, repeat)
+    return results
+
+
+def run(options):
+    work_path = tempfile.mkdtemp(prefix='ingenium-benchmarks-')
+    try:
+        start = time.time()
+        data = create_game_data(os.path.join(work_path, 'game'),
+                options.size[0], options.size[1], options.room_size,
+                options.objects, options.resources, options.questions)
+        elapsed = time.time() - start
+        results = {'generate_game': {'min': elapsed, 'mean': elapsed,
+                'max': elapsed, 'repeat': 1}}
+        skipped = {}
+        results.update(bench_navigation(data, options.repeat))
+        try:
+            results.update(bench_rendering(data, options.repeat,
+                    options.sample))
+        except ImportError, error:
+            skipped['rendering'] = str(error)
+        try:
+            results.update(bench_save(data, options.repeat,
+                    os.path.join(work_path, 'activity_root')))
+        except ImportError, error:
+            skipped['save'] = str(error)
+    finally:
+        shutil.rmtree(work_path)
+
+    return {'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'parameters': {'size': list(options.size),
+                    'room_size': options.room_size,
+                    'objects': options.objects,
+                    'resources': options.resources,
+                    'questions': options.questions,
+                    'repeat': options.repeat, 'sample': options.sample},
+            'results': results, 'skipped': skipped}
+
+
+def compare(old, new):
+    """ Print the times of the new results relative to the old results"""
+    for name in sorted(new['results']):
+        new_time = new['results'][name]['min']
+        if name in old['results'] and old['results'][name]['min'] > 0:
+            old_time = old['results'][name]['min']
+            print '%-26s %10.4f s %10.4f s %7.2fx' % (name, old_time,
+                    new_time, new_time / old_time)
+        else:
+            print '%-26s %12s %10.4f s' % (name, '-', new_time)
+
+
+def _parse_size(text):
+    max_x, max_y = text.lower().split('x')
+    return int(max_x), int(max_y)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+            description='Measure the activity with a synthetic game')
+    parser.add_argument('-o', '--output',
+            help='file where the results are written (default stdout)')
+    parser.add_argument('--compare',
+            help='results of a previous run to compare')
+    parser.add_argument('--size', type=_parse_size, default=(40, 40),
+            help='cells of the map, as XxY')
+    parser.add_argument('--room-size', type=int, default=4,
+            help='size of the rooms in cells')
+    parser.add_argument('--objects', type=int, default=2000,
+            help='objects in the walls')
+    parser.add_argument('--resources', type=int, default=200)
+    parser.add_argument('--questions', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=3,
+            help='times every benchmark is run')
+    parser.add_argument('--sample', type=int, default=200,
+            help='walls rendered in the rendering benchmarks')
+    options = parser.parse_args()
+
+    results = run(options)
+    if options.output:
+        with open(options.output, 'w') as output_file:
+            json.dump(results, output_file, indent=2, sort_keys=True)
+    if options.compare:
+        with open(options.compare) as old_file:
+            compare(json.load(old_file), results)
+    elif not options.output:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        print
+
+
+if __name__ == "__main__":
+    main()
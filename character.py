@@ -1,76 +1,73 @@
+import os
+import json
+
 from gi.repository import Gtk
+from gi.repository import Gdk
+from gi.repository import GdkPixbuf
 import cairo
-from gi.repository import Rsvg
 
 from sugar3.graphics import style
 
-class Sprite(object):
-    def __init__(self, svg_file, cel_width, cel_height, animation_data):
-        self.svg_file = svg_file
-        self.cel_width, self.cel_height = cel_width, cel_height
-        self.current_animation = None
-        self.direction = 1
-
-        self._animation_data = animation_data
-        self._current_data = None
-        self._animation_index = None
-
-        self.load_svg()
-
-    def load_svg(self):
-        self._svg = Rsvg.Handle.new_from_file(self.svg_file)
-        self._svg_width = self._svg.props.width
-
-        # create a cache with the image rendered
-        self.cache = cairo.ImageSurface(cairo.FORMAT_ARGB32,
-                self._svg.props.width, self._svg.props.height)
-        self.cache_context = cairo.Context(self.cache)
-        self._svg.render_cairo(self.cache_context)
-        self.cache.flush()
-
-        # and another with a flipped render
-        self.cache_inv = cairo.ImageSurface(cairo.FORMAT_ARGB32,
-                self._svg.props.width, self._svg.props.height)
-        self.cache_inv_context = cairo.Context(self.cache_inv)
-        self.cache_inv_context.scale(-1, 1)
-        self.cache_inv_context.translate(-self._svg.props.width, 0)
-        self._svg.render_cairo(self.cache_inv_context)
-        self.cache_inv.flush()
-
-    def change_animation(self, animation_name, direction=1):
-        self.current_animation = animation_name
-        self._current_data = self._animation_data[animation_name]
-        self._animation_index = 0
-        if self.direction == -1:
-            self._current_data = list(reversed(self._current_data))
-
-    def next_frame(self):
-        if self._animation_index + 1 == len(self._current_data):
-            self._animation_index = 0
-        else:
-            self._animation_index += 1
-
-    def draw(self, context, dx, dy):
-        cel_x, cel_y = self._current_data[self._animation_index]
-
-        # another context to draw only one cell
-        self.one_cell = cairo.ImageSurface(cairo.FORMAT_ARGB32,
-                self.cel_width, self._svg.props.height)
-        self.one_cell_context = cairo.Context(self.one_cell)
-
-        if self.direction == 1:
-            self.one_cell_context.set_source_surface(self.cache,
-                    -cel_x * self.cel_width, 0)
-        else:
-            self.one_cell_context.set_source_surface(self.cache_inv,
-                    -cel_x * self.cel_width, 0)
-
-        self.one_cell_context.paint()
-
-        context.translate(dx, dy)
-        context.set_source_surface(self.one_cell)
-        context.rectangle(0, 0, self.cel_width, self.cel_height)
-        context.clip()
+# color used as background in the images without transparency
+COLOR_KEY = (0, 255, 255)
+
+IMAGES_PATH = 'images'
+
+
+class SpriteSheet(object):
+    """ The frames of a animation, loaded from a png with all the frames
+        and a json file with the position of every frame in the image"""
+
+    def __init__(self, name, path=IMAGES_PATH):
+        self.name = name
+        with open(os.path.join(path, '%s.json' % name)) as json_file:
+            data = json.load(json_file)
+        # pixels moved by the character in every cycle of the animation
+        self.displacement = data['displacement']
+
+        pixbuf = GdkPixbuf.Pixbuf.new_from_file(os.path.join(path,
+                '%s.png' % name))
+        if not pixbuf.get_has_alpha():
+            pixbuf = pixbuf.add_alpha(True, *COLOR_KEY)
+        sheet = cairo.ImageSurface(cairo.FORMAT_ARGB32, pixbuf.get_width(),
+                pixbuf.get_height())
+        sheet_context = cairo.Context(sheet)
+        Gdk.cairo_set_source_pixbuf(sheet_context, pixbuf, 0, 0)
+        sheet_context.paint()
+
+        # every frame is copied to a surface, and another flipped,
+        # then to draw a frame only need paint the surface
+        # (surfaces, width, height, offset_x, offset_y)
+        # the offsets are the position of the frame relative to the feet
+        self.frames = []
+        for x, y, width, height, offset_x, offset_y in data['frames']:
+            surfaces = {}
+            for direction in (1, -1):
+                frame = cairo.ImageSurface(cairo.FORMAT_ARGB32, width,
+                        height)
+                frame_context = cairo.Context(frame)
+                if direction == -1:
+                    frame_context.scale(-1, 1)
+                    frame_context.translate(-width, 0)
+                frame_context.set_source_surface(sheet, -x, -y)
+                frame_context.paint()
+                frame.flush()
+                surfaces[direction] = frame
+            self.frames.append((surfaces, width, height, offset_x,
+                    offset_y))
+
+    def get_frame_rect(self, index, feet_x, feet_y, direction):
+        """ Return x, y, width, height of the frame drawn with the feet
+            in feet_x, feet_y"""
+        surfaces, width, height, offset_x, offset_y = self.frames[index]
+        if direction == -1:
+            offset_x = -offset_x - width
+        return feet_x + offset_x, feet_y + offset_y, width, height
+
+    def draw(self, context, index, feet_x, feet_y, direction):
+        x, y, width, height = self.get_frame_rect(index, feet_x, feet_y,
+                direction)
+        context.set_source_surface(self.frames[index][0][direction], x, y)
         context.paint()
 
 
@@ -78,42 +75,100 @@ class Character(object):
     def __init__(self, drawing_area):
         super(Character, self).__init__()
         self._drawing_area = drawing_area
-        self.speed = 10
-        animation_data = {
-            'stand': [(0, 0)],
-            'walk': [(1, 0), (2, 0), (3, 0), (4, 0),
-                     (5, 0), (6, 0), (7, 0), (8, 0)],
-        }
-        self.sprite = Sprite("images/char_walking.svg",
-                             100, 160, animation_data)
-        self.sprite.change_animation('walk')
+        # pixels by second
+        self.speed = 100
+        # seconds displaying every frame of the animations
+        # without displacement
+        self.frame_duration = 0.1
+        self._sheets = {}
+        for name in ('stand', 'walk', 'jump'):
+            self._sheets[name] = SpriteSheet(name)
+        # used to know where the character arrive to the walls
+        self.width = self._sheets['stand'].frames[0][1]
+
+        self._animation = None
+        self._loop = True
+        self._next_animation = None
+        self._frame_index = 0
+        self._frame_elapsed = 0
+        self.change_animation('stand')
 
         self.pos = [0, 0]
         self.direction = 1  # -1 for left, 1 for right
 
-    def update(self):
-        self.sprite.direction = self.direction
-        self.sprite.next_frame()
-        self.pos[0] += self.speed * self.direction
-        return (self.pos[0],
-                self.pos[1] - self.sprite.cel_height + 10,
-                self.sprite.cel_width, self.sprite.cel_height)
+    def change_animation(self, name, loop=True, next_animation='stand'):
+        """ Display the animation, if loop is False, after display
+            all the frames one time change to next_animation"""
+        if name == self._animation:
+            return
+        self._animation = name
+        self._loop = loop
+        self._next_animation = next_animation
+        self._frame_index = 0
+        self._frame_elapsed = 0
+
+    def get_animation(self):
+        return self._animation
+
+    def walk(self):
+        self.change_animation('walk')
+
+    def stop(self):
+        self.change_animation('stand')
+
+    def jump(self):
+        self.change_animation('jump', loop=False,
+                next_animation=self._animation)
+
+    def _get_frame_duration(self):
+        sheet = self._sheets[self._animation]
+        if sheet.displacement[0] == 0:
+            return self.frame_duration
+        # the animation advance at the speed of the character
+        return sheet.displacement[0] / float(len(sheet.frames) * self.speed)
+
+    def _get_feet(self):
+        """ Return the position of the feet used to draw the frame,
+            is not moved while a frame is displayed, the frames
+            have the movement in the offsets"""
+        sheet = self._sheets[self._animation]
+        frame_duration = self._get_frame_duration()
+        cycle_time = self._frame_index * frame_duration + self._frame_elapsed
+        walked = sheet.displacement[0] * cycle_time / \
+                (len(sheet.frames) * frame_duration)
+        return (self.pos[0] + self.width / 2 - walked * self.direction,
+                self.pos[1])
+
+    def get_rect(self):
+        """ Return x, y, width, height of the area used by the character"""
+        feet_x, feet_y = self._get_feet()
+        return self._sheets[self._animation].get_frame_rect(
+                self._frame_index, feet_x, feet_y, self.direction)
+
+    def update(self, elapsed):
+        """ Move the character after elapsed seconds,
+            return the area used by the character"""
+        self._frame_elapsed += elapsed
+        frame_duration = self._get_frame_duration()
+        while self._frame_elapsed >= frame_duration:
+            self._frame_elapsed -= frame_duration
+            if self._frame_index + 1 < \
+                    len(self._sheets[self._animation].frames):
+                self._frame_index += 1
+            elif self._loop:
+                self._frame_index = 0
+            else:
+                self.change_animation(self._next_animation)
+                frame_duration = self._get_frame_duration()
+        if self._animation != 'stand':
+            self.pos[0] += self.speed * self.direction * elapsed
+        return self.get_rect()
 
     def draw(self, context):
-        # draw char
-        dx, dy = self.pos[0], self.pos[1] - self.sprite.cel_height + 10
-        context.save()
-
-        # for debug write a rectangle around
-        """
-        context.rectangle(dx, dy, self.sprite.cel_width,
-                self.sprite.cel_height)
-        stroke = (0, 0, 0)
-        context.set_source_rgb(*stroke)
-        context.stroke()
-        """
-        self.sprite.draw(context, dx, dy)
-        context.restore()
+        feet_x, feet_y = self._get_feet()
+        self._sheets[self._animation].draw(context, self._frame_index,
+                feet_x, feet_y, self.direction)
+
 
 def draw(dr, ctx, character):
     character.draw(ctx)
@@ -124,11 +179,11 @@ def main():
         Gtk.main_quit()
 
     window = Gtk.Window()
-    window.resize(600, 160)
+    window.resize(600, 200)
     window.connect("destroy", _destroy_cb)
     dr = Gtk.DrawingArea()
     character = Character(dr)
-    character.pos = [style.GRID_CELL_SIZE, 140]
+    character.pos = [style.GRID_CELL_SIZE, 180]
     dr.connect('draw', draw, character)
     window.add(dr)
     window.show_all()
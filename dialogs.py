@@ -20,7 +20,6 @@ import random
 from gi.repository import GObject
 from gi.repository import Gtk
 from gi.repository import Gdk
-from gi.repository import GdkPixbuf
 from gi.repository import WebKit
 
 from sugar3.graphics import style
@@ -28,6 +27,7 @@ from sugar3.graphics.toolbutton import ToolButton
 from sugar3.graphics.icon import Icon
 
 import questions
+from assets import get_disk_raster_cache
 
 
 class _DialogWindow(Gtk.Window):
@@ -154,6 +154,9 @@ class QuestionDialog(_DialogWindow):
         self._id_question = id_question
         question = model.get_question(id_question)
         super(QuestionDialog, self).__init__(None, question['question'])
+        # the source of the delay before change the page or close
+        self._timeout_id = None
+        self.connect('destroy', self.__destroy_cb)
 
         scrollwin = Gtk.ScrolledWindow()
         scrollwin.set_policy(Gtk.PolicyType.NEVER, Gtk.PolicyType.AUTOMATIC)
@@ -198,6 +201,24 @@ class QuestionDialog(_DialogWindow):
             self.draw_reply_area.connect('reply-selected',
                     self.__draw_reply_click_cb)
 
+    def __destroy_cb(self, widget):
+        if self._timeout_id is not None:
+            GObject.source_remove(self._timeout_id)
+            self._timeout_id = None
+
+    def _set_timeout(self, seconds, callback):
+        """ Call callback() after the seconds, replacing the delay
+            set before if is still waiting"""
+        if self._timeout_id is not None:
+            GObject.source_remove(self._timeout_id)
+        self._timeout_id = GObject.timeout_add_seconds(seconds,
+                self.__timeout_cb, callback)
+
+    def __timeout_cb(self, callback):
+        self._timeout_id = None
+        callback()
+        return False
+
     def __button_reply_click_cb(self, widget, valid_reply):
         self._show_reply_feedback(valid_reply)
 
@@ -209,7 +230,7 @@ class QuestionDialog(_DialogWindow):
         self.get_window().set_cursor(None)
         # wait 3 seconds
         #report and close
-        GObject.timeout_add_seconds(3, self._close_all)
+        self._set_timeout(3, self._close_all)
 
     def _close_all(self):
         self.destroy()
@@ -223,11 +244,11 @@ class QuestionDialog(_DialogWindow):
             smiley = random.choice(questions.SMILIES_WRONG)
         image_file_name = './images/smilies/%s.svg' % smiley
         size = Gdk.Screen.height() / 2
-        pixbuf = GdkPixbuf.Pixbuf.new_from_file_at_size(image_file_name, size,
-                size)
-        self.image_result.set_from_pixbuf(pixbuf)
+        surface = get_disk_raster_cache().get_surface(image_file_name, size)
+        self.image_result.set_from_pixbuf(Gdk.pixbuf_get_from_surface(surface,
+                0, 0, surface.get_width(), surface.get_height()))
         # report result
         self.emit('reply-selected', self._id_question, valid_reply)
 
         # wait one second and change the page
-        GObject.timeout_add_seconds(1, self._change_page)
+        self._set_timeout(1, self._change_page)
@@ -1,5 +1,4 @@
 from gettext import gettext as _
-import logging
 import os
 
 from gi.repository import Gtk
@@ -9,7 +8,9 @@ from gi.repository import GObject
 
 from sugar3.activity import activity
 
-from game_map import GameMap
+from world import MAIN_MAP
+from history import EditHistory
+import tracing
 from mapview import TopMapView
 from mapnav import MapNavView
 
@@ -20,18 +21,17 @@ class EditMapWin(Gtk.HBox):
         GObject.GObject.__init__(self)
         self.model = model
 
-        if not 'map_data' in self.model.data or \
-                self.model.data['map_data'] is None:
-            self.game_map = GameMap()
-        else:
-            self.game_map = GameMap(self.model.data['map_data'])
-
-        self.model.data['map_data'] = self.game_map.data
+        # use the same GameMap used to play, then the changes are notified
+        self.game_map = self.model.get_world().get_map(MAIN_MAP)
+        self.history = EditHistory(self.game_map)
 
         left_vbox = Gtk.VBox()
         self.nav_view = MapNavView(self.game_map, self.model,
                 mode=MapNavView.MODE_EDIT)
         self.nav_view.set_size_request(Gdk.Screen.width() / 5 * 4, -1)
+        # a drag moving or resizing a object is undone in a single step
+        self.nav_view.connect('button-release-event',
+                self.__nav_view_button_release_cb)
         self.top_view = TopMapView(self.game_map, 150, 150)
         self.top_view.show_position(self.nav_view.x, self.nav_view.y,
                 self.nav_view.direction)
@@ -99,6 +99,16 @@ class EditMapWin(Gtk.HBox):
 
         self.show_all()
 
+    def __nav_view_button_release_cb(self, widget, event):
+        self.history.close_step()
+        return False
+
+    def undo(self):
+        self.history.undo()
+
+    def redo(self):
+        self.history.redo()
+
     def __room_name_in_cb(self, widget, event):
         self.room_name = widget.get_text()
 
@@ -115,7 +125,7 @@ class EditMapWin(Gtk.HBox):
         self.room_name_entry.set_text(room_name)
 
     def load_resources_and_questions(self, origin=None):
-        logging.error('Loading resources')
+        tracing.trace(tracing.ASSETS, 'loading resources')
         self._resources_store.clear()
         for resource in self.model.data['resources']:
             title = resource['title']
@@ -125,13 +135,13 @@ class EditMapWin(Gtk.HBox):
                 image_file_name = resource['show_as']
 
             id_resource = resource['id_resource']
-            logging.error('Adding %s %s %s', title, image_file_name,
-                    id_resource)
+            tracing.trace(tracing.ASSETS, 'adding %s %s %s', title,
+                    image_file_name, id_resource)
             pxb = GdkPixbuf.Pixbuf.new_from_file_at_size(image_file_name, 100,
                     100)
             self._resources_store.append([title, pxb, image_file_name,
                     str(id_resource), 'resource'])
-        logging.error('Loading questions')
+        tracing.trace(tracing.ASSETS, 'loading questions')
         for question in self.model.data['questions']:
             text = question['question']
             if question['type'] == self.model.QUESTION_TYPE_GRAPHIC:
@@ -140,8 +150,8 @@ class EditMapWin(Gtk.HBox):
                 image_file_name = './icons/question.svg'
 
             id_question = question['id_question']
-            logging.error('Adding %s %s %s', text, image_file_name,
-                    id_question)
+            tracing.trace(tracing.ASSETS, 'adding %s %s %s', text,
+                    image_file_name, id_question)
             pxb = GdkPixbuf.Pixbuf.new_from_file_at_size(image_file_name, 100,
                     100)
             self._resources_store.append([text, pxb, image_file_name,
@@ -150,11 +160,12 @@ class EditMapWin(Gtk.HBox):
     def load_furniture(self):
         images_path = os.path.join(activity.get_bundle_path(),
                 'images/furniture')
-        logging.error('Loading furniture from %s', images_path)
+        tracing.trace(tracing.ASSETS, 'loading furniture from %s',
+                images_path)
         for file_name in os.listdir(images_path):
             if not file_name.endswith('.txt'):
                 image_file_name = os.path.join(images_path, file_name)
-                logging.error('Adding %s', image_file_name)
+                tracing.trace(tracing.ASSETS, 'adding %s', image_file_name)
                 pxb = GdkPixbuf.Pixbuf.new_from_file_at_size(image_file_name,
                         100, 100)
                 self._furniture_store.append(['', pxb, image_file_name])
@@ -172,7 +183,7 @@ class EditMapWin(Gtk.HBox):
         self._add_image(image_file_name, id_object, type_object)
 
     def _add_image(self, image_file_name, id_object=None, type_object=None):
-        logging.error('Image %s selected', image_file_name)
+        tracing.trace(tracing.INPUT, 'image %s selected', image_file_name)
         x = self.nav_view.x
         y = self.nav_view.y
         direction = self.nav_view.direction
@@ -183,7 +194,6 @@ class EditMapWin(Gtk.HBox):
         if type_object is not None:
             wall_object['type_object'] = type_object
         self.game_map.add_object_to_wall(x, y, direction, wall_object)
-        self.nav_view.update_wall_info(x, y, direction)
         self.nav_view.grab_focus()
 
     def add_selected_object(self):
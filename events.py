@@ -0,0 +1,31 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+#
+# The class ChangeNotifier is used by GameMap and GameModel to notify
+# the changes in the data, then the caches can remove only the
+# information modified.
+
+
+class ChangeNotifier():
+
+    def connect_changed(self, callback):
+        """ callback(source, event, keys, details) is called after every
+            change. keys is a list of (x, y, direction) of the walls
+            affected, or None if all the walls can be affected,
+            details is a dictionary with information about the change"""
+        if not hasattr(self, '_changed_callbacks'):
+            self._changed_callbacks = []
+        self._changed_callbacks.append(callback)
+
+    def disconnect_changed(self, callback):
+        if hasattr(self, '_changed_callbacks') and \
+                callback in self._changed_callbacks:
+            self._changed_callbacks.remove(callback)
+
+    def notify_changed(self, event, keys, **details):
+        if not hasattr(self, '_changed_callbacks'):
+            return
+        for callback in list(self._changed_callbacks):
+            callback(self, event, keys, details)
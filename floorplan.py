@@ -0,0 +1,282 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+#
+# Create the data of a GameMap from a floor plan image.
+#
+# The floor plan is expected to have the walls painted with a dark color,
+# the doors painted with red across the openings, and the floor
+# with a light color (like a scanned plan over white paper).
+#
+# The pixels are classified in the image at full resolution, and then
+# reduced to a grid with SAMPLES_BY_CELL x SAMPLES_BY_CELL samples by cell.
+# A sample is a wall or a door if any of the pixels is, then the thin
+# walls of a scanned plan are not lost, like when the image is scaled.
+# The floor samples are labeled by connected components working with
+# runs of samples instead of isolated samples, and every cell is assigned
+# to the room with more samples in the cell. The floor touching
+# the border of the image is considered outside of the building.
+
+import sys
+import json
+import logging
+
+from game_map import GameMap
+
+SAMPLES_BY_CELL = 4
+
+FLOOR = 0
+WALL = 1
+DOOR = 2
+
+ROOM_KEYS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789'
+
+
+def _room_key(n):
+    if n < len(ROOM_KEYS):
+        return ROOM_KEYS[n]
+    return unichr(0x100 + n)
+
+
+def _room_colors():
+    colors = []
+    for room_key in sorted(GameMap.default_data['rooms'].keys()):
+        color = GameMap.default_data['rooms'][room_key]['wall_color']
+        if color not in colors:
+            colors.append(color)
+    return colors
+
+
+def _classify_pixels(pixbuf):
+    """ Return a list of rows, with the class (FLOOR, WALL or DOOR)
+        of every pixel"""
+    width, height = pixbuf.get_width(), pixbuf.get_height()
+    n_channels = pixbuf.get_n_channels()
+    rowstride = pixbuf.get_rowstride()
+    pixels = bytearray(pixbuf.get_pixels())
+    rows = []
+    for y in range(height):
+        row = pixels[y * rowstride:y * rowstride + width * n_channels]
+        rows.append([WALL if r < 128 and g < 128 and b < 128 else
+                DOOR if r >= 160 and g < 96 and b < 96 else FLOOR
+                for r, g, b in zip(row[0::n_channels], row[1::n_channels],
+                        row[2::n_channels])])
+    return rows
+
+
+def _get_ranges(size, samples):
+    """ Return a list of (start, end) of the pixels in every sample"""
+    ranges = []
+    for n in range(samples):
+        start = n * size / samples
+        ranges.append((start, max((n + 1) * size / samples, start + 1)))
+    return ranges
+
+
+def reduce_classes(rows, width, height):
+    """ Return the rows reduced to width x height samples, every sample
+        have the max class of the pixels (DOOR over WALL over FLOOR)"""
+    columns = _get_ranges(len(rows[0]), width)
+    reduced = []
+    for start, end in _get_ranges(len(rows), height):
+        sample_row = [FLOOR] * width
+        for row in rows[start:end]:
+            row_samples = [max(row[column_start:column_end])
+                    for column_start, column_end in columns]
+            sample_row = map(max, sample_row, row_samples)
+        reduced.append(sample_row)
+    return reduced
+
+
+def _floor_runs(row):
+    """ Return a list of (start, end) of the runs of floor pixels"""
+    runs = []
+    start = None
+    for x, pixel_class in enumerate(row):
+        if pixel_class == FLOOR:
+            if start is None:
+                start = x
+        elif start is not None:
+            runs.append((start, x))
+            start = None
+    if start is not None:
+        runs.append((start, len(row)))
+    return runs
+
+
+def label_components(rows):
+    """ Label the floor pixels connected (4-connectivity).
+        Return a list of rows with the label of every pixel (0 is not floor)
+        and the set of labels touching the border of the image."""
+    height, width = len(rows), len(rows[0])
+    parent = [0]
+
+    def find(label):
+        while parent[label] != label:
+            parent[label] = parent[parent[label]]
+            label = parent[label]
+        return label
+
+    # first pass, label the runs and join the runs overlapped
+    # with runs in the previous row
+    row_runs = []
+    previous_runs = []
+    for y in range(height):
+        runs = []
+        for start, end in _floor_runs(rows[y]):
+            label = None
+            for prev_start, prev_end, prev_label in previous_runs:
+                if prev_start < end and start < prev_end:
+                    if label is None:
+                        label = find(prev_label)
+                    else:
+                        root = find(prev_label)
+                        if root != label:
+                            parent[max(root, label)] = min(root, label)
+                            label = min(root, label)
+            if label is None:
+                label = len(parent)
+                parent.append(label)
+            runs.append((start, end, label))
+        row_runs.append(runs)
+        previous_runs = runs
+
+    # second pass, paint the resolved labels
+    labels = []
+    border_labels = set()
+    for y, runs in enumerate(row_runs):
+        row = [0] * width
+        for start, end, label in runs:
+            label = find(label)
+            row[start:end] = [label] * (end - start)
+            if y == 0 or y == height - 1 or start == 0 or end == width:
+                border_labels.add(label)
+        labels.append(row)
+    return labels, border_labels
+
+
+def _assign_cells(labels, border_labels, max_x, max_y):
+    """ Return a list of rows with the label assigned to every cell,
+        the label with more pixels in the cell, or None"""
+    cell_labels = []
+    for y in range(max_y):
+        sample_rows = labels[y * SAMPLES_BY_CELL:(y + 1) * SAMPLES_BY_CELL]
+        row = []
+        for x in range(max_x):
+            count = {}
+            for sample_row in sample_rows:
+                for label in sample_row[x * SAMPLES_BY_CELL:
+                        (x + 1) * SAMPLES_BY_CELL]:
+                    if label != 0 and label not in border_labels:
+                        count[label] = count.get(label, 0) + 1
+            if count:
+                row.append(max(count, key=count.get))
+            else:
+                row.append(None)
+        cell_labels.append(row)
+
+    # the cells without room (walls or outside of the building)
+    # are assigned to a neighbour room
+    pending = [(x, y) for y in range(max_y) for x in range(max_x)
+            if cell_labels[y][x] is None]
+    while pending:
+        still_pending = []
+        for x, y in pending:
+            for dx, dy in ((-1, 0), (0, -1), (1, 0), (0, 1)):
+                x2, y2 = x + dx, y + dy
+                if 0 <= x2 < max_x and 0 <= y2 < max_y and \
+                        cell_labels[y2][x2] is not None:
+                    cell_labels[y][x] = cell_labels[y2][x2]
+                    break
+            else:
+                still_pending.append((x, y))
+        if len(still_pending) == len(pending):
+            # there are not rooms in the image
+            raise ValueError('No rooms found in the floor plan')
+        pending = still_pending
+    return cell_labels
+
+
+def _have_door(rows, x1, y1, x2, y2):
+    """ Return if there are door pixels in the border between
+        the cells (x1, y1) and (x2, y2), (x2, y2) is at East or South"""
+    if x1 != x2:
+        border_x = x2 * SAMPLES_BY_CELL
+        columns = range(border_x - 1, border_x + 1)
+        lines = range(y1 * SAMPLES_BY_CELL, (y1 + 1) * SAMPLES_BY_CELL)
+        return any(rows[line][column] == DOOR for line in lines
+                for column in columns)
+    else:
+        border_y = y2 * SAMPLES_BY_CELL
+        lines = range(border_y - 1, border_y + 1)
+        return any(DOOR in rows[line][x1 * SAMPLES_BY_CELL:
+                (x1 + 1) * SAMPLES_BY_CELL] for line in lines)
+
+
+def import_floor_plan(file_name, max_x, max_y=None):
+    """ Read a floor plan image and return the data to create a GameMap
+        with max_x cells of width. If max_y is None, is calculated
+        using the proportions of the image"""
+    # imported here, then the pixels can be processed without gi
+    from gi.repository import GdkPixbuf
+
+    pixbuf = GdkPixbuf.Pixbuf.new_from_file(file_name)
+    if max_y is None:
+        max_y = max(1, int(round(float(max_x) * pixbuf.get_height() /
+                pixbuf.get_width())))
+
+    rows = reduce_classes(_classify_pixels(pixbuf), max_x * SAMPLES_BY_CELL,
+            max_y * SAMPLES_BY_CELL)
+    labels, border_labels = label_components(rows)
+    cell_labels = _assign_cells(labels, border_labels, max_x, max_y)
+
+    # create the rooms, in the order they appear
+    room_keys = {}
+    rooms = {}
+    colors = _room_colors()
+    for row in cell_labels:
+        for label in row:
+            if label not in room_keys:
+                room_key = _room_key(len(room_keys))
+                room_keys[label] = room_key
+                rooms[room_key] = {'wall_color':
+                        colors[len(rooms) % len(colors)]}
+    cells = [u''.join(room_keys[label] for label in row)
+            for row in cell_labels]
+    logging.debug('floor plan %s: %d rooms', file_name, len(rooms))
+
+    # doors, only one by wall between the same rooms
+    walls = []
+
+    def add_door(x, y, x2, y2, direction, previous_door):
+        pair = (cells[y][x], cells[y2][x2])
+        if pair[0] == pair[1] or not _have_door(rows, x, y, x2, y2):
+            return None
+        if pair != previous_door:
+            walls.append({'position': [x, y, direction],
+                    'doors': ['door_%d' % (len(walls) + 1)]})
+        return pair
+
+    for y in range(max_y - 1):
+        previous_door = None
+        for x in range(max_x):
+            previous_door = add_door(x, y, x, y + 1, 'S', previous_door)
+    for x in range(max_x - 1):
+        previous_door = None
+        for y in range(max_y):
+            previous_door = add_door(x, y, x + 1, y, 'E', previous_door)
+
+    return {'max_x': max_x, 'max_y': max_y, 'cells': cells,
+            'rooms': rooms, 'walls': walls}
+
+
+def main():
+    if len(sys.argv) < 3:
+        print 'Use: floorplan.py floor_plan.png width_in_cells'
+        sys.exit(1)
+    data = import_floor_plan(sys.argv[1], int(sys.argv[2]))
+    json.dump(data, sys.stdout)
+
+if __name__ == "__main__":
+    main()
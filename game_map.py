@@ -32,8 +32,99 @@ The symbol # is a door.
 We represent this map with the following structure:
 """
 
-
-class GameMap():
+from array import array
+
+from events import ChangeNotifier
+
+# directions in clock wise order
+DIRECTIONS = ['N', 'E', 'S', 'W']
+DIRECTION_BITS = {'N': 1, 'E': 2, 'S': 4, 'W': 8}
+DIRECTION_DELTAS = {'N': (0, -1), 'E': (1, 0), 'S': (0, 1), 'W': (-1, 0)}
+REVERSED_DIRECTION = {'N': 'S', 'S': 'N', 'E': 'W', 'W': 'E'}
+DIRECTION_CW = {'N': 'E', 'E': 'S', 'S': 'W', 'W': 'N'}
+DIRECTION_CCW = {'N': 'W', 'W': 'S', 'S': 'E', 'E': 'N'}
+
+# events notified to the callbacks connected with connect_changed
+OBJECT_ADDED = 'object-added'
+OBJECT_MOVED = 'object-moved'
+OBJECT_RESIZED = 'object-resized'
+OBJECT_REMOVED = 'object-removed'
+ROOM_RENAMED = 'room-renamed'
+DOOR_INFO_CHANGED = 'door-info-changed'
+CELLS_CHANGED = 'cells-changed'
+
+
+def _merge_runs(flags):
+    """ Return a list of (start, end) for every run of True values"""
+    runs = []
+    start = None
+    for i, flag in enumerate(flags):
+        if flag:
+            if start is None:
+                start = i
+        elif start is not None:
+            runs.append((start, i))
+            start = None
+    if start is not None:
+        runs.append((start, len(flags)))
+    return runs
+
+
+def derive_walls(cells):
+    """ Calculate the walls from the cells grid, comparing every row
+        with the next row and every column with the next column.
+        Return a array with a wall mask (using DIRECTION_BITS) by cell,
+        and a list of wall runs (x1, y1, x2, y2) in cell units,
+        merging the contiguous wall segments in the same line."""
+    max_y = len(cells)
+    max_x = len(cells[0])
+    border = [True] * max_x
+    # horizontal_lines[y][x] is True if there are a wall between the cells
+    # (x, y - 1) and (x, y), the first and last lines are the map border
+    horizontal_lines = [border]
+    for y in range(1, max_y):
+        horizontal_lines.append([above != below for above, below in
+                zip(cells[y - 1], cells[y])])
+    horizontal_lines.append(border)
+    # vertical_lines[y][x] is True if there are a wall between the cells
+    # (x - 1, y) and (x, y)
+    vertical_lines = [[True] + [left != right for left, right in
+            zip(row, row[1:])] + [True] for row in cells]
+
+    bit_n, bit_e = DIRECTION_BITS['N'], DIRECTION_BITS['E']
+    bit_s, bit_w = DIRECTION_BITS['S'], DIRECTION_BITS['W']
+    wall_mask = array('B')
+    for y in range(max_y):
+        north, south = horizontal_lines[y], horizontal_lines[y + 1]
+        west = vertical_lines[y]
+        east = west[1:]
+        wall_mask.extend([n * bit_n | e * bit_e | s * bit_s | w * bit_w
+                for n, e, s, w in zip(north, east, south, west)])
+
+    wall_runs = []
+    for y, line in enumerate(horizontal_lines):
+        for x1, x2 in _merge_runs(line):
+            wall_runs.append((x1, y, x2, y))
+    for x in range(max_x + 1):
+        column = [vertical_lines[y][x] for y in range(max_y)]
+        for y1, y2 in _merge_runs(column):
+            wall_runs.append((x, y1, x, y2))
+    return wall_mask, wall_runs
+
+
+def _get_wall_segment(x, y, direction):
+    """ Return the wall of the cell in the direction as (x1, y1, x2, y2)
+        in cell units"""
+    if direction == 'N':
+        return (x, y, x + 1, y)
+    if direction == 'S':
+        return (x, y + 1, x + 1, y + 1)
+    if direction == 'W':
+        return (x, y, x, y + 1)
+    return (x + 1, y, x + 1, y + 1)
+
+
+class GameMap(ChangeNotifier):
 
     default_data = {'max_x': 4, 'max_y': 6,
 
@@ -78,15 +169,196 @@ class GameMap():
             self.data = self.default_data
         else:
             self.data = data
+        self._build_walls_index()
+        self.compile()
+
+    def _build_walls_index(self):
+        """ Index the walls data by (x, y, direction), to avoid scan
+            the list of walls every time we need information about a wall.
+            Need be called again if self.data['walls'] is replaced"""
+        self._walls_index = {}
+        for wall in self.data['walls']:
+            x, y, direction = wall['position']
+            self._walls_index[(x, y, direction)] = wall
+
+    def compile(self):
+        """ Pack the map in a navigation table: a room id for every cell,
+            and a mask with the walls and another with the doors
+            (using DIRECTION_BITS) for every cell.
+            Need be called again if the cells or the doors are modified"""
+        max_x, max_y = self.data['max_x'], self.data['max_y']
+        cells = self.data['cells']
+
+        self._room_keys = []
+        room_ids = {}
+        self._room_ids = array('H')
+        for row in cells:
+            for room_key in row:
+                if not room_key in room_ids:
+                    room_ids[room_key] = len(self._room_keys)
+                    self._room_keys.append(room_key)
+                self._room_ids.append(room_ids[room_key])
+
+        self._wall_mask, self._wall_runs = derive_walls(cells)
+
+        self._door_mask = array('B', [0] * (max_x * max_y))
+        for (x, y, direction), wall in self._walls_index.items():
+            if not wall.get('doors'):
+                continue
+            if 0 <= x < max_x and 0 <= y < max_y:
+                self._set_door_bit(x, y, direction)
+            # the doors are visible from the other side of the wall too,
+            # if there are not information defined in that side
+            x2, y2 = self.get_next_coords(x, y, direction)
+            reversed_direction = REVERSED_DIRECTION[direction]
+            if not (x2 == -1 and y2 == -1) and \
+                    self._get_wall(x2, y2, reversed_direction) is None:
+                self._set_door_bit(x2, y2, reversed_direction)
+
+        # the walls with doors as segments, without repeat the doors
+        # visible from both sides
+        door_segments = set()
+        for index, door_bits in enumerate(self._door_mask):
+            if not door_bits:
+                continue
+            x, y = index % max_x, index / max_x
+            for direction in DIRECTIONS:
+                if door_bits & DIRECTION_BITS[direction]:
+                    door_segments.add(_get_wall_segment(x, y, direction))
+        self._door_segments = sorted(door_segments)
+
+    def _set_door_bit(self, x, y, direction):
+        index = y * self.data['max_x'] + x
+        bit = DIRECTION_BITS[direction]
+        if self._wall_mask[index] & bit:
+            self._door_mask[index] |= bit
+
+    def _clear_door_bit(self, x, y, direction):
+        """ Remove the door of the cell in the direction, the door segment
+            is removed too if the door is not visible from the other side"""
+        index = y * self.data['max_x'] + x
+        self._door_mask[index] &= ~DIRECTION_BITS[direction]
+        x2, y2 = self.get_next_coords(x, y, direction)
+        if (x2 == -1 and y2 == -1) or \
+                not self._is_door(x2, y2, REVERSED_DIRECTION[direction]):
+            self._door_segments.remove(_get_wall_segment(x, y, direction))
+        self.notify_changed(DOOR_INFO_CHANGED, [(x, y, direction)],
+                door_name=None, direction=direction)
+
+    def set_cells(self, cells):
+        """ Replace the cells of the map, and update the walls"""
+        old_cells = self.data['cells']
+        self.data['cells'] = cells
+        self.data['max_y'] = len(cells)
+        self.data['max_x'] = len(cells[0])
+        self.compile()
+        self.notify_changed(CELLS_CHANGED, None, old=old_cells, new=cells)
+
+    def set_room(self, x, y, room_key):
+        """ Change the room assigned to the cell x, y"""
+        # the rows not modified are shared between the old and new cells
+        cells = list(self.data['cells'])
+        row = cells[y]
+        cells[y] = row[:x] + room_key + row[x + 1:]
+        self.set_cells(cells)
+
+    def get_door_segments(self):
+        """ Return the walls with doors as a list of (x1, y1, x2, y2)
+            in cell units, to be used to draw the map"""
+        return self._door_segments
+
+    def get_wall_runs(self):
+        """ Return the walls merged in straight segments, as a list of
+            (x1, y1, x2, y2) in cell units, to be used to draw the map"""
+        return self._wall_runs
+
+    def _cell_index(self, x, y):
+        if x < 0 or y < 0 or \
+                x >= self.data['max_x'] or y >= self.data['max_y']:
+            raise IndexError('position %d %d out of the map' % (x, y))
+        return y * self.data['max_x'] + x
+
+    def _is_wall(self, x, y, direction):
+        return self._wall_mask[self._cell_index(x, y)] & \
+                DIRECTION_BITS[direction] != 0
+
+    def _is_door(self, x, y, direction):
+        return self._door_mask[self._cell_index(x, y)] & \
+                DIRECTION_BITS[direction] != 0
+
+    def get_wall_bits(self, x, y):
+        """ Return the walls of the cell, using DIRECTION_BITS"""
+        return self._wall_mask[self._cell_index(x, y)]
+
+    def get_door_bits(self, x, y):
+        """ Return the walls of the cell with doors,
+            using DIRECTION_BITS"""
+        return self._door_mask[self._cell_index(x, y)]
+
+    def _get_wall(self, x, y, direction):
+        """ Return the wall dictionary in the position x, y, direction
+            or None if there are not information about this wall"""
+        return self._walls_index.get((x, y, direction))
+
+    def _get_reversed_wall(self, x, y, direction):
+        """ Return the wall dictionary at the other side of the wall
+            in the position x, y, direction, or None if not exists"""
+        x2, y2 = self.get_next_coords(x, y, direction)
+        if x2 == -1 and y2 == -1:
+            return None
+        return self._walls_index.get((x2, y2,
+                self.get_reversed_direction(direction)))
+
+    def _get_doors(self, x, y, direction):
+        """ Return the list of doors defined in the walls data,
+            in any side of the wall"""
+        wall = self._get_wall(x, y, direction)
+        # look for information in the other side of the room too.
+        if wall is None:
+            wall = self._get_reversed_wall(x, y, direction)
+        if wall is not None and 'doors' in wall:
+            return wall['doors']
+        return []
 
     def get_room(self, x, y):
         """ Return room key and the dictionary based in
             the position x,y in the map"""
-        room_key = self.data['cells'][y][x]
-        return room_key
+        return self._room_keys[self._room_ids[self._cell_index(x, y)]]
 
     def set_room_name(self, room_key, room_name):
+        old_room_name = self.get_room_name(room_key)
         self.data['rooms'][room_key]['room_name'] = room_name
+        self.notify_changed(ROOM_RENAMED, self._get_room_walls(room_key),
+                room_key=room_key, old=old_room_name, new=room_name)
+
+    def _get_room_walls(self, room_key):
+        """ Return the keys (x, y, direction) of the walls of the room,
+            seen from inside and from outside of the room"""
+        keys = []
+        max_x = self.data['max_x']
+        for index, room_id in enumerate(self._room_ids):
+            if self._room_keys[room_id] != room_key:
+                continue
+            y, x = divmod(index, max_x)
+            for direction in DIRECTIONS:
+                if self._wall_mask[index] & DIRECTION_BITS[direction]:
+                    keys.append((x, y, direction))
+                    x2, y2 = self.get_next_coords(x, y, direction)
+                    if not (x2 == -1 and y2 == -1):
+                        keys.append((x2, y2, REVERSED_DIRECTION[direction]))
+        return keys
+
+    def _get_door_walls(self, door_name):
+        """ Return the keys (x, y, direction) of the walls where
+            the door is visible"""
+        keys = []
+        for (x, y, direction), wall in self._walls_index.items():
+            if door_name in wall.get('doors', []):
+                keys.append((x, y, direction))
+                x2, y2 = self.get_next_coords(x, y, direction)
+                if not (x2 == -1 and y2 == -1):
+                    keys.append((x2, y2, REVERSED_DIRECTION[direction]))
+        return keys
 
     def get_room_name(self, room_key):
         if 'room_name' in self.data['rooms'][room_key]:
@@ -107,16 +379,13 @@ class GameMap():
             self.data['doors'] = {}
         key = door_name + '_' + direction
         self.data['doors'][key] = door_info
+        self.notify_changed(DOOR_INFO_CHANGED,
+                self._get_door_walls(door_name), door_name=door_name,
+                direction=direction)
 
     def get_next_coords(self, x, y, direction):
-        if direction == 'N':
-            y -= 1
-        if direction == 'S':
-            y += 1
-        if direction == 'W':
-            x -= 1
-        if direction == 'E':
-            x += 1
+        dx, dy = DIRECTION_DELTAS[direction]
+        x, y = x + dx, y + dy
         if x < 0 or y < 0 or \
             x > (self.data['max_x'] - 1) or \
             y > (self.data['max_y'] - 1):
@@ -130,85 +399,76 @@ class GameMap():
         return self.get_room(x, y)
 
     def get_reversed_direction(self, direction):
-        if direction == 'N':
-            return 'S'
-        if direction == 'S':
-            return 'N'
-        if direction == 'E':
-            return 'W'
-        if direction == 'W':
-            return 'E'
+        return REVERSED_DIRECTION[direction]
 
     def get_direction_cw(self, direction):
         """Return the direction if the user turn clock wise"""
-        if direction == 'N':
-            return 'E'
-        if direction == 'S':
-            return 'W'
-        if direction == 'E':
-            return 'S'
-        if direction == 'W':
-            return 'N'
+        return DIRECTION_CW[direction]
 
     def get_direction_ccw(self, direction):
         """Return the direction if the user turn reverse clock wise"""
-        if direction == 'N':
-            return 'W'
-        if direction == 'S':
-            return 'E'
-        if direction == 'E':
-            return 'N'
-        if direction == 'W':
-            return 'S'
+        return DIRECTION_CCW[direction]
 
     def get_wall_info(self, x, y, direction):
         """ Return the array of objects associated to a defined wall
             or None if there are not a wall in this cell and direction"""
-
-        # verify if there are a wall in the requested position
-        actual_room = self.get_room(x, y)
-        next_room = self.get_next_room(x, y, direction)
-        # if the two rooms are the same, there are no wall
-        if next_room is not None and actual_room == next_room:
+        if not self._is_wall(x, y, direction):
             return None
-        # Search in walls data
-        for wall in self.data['walls']:
-            if wall['position'] == [x, y, direction]:
-                if not 'objects' in wall:
-                    wall['objects'] = []
-                return wall['objects']
-        return []
-
-    def add_object_to_wall(self, x, y, direction, wall_object):
+        wall = self._get_wall(x, y, direction)
+        if wall is None:
+            return []
+        if not 'objects' in wall:
+            wall['objects'] = []
+        return wall['objects']
+
+    def add_object_to_wall(self, x, y, direction, wall_object, order=None):
         """ Add a object to the array of objects associated to a defined wall
+            at the end, or in the position order if is defined
         """
-        # verify if there are a wall in the requested position
-        actual_room = self.get_room(x, y)
-        next_room = self.get_next_room(x, y, direction)
-        # if the two rooms are the same, there are no wall
-        if next_room is not None and actual_room == next_room:
+        if not self._is_wall(x, y, direction):
             return None
-        # Search in walls data
-        found = False
-        for wall in self.data['walls']:
-            if wall['position'] == [x, y, direction]:
-                if not 'objects' in wall:
-                    wall['objects'] = []
-                wall['objects'].append(wall_object)
-                found = True
-        if not found:
-            wall_info = {'position': [x, y, direction], 'objects': []}
-            wall_info['objects'].append(wall_object)
-            self.data['walls'].append(wall_info)
+        wall = self._get_wall(x, y, direction)
+        if wall is None:
+            wall = {'position': [x, y, direction], 'objects': []}
+            self.data['walls'].append(wall)
+            self._walls_index[(x, y, direction)] = wall
+            # the door of the other side of the wall is not visible
+            # from this side now
+            if self._is_door(x, y, direction):
+                self._clear_door_bit(x, y, direction)
+        if not 'objects' in wall:
+            wall['objects'] = []
+        if order is None:
+            order = len(wall['objects'])
+        wall['objects'].insert(order, wall_object)
+        self.notify_changed(OBJECT_ADDED, [(x, y, direction)],
+                wall_object=wall_object, order=order)
 
     def del_object_from_wall(self, x, y, direction, wall_object):
-        for wall in self.data['walls']:
-            if wall['position'] == [x, y, direction]:
-                # locate the object:
-                for order, existing_object in enumerate(wall['objects']):
-                    if existing_object == wall_object:
-                        del wall['objects'][order]
-                        break
+        wall = self._get_wall(x, y, direction)
+        if wall is None or not 'objects' in wall:
+            return
+        # locate the object:
+        for order, existing_object in enumerate(wall['objects']):
+            if existing_object == wall_object:
+                del wall['objects'][order]
+                self.notify_changed(OBJECT_REMOVED, [(x, y, direction)],
+                        wall_object=existing_object, order=order)
+                break
+
+    def move_object(self, x, y, direction, wall_object, wall_x, wall_y):
+        """ Change the position of a object in the wall,
+            wall_x and wall_y are relative to the wall size (0 to 100)"""
+        old = (wall_object['wall_x'], wall_object['wall_y'])
+        wall_object['wall_x'], wall_object['wall_y'] = wall_x, wall_y
+        self.notify_changed(OBJECT_MOVED, [(x, y, direction)],
+                wall_object=wall_object, old=old, new=(wall_x, wall_y))
+
+    def resize_object(self, x, y, direction, wall_object, wall_scale):
+        old = wall_object['wall_scale']
+        wall_object['wall_scale'] = wall_scale
+        self.notify_changed(OBJECT_RESIZED, [(x, y, direction)],
+                wall_object=wall_object, old=old, new=wall_scale)
 
     def get_wall_color(self, x, y):
         room = self.get_room(x, y)
@@ -217,88 +477,47 @@ class GameMap():
     def go_right(self, x, y, direction):
         """ Return next position if the user go to the right"""
         # check if there are a wall
-        direction_cw = self.get_direction_cw(direction)
-        wall_right = self.get_wall_info(x, y, direction_cw)
-        if wall_right is not None:
+        direction_cw = DIRECTION_CW[direction]
+        if self._is_wall(x, y, direction_cw):
             return x, y, direction_cw
-        if direction == 'N':
-            return x + 1, y, direction
-        if direction == 'E':
-            return x, y + 1, direction
-        if direction == 'S':
-            return x - 1, y, direction
-        if direction == 'W':
-            return x, y - 1, direction
+        dx, dy = DIRECTION_DELTAS[direction_cw]
+        return x + dx, y + dy, direction
 
     def go_left(self, x, y, direction):
         """ Return next position if the user go to the left"""
         # check if there are a wall
-        direction_ccw = self.get_direction_ccw(direction)
-        wall_left = self.get_wall_info(x, y, direction_ccw)
-        if wall_left is not None:
+        direction_ccw = DIRECTION_CCW[direction]
+        if self._is_wall(x, y, direction_ccw):
             return x, y, direction_ccw
-        if direction == 'N':
-            return x - 1, y, direction
-        if direction == 'E':
-            return x, y - 1, direction
-        if direction == 'S':
-            return x + 1, y, direction
-        if direction == 'W':
-            return x, y + 1, direction
+        dx, dy = DIRECTION_DELTAS[direction_ccw]
+        return x + dx, y + dy, direction
 
     def cross_door(self, x, y, direction):
-        """ Return next position if the user go to the left"""
+        """ Return next position if the user cross the door"""
         # verify is the door is in the right position/direction
-        if not self.have_door(x, y, direction):
+        if not self._is_door(x, y, direction):
             return x, y, direction
-        else:
-            new_x, new_y, new_dir = self.go_forward(x, y, direction)
-            if self.get_wall_info(new_x, new_y, new_dir) is None:
-                new_x, new_y, new_dir = self.go_forward(new_x, new_y,
-                        new_dir)
-            return new_x, new_y, new_dir
+        new_x, new_y = self.get_next_coords(x, y, direction)
+        if new_x == -1 and new_y == -1:
+            # a door in the border of the map, nowhere to go
+            return x, y, direction
+        if not self._is_wall(new_x, new_y, direction):
+            new_x, new_y, direction = self.go_forward(new_x, new_y,
+                    direction)
+        return new_x, new_y, direction
 
     def go_forward(self, x, y, direction):
-        if direction == 'N':
-            return x, y - 1, direction
-        if direction == 'E':
-            return x + 1, y, direction
-        if direction == 'S':
-            return x, y + 1, direction
-        if direction == 'W':
-            return x - 1, y, direction
+        dx, dy = DIRECTION_DELTAS[direction]
+        return x + dx, y + dy, direction
 
     def have_door(self, x, y, direction):
         """ Return if the wall have a door
             or None if there are not a wall in this cell and direction"""
-
-        # verify if there are a wall in the requested position
-        actual_room = self.get_room(x, y)
-        next_room = self.get_next_room(x, y, direction)
-        # if the two rooms are the same, there are no wall
-        if next_room is not None and actual_room == next_room:
+        if not self._is_wall(x, y, direction):
             return None
-        # Search in walls data
-        for wall in self.data['walls']:
-            if wall['position'] == [x, y, direction]:
-                if 'doors' in wall and len(wall['doors']) > 0:
-                    return wall['doors']
-                else:
-                    return []
-        # look for information in the other side of the room too.
-        if next_room is not None:
-            reversed_direction = self.get_reversed_direction(direction)
-            x2, y2 = self.get_next_coords(x, y, direction)
-            if x2 == -1 and y2 == -1:
-                return []
-            for wall in self.data['walls']:
-                if wall['position'] == [x2, y2, reversed_direction]:
-                    if 'doors' in wall and len(wall['doors']) > 0:
-                        return wall['doors']
-                    else:
-                        return []
-        # Nothing found
-        return []
+        if not self._is_door(x, y, direction):
+            return []
+        return self._get_doors(x, y, direction)
 
 
 # testing
@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+#
+# The class EditHistory record the changes done in a GameMap to undo
+# and redo them.
+#
+# Every step store only the operation done, with references to the
+# objects modified and the old and new values, then the memory used
+# is proportional to the change, not to the size of the map.
+# The consecutive moves or resizes of the same object are joined
+# in a single step, until close_step() is called (at the end of the drag).
+#
+# The callbacks connected with connect_changed are called when the steps
+# change, to update the state of the undo and redo buttons.
+
+import logging
+
+import game_map
+from events import ChangeNotifier
+
+MAX_STEPS = 100
+
+# event notified when a step is added, undone or redone
+HISTORY_CHANGED = 'history-changed'
+
+
+class EditHistory(ChangeNotifier):
+
+    def __init__(self, edited_map, max_steps=MAX_STEPS):
+        self._game_map = edited_map
+        self._max_steps = max_steps
+        self._undo_steps = []
+        self._redo_steps = []
+        # True while undoing or redoing, to not record the changes
+        self._applying = False
+        self._open_step = None
+        self._game_map.connect_changed(self.__map_changed_cb)
+
+    def __map_changed_cb(self, edited_map, event, keys, details):
+        if self._applying:
+            return
+        if event == game_map.DOOR_INFO_CHANGED:
+            # only store calculated data, is not a user change
+            return
+        step = {'event': event, 'keys': keys, 'details': details}
+        if event in (game_map.OBJECT_MOVED, game_map.OBJECT_RESIZED):
+            open_step = self._open_step
+            if open_step is not None and open_step['event'] == event and \
+                    open_step['details']['wall_object'] is \
+                        details['wall_object']:
+                open_step['details']['new'] = details['new']
+                return
+            self._open_step = step
+        else:
+            self._open_step = None
+        self._undo_steps.append(step)
+        if len(self._undo_steps) > self._max_steps:
+            del self._undo_steps[0]
+        self._redo_steps = []
+        self.notify_changed(HISTORY_CHANGED, [])
+
+    def close_step(self):
+        """ The next move or resize will be stored in a new step"""
+        self._open_step = None
+
+    def can_undo(self):
+        return len(self._undo_steps) > 0
+
+    def can_redo(self):
+        return len(self._redo_steps) > 0
+
+    def undo(self):
+        if not self._undo_steps:
+            return
+        step = self._undo_steps.pop()
+        self._apply(step, undo=True)
+        self._redo_steps.append(step)
+        self.notify_changed(HISTORY_CHANGED, [])
+
+    def redo(self):
+        if not self._redo_steps:
+            return
+        step = self._redo_steps.pop()
+        self._apply(step, undo=False)
+        self._undo_steps.append(step)
+        self.notify_changed(HISTORY_CHANGED, [])
+
+    def _apply(self, step, undo):
+        self.close_step()
+        event, details = step['event'], step['details']
+        value = details.get('old') if undo else details.get('new')
+        logging.debug('%s %s', 'undo' if undo else 'redo', event)
+        self._applying = True
+        try:
+            if event in (game_map.OBJECT_ADDED, game_map.OBJECT_REMOVED):
+                x, y, direction = step['keys'][0]
+                if (event == game_map.OBJECT_ADDED) == undo:
+                    self._game_map.del_object_from_wall(x, y, direction,
+                            details['wall_object'])
+                else:
+                    self._game_map.add_object_to_wall(x, y, direction,
+                            details['wall_object'], order=details['order'])
+            elif event == game_map.OBJECT_MOVED:
+                x, y, direction = step['keys'][0]
+                self._game_map.move_object(x, y, direction,
+                        details['wall_object'], *value)
+            elif event == game_map.OBJECT_RESIZED:
+                x, y, direction = step['keys'][0]
+                self._game_map.resize_object(x, y, direction,
+                        details['wall_object'], value)
+            elif event == game_map.ROOM_RENAMED:
+                self._game_map.set_room_name(details['room_key'], value)
+            elif event == game_map.CELLS_CHANGED:
+                self._game_map.set_cells(value)
+        finally:
+            self._applying = False
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+#
+# The class HotspotMap store the areas of a wall where the user can click
+# (doors, lateral walls, objects) to find the area below the mouse
+# without check all the objects in the wall.
+#
+# The view is divided in a grid of cells of CELL_SIZE pixels, and every
+# cell have the list of the areas over it. The areas added later
+# are over the areas added before, like when are drawn.
+
+CELL_SIZE = 32
+
+DOOR = 'door'
+LEFT_WALL = 'left-wall'
+RIGHT_WALL = 'right-wall'
+OBJECT = 'object'
+RESIZE_HANDLE = 'resize-handle'
+
+
+class HotspotMap():
+
+    def __init__(self, width, height, cell_size=CELL_SIZE):
+        self.width = width
+        self.height = height
+        self._cell_size = cell_size
+        self._columns = int(width) / cell_size + 1
+        self._rows = int(height) / cell_size + 1
+        self._cells = [[] for n in range(self._columns * self._rows)]
+        # (kind, data, x, y, width, height)
+        self._areas = []
+
+    def add(self, kind, x, y, width, height, data=None):
+        """ Add a area, over the areas added before"""
+        index = len(self._areas)
+        self._areas.append((kind, data, x, y, width, height))
+        first_column = max(int(x) / self._cell_size, 0)
+        last_column = min(int(x + width) / self._cell_size,
+                self._columns - 1)
+        first_row = max(int(y) / self._cell_size, 0)
+        last_row = min(int(y + height) / self._cell_size, self._rows - 1)
+        for row in range(first_row, last_row + 1):
+            for column in range(first_column, last_column + 1):
+                self._cells[row * self._columns + column].append(index)
+
+    def find(self, x, y, kinds=None):
+        """ Return (kind, data) of the area on top in the position x, y,
+            only of the kinds in the list if is set,
+            or (None, None) if there are not areas"""
+        column, row = int(x) / self._cell_size, int(y) / self._cell_size
+        if not (0 <= column < self._columns and 0 <= row < self._rows):
+            return None, None
+        areas = self._areas
+        for index in reversed(self._cells[row * self._columns + column]):
+            kind, data, area_x, area_y, width, height = areas[index]
+            if kinds is not None and kind not in kinds:
+                continue
+            if area_x < x < area_x + width and area_y < y < area_y + height:
+                return kind, data
+        return None, None
@@ -0,0 +1,130 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+#
+# The class LabelCache store the labels with the room names displayed
+# over the doors, already rendered in a surface.
+#
+# The labels are identified by (text, max_width, font), then the font size
+# is calculated and the text rendered only the first time a label is used.
+# When a room is renamed, the label with the old name is removed.
+
+import cairo
+
+from surfacecache import SurfaceCache
+
+MAX_FONT_SIZE = 20
+MIN_FONT_SIZE = 1
+
+# memory used to store the labels rendered
+LABEL_CACHE_BYTES = 1024 * 1024
+
+
+class LabelCache():
+
+    def __init__(self, max_bytes=LABEL_CACHE_BYTES):
+        self._surfaces = SurfaceCache(max_bytes)
+        self._font_sizes = {}
+        # a context only used to measure the text
+        self._measure_ctx = cairo.Context(
+                cairo.ImageSurface(cairo.FORMAT_ARGB32, 1, 1))
+
+    def clear(self):
+        self._surfaces.clear()
+        self._font_sizes = {}
+
+    def remove_text(self, text):
+        """ Remove the labels with the text, used when a room is renamed"""
+        self._surfaces.remove_if(lambda key: key[0] == text)
+        for key in [key for key in self._font_sizes if key[0] == text]:
+            del self._font_sizes[key]
+
+    def _set_font(self, ctx, font, font_size):
+        if font is not None:
+            ctx.select_font_face(font)
+        ctx.set_font_size(font_size)
+
+    def _get_widest_row_width(self, rows, font, font_size):
+        self._set_font(self._measure_ctx, font, font_size)
+        return max(self._measure_ctx.text_extents(row)[2] for row in rows)
+
+    def get_font_size(self, text, max_width, font=None):
+        """ Return the bigger font size where all the words in the text
+            have a width lower than max_width"""
+        key = (text, max_width, font)
+        if key in self._font_sizes:
+            return self._font_sizes[key]
+        rows = text.split()
+        # the width of the text grows with the font size,
+        # then we can do a binary search
+        low, high = MIN_FONT_SIZE, MAX_FONT_SIZE
+        while low < high:
+            middle = (low + high + 1) / 2
+            if self._get_widest_row_width(rows, font, middle) > max_width:
+                high = middle - 1
+            else:
+                low = middle
+        self._font_sizes[key] = low
+        return low
+
+    def get_label(self, text, max_width, margin, font=None):
+        """ Return (surface, x, y) with the text rendered in rows inside
+            a box, x, y are the position of the center of the text
+            in the surface"""
+        key = (text, max_width, font, margin)
+        label = self._surfaces.get(key)
+        if label is None:
+            label = self._render_label(text, max_width, margin, font)
+            surface, x, y = label
+            self._surfaces.put(key, label, surface.get_width(),
+                    surface.get_height())
+        return label
+
+    def _render_label(self, text, max_width, margin, font):
+        font_size = self.get_font_size(text, max_width, font)
+        rows = text.split()
+        self._set_font(self._measure_ctx, font, font_size)
+        extents = [self._measure_ctx.text_extents(row) for row in rows]
+
+        # same layout used before in MapNavView.draw_centered_text,
+        # with the center of the text in 0, 0
+        text_width = max(width for (xb, yb, width, height, xa, ya)
+                in extents)
+        text_height = sum(height for (xb, yb, width, height, xa, ya)
+                in extents)
+        box = (-text_width / 2 - margin, -text_height / 2,
+                text_width + margin * 2, text_height + margin)
+        positions = []
+        for i, (xb, yb, width, height, xa, ya) in enumerate(extents):
+            positions.append((-width / 2,
+                    (i - len(rows) / 2 + 1) * height))
+
+        # the surface include the box and the text
+        left, top = box[0], box[1]
+        right, bottom = box[0] + box[2], box[1] + box[3]
+        for (x, y), (xb, yb, width, height, xa, ya) in \
+                zip(positions, extents):
+            left = min(left, x + xb)
+            top = min(top, y + yb)
+            right = max(right, x + xb + width)
+            bottom = max(bottom, y + yb + height)
+        # space for the line of the box
+        left, top = int(left) - 2, int(top) - 2
+        right, bottom = int(right) + 2, int(bottom) + 2
+
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, right - left,
+                bottom - top)
+        ctx = cairo.Context(surface)
+        ctx.translate(-left, -top)
+        ctx.rectangle(*box)
+        ctx.set_source_rgb(1, 1, 1)
+        ctx.fill_preserve()
+        ctx.set_source_rgb(0, 0, 0)
+        ctx.stroke()
+
+        self._set_font(ctx, font, font_size)
+        for (x, y), row in zip(positions, rows):
+            ctx.move_to(x, y)
+            ctx.show_text(row)
+        return surface, -left, -top
@@ -7,16 +7,23 @@
 
 from gi.repository import Gtk
 from gi.repository import Gdk
-from gi.repository import GdkPixbuf
 from gi.repository import GObject
-import logging
-from gi.repository import Rsvg
+import cairo
 
 from sugar3.graphics import style
 
-from game_map import GameMap
+from game_map import GameMap, ROOM_RENAMED, CELLS_CHANGED, \
+        DOOR_INFO_CHANGED
+from world import MAIN_MAP
+from model import POSITION_VISITED
 from character import Character
 from stateview import StateView
+from surfacecache import SurfaceCache
+from wallview import WallRenderer
+from hotspots import HotspotMap
+import hotspots as hotspots_module
+from animation import AnimationScheduler
+import tracing
 import mapview
 
 WIDTH_CONTROL_LINES = 2
@@ -25,6 +32,31 @@ RESIZE_HANDLE_SIZE = 10
 SELECTION_MODE_MOVE = 1
 SELECTION_MODE_RESIZE = 2
 
+# memory used to store the walls already rendered
+WALL_CACHE_BYTES = 16 * 1024 * 1024
+
+# animations used when the user change of wall
+TRANSITION_LEFT = 'left'
+TRANSITION_RIGHT = 'right'
+TRANSITION_DOOR = 'door'
+TRANSITION_DURATION = 0.3
+
+# position of the map displayed in play mode, from the top right corner
+MINIMAP_SIZE = 150
+MINIMAP_Y = 30
+# if the map is too big to display all in the minimap with cells
+# of this size, only the part around the user is displayed
+MINIMAP_MIN_CELL_SIZE = 6
+
+
+# areas used to move the character in play mode
+NAVIGATION_HOTSPOTS = (hotspots_module.DOOR, hotspots_module.LEFT_WALL,
+        hotspots_module.RIGHT_WALL)
+
+HOTSPOT_CURSORS = {hotspots_module.DOOR: Gdk.CursorType.SB_UP_ARROW,
+        hotspots_module.LEFT_WALL: Gdk.CursorType.SB_LEFT_ARROW,
+        hotspots_module.RIGHT_WALL: Gdk.CursorType.SB_RIGHT_ARROW}
+
 
 class SelectedObject():
 
@@ -32,16 +64,12 @@ class SelectedObject():
         pass
 
 
-class MapNavView(Gtk.DrawingArea):
+class MapNavView(Gtk.DrawingArea, WallRenderer):
 
     __gsignals__ = {'position-changed': (GObject.SignalFlags.RUN_FIRST,
                           None,
                           ([GObject.TYPE_INT, GObject.TYPE_INT,
                             GObject.TYPE_STRING])),
-                    'map-updated': (GObject.SignalFlags.RUN_FIRST,
-                          None,
-                          ([GObject.TYPE_INT, GObject.TYPE_INT,
-                            GObject.TYPE_STRING])),
                     'resource-clicked': (GObject.SignalFlags.RUN_FIRST,
                           None, ([GObject.TYPE_STRING])),
                     'question-clicked': (GObject.SignalFlags.RUN_FIRST,
@@ -50,28 +78,46 @@ class MapNavView(Gtk.DrawingArea):
     MODE_PLAY = 0
     MODE_EDIT = 1
 
-    def __init__(self, game_map, model, mode=MODE_PLAY):
-        self._game_map = game_map
+    def __init__(self, game_map, model, mode=MODE_PLAY, world=None):
+        WallRenderer.__init__(self, game_map)
         self._model = model
+        # if a GameWorld is set, the doors can go to other maps
+        self._world = world
+        self.map_id = MAIN_MAP
         self.x = 0
         self.y = 0
         self.direction = 'S'
-        self.cache_info = {}
+        # the walls rendered of all the maps, the keys start with the map id
+        self._wall_surfaces = SurfaceCache(WALL_CACHE_BYTES)
+        # map_id -> (game_map, callback connected to the changes,
+        # cache_info) of the maps with walls in the caches
+        self._map_caches = {}
+        self._connect_map(self.map_id, self._game_map)
+        if self._world is not None:
+            # the caches of a map are kept until is removed from memory
+            self._world.connect_evicted(self.__map_evicted_cb)
+        # the minimap and the state view are drawn over the wall,
+        # are stored as (surface, x, y, width, height) until their
+        # content change
+        self._hud_layers = {}
         self.view_mode = mode
         self.selected = None
         super(MapNavView, self).__init__()
         self.set_can_focus(True)
         self.add_events(Gdk.EventMask.KEY_PRESS_MASK | Gdk.EventMask.POINTER_MOTION_MASK |
                 Gdk.EventMask.BUTTON_PRESS_MASK | Gdk.EventMask.BUTTON_RELEASE_MASK |
-                Gdk.EventMask.BUTTON1_MOTION_MASK)
+                Gdk.EventMask.BUTTON1_MOTION_MASK | Gdk.EventMask.SCROLL_MASK)
         self.connect('draw', self.__draw_cb)
         self.connect('key-press-event', self.__key_press_event_cb)
         self.connect('button_press_event', self.__button_press_event_cb)
         self.connect('motion_notify_event', self.__motion_notify_event_cb)
         self.connect('button_release_event', self.__button_release_event_cb)
+        self.connect('scroll-event', self.__scroll_event_cb)
 
         self._character = Character(self)
         self._is_walking = False
+        # run the animations of the character and the transitions
+        self._scheduler = AnimationScheduler(self)
 
         def size_allocate_cb(widget, allocation):
             self.calculate_sizes(allocation.width, allocation.height)
@@ -79,7 +125,10 @@ class MapNavView(Gtk.DrawingArea):
                 character_y = allocation.height - self._grid_size
                 self._character.pos = [style.GRID_CELL_SIZE, character_y]
                 self._character.direction = 1
+                self._update_minimap_origin()
+                self._visit_position()
             self.disconnect(self._setup_handle)
+            self._prefetch_neighbours()
 
         self._setup_handle = self.connect('size_allocate',
                                           size_allocate_cb)
@@ -88,9 +137,198 @@ class MapNavView(Gtk.DrawingArea):
         if self.view_mode == self.MODE_PLAY:
             cell = style.GRID_CELL_SIZE / 2
             self._state_view = StateView(self._model, cell, cell, cell)
+            self._model.connect_changed(self.__model_changed_cb)
+        self.connect('position-changed', self.__position_changed_cb)
+
+        # walls to render in idle time, and counters to know if
+        # the walls are ready when the user arrive
+        self._prefetch_queue = []
+        self._prefetch_source = None
+        self._transition = None
+        # area below the mouse, to change the cursor only when change
+        self._hover_kind = None
+        # area painted with the position of the user in the minimap
+        self._minimap_position_rect = None
+        # cell displayed in the top left corner of the minimap,
+        # used if the map is too big
+        self._minimap_origin = (0, 0)
+        # size of the cells selected with the wheel of the mouse,
+        # None to display all the map if is possible
+        self._minimap_cell_size = None
+        # position where the user started to drag the minimap
+        self._minimap_drag = None
+        self._cursors = {}
+        self.prefetch_stats = {'prefetched': 0, 'hits': 0, 'misses': 0}
 
     def clear_cache(self):
-        self.cache_info = {}
+        """ Remove the walls of the map displayed from the caches"""
+        self.clear_wall_info()
+        map_id = self.map_id
+        self._wall_surfaces.remove_if(lambda key: key[0] == map_id)
+        self._hud_layers = {}
+
+    def _connect_map(self, map_id, game_map):
+        """ Use the caches of the map, are created if not exist"""
+        if map_id in self._map_caches and \
+                self._map_caches[map_id][0] is not game_map:
+            # the map was loaded again
+            self._drop_map_caches(map_id)
+        if not map_id in self._map_caches:
+
+            def changed_cb(game_map, event, keys, details):
+                self.__map_changed_cb(map_id, game_map, event, keys, details)
+
+            game_map.connect_changed(changed_cb)
+            self._map_caches[map_id] = (game_map, changed_cb, {})
+        self.cache_info = self._map_caches[map_id][2]
+
+    def _drop_map_caches(self, map_id):
+        """ Remove the walls of the map from the caches"""
+        if not map_id in self._map_caches:
+            return
+        game_map, changed_cb, cache_info = self._map_caches.pop(map_id)
+        game_map.disconnect_changed(changed_cb)
+        for info in cache_info.values():
+            self._release_wall_info(info)
+        cache_info.clear()
+        self._wall_surfaces.remove_if(lambda key: key[0] == map_id)
+
+    def __map_evicted_cb(self, map_id, game_map):
+        if map_id == self.map_id:
+            # the map is still displayed, only the caches are cleared
+            self.clear_cache()
+            self.queue_draw()
+        else:
+            self._drop_map_caches(map_id)
+
+    def __model_changed_cb(self, model, event, keys, details):
+        # the visited positions are displayed only in the minimap
+        if event != POSITION_VISITED:
+            self._invalidate_hud_layer('state')
+
+    def __position_changed_cb(self, nav_view, x, y, direction):
+        if not hasattr(self, '_width'):
+            return
+        self._update_minimap_origin()
+        if self.view_mode == self.MODE_PLAY:
+            self._visit_position()
+        self._queue_draw_minimap_position()
+        if (self.map_id, x, y, direction, self._width, self._height) in \
+                self._wall_surfaces:
+            self.prefetch_stats['hits'] += 1
+        else:
+            self.prefetch_stats['misses'] += 1
+        self._prefetch_neighbours()
+
+    def _prefetch_neighbours(self):
+        """ Prepare in idle time the walls where the user can go from
+            the actual position"""
+        x, y, direction = self.x, self.y, self.direction
+        positions = [self._game_map.go_left(x, y, direction),
+                self._game_map.go_right(x, y, direction)]
+        if self._game_map.have_door(x, y, direction):
+            map_id, new_x, new_y, new_direction = self._cross_door()
+            if map_id == self.map_id:
+                positions.append((new_x, new_y, new_direction))
+        self._prefetch_queue = positions
+        if self._prefetch_source is None:
+            self._prefetch_source = GObject.idle_add(self._prefetch_next)
+
+    def _prefetch_next(self):
+        # one wall by call, to not block the user interface
+        if self.get_window() is None:
+            self._prefetch_queue = []
+        if self._prefetch_queue:
+            x, y, direction = self._prefetch_queue.pop(0)
+            if (self.map_id, x, y, direction, self._width,
+                    self._height) not in self._wall_surfaces:
+                self._get_wall_surface(x, y, direction)
+                self.prefetch_stats['prefetched'] += 1
+        if self._prefetch_queue:
+            return True
+        self._prefetch_source = None
+        return False
+
+    def get_prefetch_stats(self):
+        """ Return the counters of walls prefetched, and how many times
+            the wall was (hits) or not (misses) ready when the user
+            arrived, with the counters of the walls cache"""
+        stats = dict(self.prefetch_stats)
+        stats['cache_hits'] = self._wall_surfaces.hits
+        stats['cache_misses'] = self._wall_surfaces.misses
+        return stats
+
+    def _create_surface(self, width, height):
+        """ Create a surface compatible with the window, to paint fast"""
+        window = self.get_window()
+        if window is not None:
+            return window.create_similar_surface(cairo.CONTENT_COLOR_ALPHA,
+                    width, height)
+        return cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+
+    def _invalidate_hud_layer(self, name):
+        if name in self._hud_layers:
+            surface, x, y, width, height = self._hud_layers.pop(name)
+            self.queue_draw_area(x, y, width, height)
+
+    def set_game_map(self, map_id, game_map):
+        if self._world is None:
+            # without world the maps are never removed from memory,
+            # the caches of the previous map are not kept
+            self._drop_map_caches(self.map_id)
+        self.map_id = map_id
+        self._game_map = game_map
+        self._connect_map(map_id, game_map)
+        self._hud_layers = {}
+        self._minimap_origin = (0, 0)
+        if hasattr(self, '_width'):
+            self._update_minimap_origin()
+        self.queue_draw()
+
+    def __map_changed_cb(self, map_id, game_map, event, keys, details):
+        if event == ROOM_RENAMED:
+            self._labels.remove_text(details['old'])
+        if map_id != self.map_id:
+            # a map not displayed, only the caches are updated
+            if keys is None:
+                self._drop_map_caches(map_id)
+                return
+            cache_info = self._map_caches[map_id][2]
+            for x, y, direction in keys:
+                key = str(x) + direction + str(y)
+                if key in cache_info:
+                    self._release_wall_info(cache_info.pop(key))
+                self._wall_surfaces.remove_if(lambda surface_key:
+                        surface_key[:4] == (map_id, x, y, direction))
+            return
+        if event in (CELLS_CHANGED, DOOR_INFO_CHANGED):
+            # only the walls and doors are displayed in the minimap
+            self._invalidate_hud_layer('minimap')
+        if keys is None:
+            self.clear_cache()
+            self.queue_draw()
+            return
+        for x, y, direction in keys:
+            self.update_wall_info(x, y, direction,
+                    redraw=(x, y, direction) == \
+                        (self.x, self.y, self.direction))
+
+    def _cross_door(self):
+        """ Return the map id and the position after cross the door
+            in front of the user"""
+        if self._world is not None:
+            return self._world.cross_door(self.map_id, self.x, self.y,
+                    self.direction)
+        new_x, new_y, new_direction = self._game_map.cross_door(self.x,
+                self.y, self.direction)
+        return self.map_id, new_x, new_y, new_direction
+
+    def _change_map(self, map_id):
+        """ Display other map of the world, after cross a portal,
+            the position need be set after it"""
+        self.set_game_map(map_id, self._world.get_map(map_id))
+        # force the position update
+        self.x, self.y, self.direction = -1, -1, None
 
     def __key_press_event_cb(self, widget, event):
         keyname = Gdk.keyval_name(event.keyval)
@@ -103,8 +341,9 @@ class MapNavView(Gtk.DrawingArea):
 
         new_x, new_y, new_direction = self.x, self.y, self.direction
         if keyname == 'Up' or keyname == 'KP_Up':
-            new_x, new_y, new_direction = \
-                    self._game_map.cross_door(x, y, self.direction)
+            new_map_id, new_x, new_y, new_direction = self._cross_door()
+            if new_map_id != self.map_id:
+                self._change_map(new_map_id)
 
         elif keyname == 'Down' or keyname == 'KP_Down':
             reversed_direction = \
@@ -134,106 +373,128 @@ class MapNavView(Gtk.DrawingArea):
         return True
 
     def __button_press_event_cb(self, widget, event):
+        if self.view_mode == self.MODE_PLAY and \
+                self._is_in_minimap(event.x, event.y):
+            # the minimap is dragged, the character does not walk
+            self._minimap_drag = (event.x, event.y)
+            return True
         info_walls = self.get_information_walls(self.x, self.y,
                 self.direction)
-        for wall_object in info_walls['objects']:
-            wall_x, wall_y = wall_object['wall_x'], wall_object['wall_y']
-            wall_x, wall_y = self.wall_to_view(wall_x, wall_y)
-            width, height = wall_object['width'], wall_object['height']
-            # check if is over the image
-            if wall_x < event.x < wall_x + width and \
-                wall_y < event.y < wall_y + height:
-                if self.view_mode == self.MODE_EDIT:
-                    # in edit mode prepare to move the object
-                    self.selected = SelectedObject()
-                    self.selected.data = wall_object
-                    self.selected.dx = wall_x - event.x
-                    self.selected.dy = wall_y - event.y
-                    self.selected.mode = SELECTION_MODE_MOVE
-                    self.update_wall_info(self.x, self.y, self.direction)
-                else:
-                    # in play mode trigger event
-                    if 'type_object' in wall_object:
-                        if wall_object['type_object'] == 'resource':
-                            self.emit('resource-clicked',
-                                    wall_object['id_object'])
-                        if wall_object['type_object'] == 'question':
-                            self.emit('question-clicked',
-                                    wall_object['id_object'])
-
+        hotspots = self._get_hotspots(info_walls)
+        kind, wall_object = hotspots.find(event.x, event.y,
+                (hotspots_module.OBJECT, hotspots_module.RESIZE_HANDLE))
+        if kind == hotspots_module.RESIZE_HANDLE:
+            self.selected = SelectedObject()
+            self.selected.data = wall_object
+            self.selected.mode = SELECTION_MODE_RESIZE
+            self.selected.x = event.x
+            self.selected.y = event.y
+            self.update_wall_info(self.x, self.y, self.direction)
+        elif kind == hotspots_module.OBJECT:
             if self.view_mode == self.MODE_EDIT:
-                # check resize
-                if wall_x - RESIZE_HANDLE_SIZE / 2 < event.x < \
-                        wall_x + RESIZE_HANDLE_SIZE / 2 and \
-                    wall_y - RESIZE_HANDLE_SIZE / 2 < event.y < \
-                        wall_y + RESIZE_HANDLE_SIZE / 2:
-                    if self.selected is None:
-                        self.selected = SelectedObject()
-                        self.selected.data = wall_object
-                    self.selected.mode = SELECTION_MODE_RESIZE
-                    self.selected.x = event.x
-                    self.selected.y = event.y
-                    self.update_wall_info(self.x, self.y, self.direction)
+                # in edit mode prepare to move the object
+                wall_x, wall_y = self.wall_to_view(wall_object['wall_x'],
+                        wall_object['wall_y'])
+                self.selected = SelectedObject()
+                self.selected.data = wall_object
+                self.selected.dx = wall_x - event.x
+                self.selected.dy = wall_y - event.y
+                self.selected.mode = SELECTION_MODE_MOVE
+                self.update_wall_info(self.x, self.y, self.direction)
+            else:
+                # in play mode trigger event
+                if 'type_object' in wall_object:
+                    tracing.trace(tracing.INPUT, '%s %s clicked',
+                            wall_object['type_object'],
+                            wall_object['id_object'])
+                    if wall_object['type_object'] == 'resource':
+                        self.emit('resource-clicked',
+                                wall_object['id_object'])
+                    if wall_object['type_object'] == 'question':
+                        self.emit('question-clicked',
+                                wall_object['id_object'])
 
         if self.view_mode == self.MODE_PLAY and not self._is_walking:
-            # verify doors
-            if self._check_over_door(info_walls, event.x, event.y):
-                logging.error('Door clicked')
-                new_x, new_y, new_direction = self._game_map.cross_door(
-                        self.x, self.y, self.direction)
+            kind, data = hotspots.find(event.x, event.y,
+                    NAVIGATION_HOTSPOTS)
+            if kind == hotspots_module.DOOR:
+                tracing.trace(tracing.INPUT, 'door clicked %d %d %s', self.x,
+                        self.y, self.direction)
+                new_map_id, new_x, new_y, new_direction = self._cross_door()
                 self._new_wall_char_position = int(event.x)
                 self._move_character(event.x, new_x,
-                        new_y, new_direction)
+                        new_y, new_direction, new_map_id,
+                        transition=TRANSITION_DOOR)
             # verify lateral walls
-            elif self._check_left_wall(event.x):
-                logging.error('Left wall clicked')
+            elif kind == hotspots_module.LEFT_WALL:
+                tracing.trace(tracing.INPUT, 'left wall clicked')
                 new_x, new_y, new_direction = self._game_map.go_left(self.x,
                         self.y, self.direction)
                 char_finish = 0
                 if info_walls['wall_ccw']:
                     char_finish = self._grid_size - 1
                 self._new_wall_char_position = self._width - self._grid_size \
-                        - self._character.sprite.cel_width
-                self._move_character(char_finish, new_x, new_y, new_direction)
+                        - self._character.width
+                self._move_character(char_finish, new_x, new_y, new_direction,
+                        transition=TRANSITION_LEFT)
 
-            elif self._check_right_wall(event.x):
-                logging.error('Right wall clicked')
+            elif kind == hotspots_module.RIGHT_WALL:
+                tracing.trace(tracing.INPUT, 'right wall clicked')
                 new_x, new_y, new_direction = self._game_map.go_right(self.x,
                         self.y, self.direction)
-                char_width = self._character.sprite.cel_width
+                char_width = self._character.width
                 char_finish = self._width - char_width + 1
                 if info_walls['wall_cw']:
                     char_finish = char_finish - self._grid_size
                 self._new_wall_char_position = self._grid_size
-                self._move_character(char_finish, new_x, new_y, new_direction)
+                self._move_character(char_finish, new_x, new_y, new_direction,
+                        transition=TRANSITION_RIGHT)
             else:
                 self._move_character(event.x, self.x, self.y, self.direction)
 
-    def _check_over_door(self, info_walls, x, y):
-        # verify doors
+    def _get_hotspots(self, info_walls):
+        """ Return the HotspotMap of the wall, is created the first time
+            and stored with the information of the wall"""
+        hotspots = info_walls.get('hotspots')
+        if hotspots is not None and hotspots.width == self._width and \
+                hotspots.height == self._height:
+            return hotspots
+        hotspots = HotspotMap(self._width, self._height)
+        hotspots.add(hotspots_module.LEFT_WALL, -1, -1, self._grid_size + 1,
+                self._height + 2)
+        hotspots.add(hotspots_module.RIGHT_WALL,
+                self._width - self._grid_size, -1, self._grid_size + 1,
+                self._height + 2)
         if info_walls['have_door'] != []:
-            door_x = self._get_door_x()
-            door_y = self._get_door_y()
-            door_width = self._grid_size * self._door_width
-            door_height = self._grid_size * self._door_height
-            if door_x < x < door_x + door_width and \
-                door_y < y < door_y + door_height:
-                return True
-        return False
-
-    def _check_left_wall(self, x):
-        return x < self._grid_size
-
-    def _check_right_wall(self, x):
-        return x > self._width - self._grid_size
+            hotspots.add(hotspots_module.DOOR,
+                    self._get_door_x(self.direction), self._get_door_y(),
+                    self._grid_size * self._door_width,
+                    self._grid_size * self._door_height)
+        # the objects are added in the same order are drawn
+        for wall_object in info_walls['objects']:
+            wall_x, wall_y = self.wall_to_view(wall_object['wall_x'],
+                    wall_object['wall_y'])
+            width, height = self.get_object_size(wall_object)
+            hotspots.add(hotspots_module.OBJECT, wall_x, wall_y, width,
+                    height, wall_object)
+            if self.view_mode == self.MODE_EDIT:
+                hotspots.add(hotspots_module.RESIZE_HANDLE,
+                        wall_x - RESIZE_HANDLE_SIZE / 2,
+                        wall_y - RESIZE_HANDLE_SIZE / 2,
+                        RESIZE_HANDLE_SIZE, RESIZE_HANDLE_SIZE, wall_object)
+        info_walls['hotspots'] = hotspots
+        return hotspots
 
     def _move_character(self, character_destination, new_map_x, new_map_y,
-            new_map_direction):
+            new_map_direction, new_map_id=None, transition=None):
         """
         Move the character to the next position,
         if needed, because the character is going to another wall or
-        to a door, change the map view position
+        to a door, change the map view position, animated with
+        the transition (TRANSITION_LEFT, TRANSITION_RIGHT or TRANSITION_DOOR)
         """
+        # the character is drawn with other frame
+        self._queue_draw_character()
         character_pos = self._character.pos[0]
         if character_destination < character_pos:
             self._character.direction = -1
@@ -241,24 +502,121 @@ class MapNavView(Gtk.DrawingArea):
             self._character.direction = 1
         self._character_destination = character_destination
         self._new_map_position = (new_map_x, new_map_y, new_map_direction)
-        GObject.timeout_add(100, self._update_timer)
-
-    def _update_timer(self):
+        if new_map_id is None:
+            new_map_id = self.map_id
+        self._new_map_id = new_map_id
+        self._new_transition = transition
         self._is_walking = True
-        if self.is_drawable():
-            rect = self._character.update()
-            self.queue_draw_area(*rect)
-        finish = abs(self._character_destination - self._character.pos[0]) < \
-                self._character.speed
+        self._character.walk()
+        self._scheduler.add(self._walk_step)
+
+    def _update_character(self, elapsed):
+        # redraw the area used by the character before and after move
+        old_x, old_y, old_width, old_height = self._character.get_rect()
+        new_x, new_y, new_width, new_height = \
+                self._character.update(elapsed)
+        x, y = int(min(old_x, new_x)), int(min(old_y, new_y))
+        width = int(max(old_x + old_width, new_x + new_width)) - x + 1
+        height = int(max(old_y + old_height, new_y + new_height)) - y + 1
+        self.queue_draw_area(x, y, width, height)
+
+    def _jump_step(self, elapsed):
+        # finish if the jump ended or the user started to walk
+        if self._character.get_animation() != 'jump':
+            return False
+        self._update_character(elapsed)
+        return True
+
+    def _walk_step(self, elapsed):
+        self._update_character(elapsed)
+        finish = (self._character_destination - self._character.pos[0]) * \
+                self._character.direction <= 0
         if finish:
             self._is_walking = False
+            self._queue_draw_character()
+            self._character.stop()
+            self._queue_draw_character()
+            old_surface = self._wall_surfaces.get((self.map_id, self.x,
+                    self.y, self.direction, self._width, self._height))
+            old_direction = self.direction
+            if self._new_map_id != self.map_id:
+                self._change_map(self._new_map_id)
             if (self.x, self.y, self.direction) != self._new_map_position:
                 self.x, self.y, self.direction = self._new_map_position
                 self.emit('position-changed', self.x, self.y, self.direction)
                 self._character.pos[0] = self._new_wall_char_position
+                new_surface = self._wall_surfaces.get((self.map_id, self.x,
+                        self.y, self.direction, self._width, self._height))
+                if self._new_transition is not None and \
+                        old_surface is not None and new_surface is not None:
+                    self._start_transition(self._new_transition,
+                            old_surface, new_surface, old_direction)
+                if self._new_transition == TRANSITION_DOOR:
+                    # the character jump entering in the room
+                    self._character.jump()
+                    self._scheduler.add(self._jump_step)
                 self.queue_draw()
         return not finish
 
+    def _queue_draw_character(self):
+        x, y, width, height = self._character.get_rect()
+        self.queue_draw_area(int(x), int(y), int(width) + 1, int(height) + 1)
+
+    def _start_transition(self, transition, old_surface, new_surface,
+            old_direction):
+        """ Animate the change of wall using the surfaces already rendered,
+            if the surfaces are not ready, the wall is changed without
+            animation"""
+        # the door in the old wall is the center of the zoom
+        door_x = self._get_door_x(old_direction) + \
+                self._grid_size * self._door_width / 2
+        door_y = self._get_door_y() + \
+                self._grid_size * self._door_height / 2
+        self._transition = {'type': transition, 'old': old_surface,
+                'new': new_surface, 'progress': 0.0,
+                'center': (door_x, door_y)}
+        self._scheduler.add(self._transition_step)
+
+    def _transition_step(self, elapsed):
+        if self._transition is None:
+            return False
+        progress = self._transition['progress'] + \
+                elapsed / TRANSITION_DURATION
+        self.queue_draw()
+        if progress >= 1:
+            self._transition = None
+            return False
+        self._transition['progress'] = progress
+        return True
+
+    def _draw_transition(self, ctx):
+        transition = self._transition
+        progress = transition['progress']
+        ctx.save()
+        if transition['type'] == TRANSITION_DOOR:
+            # zoom the old wall to the door while the new wall appear
+            ctx.set_source_surface(transition['new'], 0, 0)
+            ctx.paint()
+            door_x, door_y = transition['center']
+            scale = 1.0 + progress * 2
+            ctx.translate(door_x, door_y)
+            ctx.scale(scale, scale)
+            ctx.translate(-door_x, -door_y)
+            ctx.set_source_surface(transition['old'], 0, 0)
+            ctx.paint_with_alpha(1.0 - progress)
+        else:
+            # slide the walls, turning left the new wall come from the left
+            offset = int(self._width * progress)
+            if transition['type'] == TRANSITION_LEFT:
+                old_x, new_x = offset, offset - self._width
+            else:
+                old_x, new_x = -offset, self._width - offset
+            ctx.set_source_surface(transition['old'], old_x, 0)
+            ctx.paint()
+            ctx.set_source_surface(transition['new'], new_x, 0)
+            ctx.paint()
+        ctx.restore()
+
     def __motion_notify_event_cb(self, widget, event):
         if self.view_mode == self.MODE_EDIT:
             if self.selected is not None:
@@ -268,395 +626,261 @@ class MapNavView(Gtk.DrawingArea):
                     x = event.x + self.selected.dx
                     y = event.y + self.selected.dy
                     wall_x, wall_y = self.view_to_wall(x, y)
-                    self.selected.data['original']['wall_x'] = wall_x
-                    self.selected.data['original']['wall_y'] = wall_y
-                    self.update_wall_info(self.x, self.y, self.direction)
+                    self._game_map.move_object(self.x, self.y,
+                            self.direction, self.selected.data['original'],
+                            wall_x, wall_y)
                 elif self.selected.mode == SELECTION_MODE_RESIZE:
                     wall_scale = self.selected.data['original']['wall_scale']
                     if event.x > self.selected.x and event.y > self.selected.y:
                         if wall_scale >= 0.05:
-                            self.selected.data['original']['wall_scale'] = \
-                                wall_scale - 0.01
+                            wall_scale = wall_scale - 0.01
                     else:
-                        self.selected.data['original']['wall_scale'] = \
-                                wall_scale + 0.01
-                    self.update_wall_info(self.x, self.y, self.direction)
-        if self.view_mode == self.MODE_PLAY:
+                        wall_scale = wall_scale + 0.01
+                    self._game_map.resize_object(self.x, self.y,
+                            self.direction, self.selected.data['original'],
+                            wall_scale)
+        if self.view_mode == self.MODE_PLAY and \
+                self._minimap_drag is not None:
+            self._drag_minimap(event.x, event.y)
+        elif self.view_mode == self.MODE_PLAY:
             info_walls = self.get_information_walls(self.x, self.y,
                     self.direction)
-            if self._check_over_door(info_walls, event.x, event.y):
-                self.get_window().set_cursor(Gdk.Cursor.new(Gdk.SB_UP_ARROW))
-            # verify lateral walls
-            elif self._check_left_wall(event.x):
-                self.get_window().set_cursor(Gdk.Cursor.new(Gdk.SB_LEFT_ARROW))
-            elif self._check_right_wall(event.x):
-                self.get_window().set_cursor(Gdk.Cursor.new(Gdk.SB_RIGHT_ARROW))
-            else:
-                self.get_window().set_cursor(None)
+            kind, data = self._get_hotspots(info_walls).find(event.x,
+                    event.y, NAVIGATION_HOTSPOTS)
+            # the cursor is changed only when the mouse go to other area
+            if kind != self._hover_kind:
+                self._hover_kind = kind
+                cursor_type = HOTSPOT_CURSORS.get(kind)
+                if cursor_type is None:
+                    self.get_window().set_cursor(None)
+                else:
+                    if not cursor_type in self._cursors:
+                        self._cursors[cursor_type] = Gdk.Cursor.new(
+                                cursor_type)
+                    self.get_window().set_cursor(self._cursors[cursor_type])
 
     def __button_release_event_cb(self, widget, event):
+        self._minimap_drag = None
         if self.selected is not None:
             self.selected.mode = None
 
     def remove_selected_object(self):
         if self.selected is not None:
             wall_object = self.selected.data['original']
+            self.selected = None
             self._game_map.del_object_from_wall(self.x, self.y,
                     self.direction, wall_object)
-            self.update_wall_info(self.x, self.y, self.direction)
-            self.selected = None
-
-    def view_to_wall(self, x, y):
-        # receive int, int and return
-        # float, float from 0 to 100 relative
-        # to the height and width of the view
-        # we save in the model this values and calculate again before display
-        x2 = float(x) * 100.0 / float(self._width)
-        y2 = float(y) * 100.0 / float(self._height)
-        return x2, y2
-
-    def wall_to_view(self, x, y):
-        # receive float, float from 0 to 100 and return
-        # int, int relative to the height and width of the view
-        x2 = x * float(self._width) / 100.0
-        y2 = y * float(self._height) / 100.0
-        return int(x2), int(y2)
-
-    def calculate_sizes(self, width, height):
-        self._width = width
-        self._height = height
-        # used as unity 1/12 of the height
-        self._grid_size = self._height / 12
-        # the door is 3 units width and 6 units hight
-        self._door_width = 3
-        self._door_height = 6
 
     def __draw_cb(self, widget, ctx):
-        rect = self.get_allocation()
-        # set a clip region for the expose event
-        #ctx.rectangle(event.area.x, event.area.y, event.area.width,
-        #        event.area.height)
-        #ctx.clip()
-        #logging.error('expose clipping area %d %d %d %d', event.area.x,
-        #        event.area.y, event.area.width, event.area.height)
-        clip_x, clip_y, clip_width, clip_height = ctx.clip_extents()
-        self.draw(ctx, clip_x, clip_y, clip_width, clip_height)
+        # only the area damaged is painted, composing the layers:
+        # the wall, the minimap and state view, and the character
+        clip_x1, clip_y1, clip_x2, clip_y2 = ctx.clip_extents()
+        with tracing.span(tracing.DRAW, 'draw'):
+            self.draw(ctx, clip_x1, clip_y1, clip_x2 - clip_x1,
+                    clip_y2 - clip_y1)
 
-        if self.view_mode == self.MODE_PLAY:
-            position = {'x': self.x, 'y': self.y, 'direction': self.direction}
-            view_data = {'width': 150, 'height': 150,
-                    'show_position': position, 'x': rect.width - 150, 'y': 30}
-            mapview.draw(ctx, self._game_map, view_data)
-            self._state_view.draw(ctx)
-            self._character.draw(ctx)
+            if self.view_mode == self.MODE_PLAY:
+                for surface, x, y, width, height in \
+                        self._get_hud_layers():
+                    if x < clip_x2 and x + width > clip_x1 and \
+                            y < clip_y2 and y + height > clip_y1:
+                        ctx.set_source_surface(surface, x, y)
+                        ctx.paint()
+                # the user can be outside of the part of the map displayed
+                ctx.save()
+                ctx.rectangle(self._width - MINIMAP_SIZE, MINIMAP_Y,
+                        MINIMAP_SIZE, MINIMAP_SIZE)
+                ctx.clip()
+                mapview.draw_position(ctx, self._game_map,
+                        self._get_minimap_view_data())
+                ctx.restore()
+                self._character.draw(ctx)
         return False
 
-    def receive_update_wall_info(self, mapnav, x, y, direction):
-        self.update_wall_info(x, y, direction, redraw=False)
+    def _get_minimap_view_data(self):
+        # add a border to draw the lines
+        position = {'x': self.x, 'y': self.y, 'direction': self.direction}
+        view_data = {'width': MINIMAP_SIZE, 'height': MINIMAP_SIZE,
+                'show_position': position,
+                'x': self._width - MINIMAP_SIZE, 'y': MINIMAP_Y}
+        cell_size = self._minimap_cell_size
+        if cell_size is None and mapview.get_fit_cell_size(self._game_map,
+                MINIMAP_SIZE, MINIMAP_SIZE) < MINIMAP_MIN_CELL_SIZE:
+            cell_size = MINIMAP_MIN_CELL_SIZE
+        if cell_size is not None:
+            view_data['cell_size'] = cell_size
+            view_data['origin'] = self._minimap_origin
+        return view_data
+
+    def _is_in_minimap(self, x, y):
+        return self._width - MINIMAP_SIZE <= x < self._width and \
+                MINIMAP_Y <= y < MINIMAP_Y + MINIMAP_SIZE
+
+    def zoom_minimap(self, factor):
+        """ Multiply the size of the cells in the minimap by factor,
+            the part displayed is centered in the user"""
+        view_data = self._get_minimap_view_data()
+        self._minimap_cell_size = mapview.zoom_cell_size(self._game_map,
+                MINIMAP_SIZE, MINIMAP_SIZE, view_data.get('cell_size'),
+                factor)
+        self._minimap_origin = (0, 0)
+        self._update_minimap_origin()
+        self._invalidate_hud_layer('minimap')
+        self._queue_draw_minimap_position()
+
+    def pan_minimap(self, cells_x, cells_y):
+        """ Move the part of the map displayed in the minimap"""
+        view_data = self._get_minimap_view_data()
+        if not 'cell_size' in view_data:
+            return
+        origin = mapview.pan_origin(self._game_map, view_data, cells_x,
+                cells_y)
+        if origin != self._minimap_origin:
+            self._minimap_origin = origin
+            self._invalidate_hud_layer('minimap')
+            self._queue_draw_minimap_position()
+
+    def __scroll_event_cb(self, widget, event):
+        if self.view_mode != self.MODE_PLAY or \
+                not self._is_in_minimap(event.x, event.y):
+            return False
+        if event.direction == Gdk.ScrollDirection.UP:
+            self.zoom_minimap(mapview.ZOOM_FACTOR)
+        elif event.direction == Gdk.ScrollDirection.DOWN:
+            self.zoom_minimap(1 / mapview.ZOOM_FACTOR)
+        return True
+
+    def _drag_minimap(self, x, y):
+        view_data = self._get_minimap_view_data()
+        if not 'cell_size' in view_data:
+            return
+        cell_size = view_data['cell_size']
+        start_x, start_y = self._minimap_drag
+        cells_x = int((start_x - x) / cell_size)
+        cells_y = int((start_y - y) / cell_size)
+        if cells_x != 0 or cells_y != 0:
+            self._minimap_drag = (start_x - cells_x * cell_size,
+                    start_y - cells_y * cell_size)
+            self.pan_minimap(cells_x, cells_y)
+
+    def _update_minimap_origin(self):
+        """ If only a part of the map is displayed in the minimap,
+            move it when the user is near of the border"""
+        view_data = self._get_minimap_view_data()
+        if not 'cell_size' in view_data:
+            origin = (0, 0)
+        else:
+            origin = mapview.follow_position(self._game_map, view_data,
+                    self.x, self.y)
+        if origin != self._minimap_origin:
+            self._minimap_origin = origin
+            self._invalidate_hud_layer('minimap')
+
+    def _queue_draw_minimap_position(self):
+        """ Only the old and new position of the user are painted again,
+            the walls of the minimap are in the layer"""
+        if self.view_mode != self.MODE_PLAY:
+            return
+        if self._minimap_position_rect is not None:
+            self.queue_draw_area(*self._minimap_position_rect)
+        self._minimap_position_rect = mapview.get_position_rect(
+                self._game_map, self._get_minimap_view_data())
+        self.queue_draw_area(*self._minimap_position_rect)
+
+    def _visit_position(self):
+        """ Register the position in the model, and if the cell was not
+            visited, remove the fog only in the cell of the minimap"""
+        if not self._model.register_visited_position(self.map_id,
+                self._game_map, self.x, self.y, self.direction):
+            return
+        if 'minimap' in self._hud_layers:
+            surface = self._hud_layers['minimap'][0]
+            view_data = self._get_minimap_view_data()
+            view_data['x'], view_data['y'] = 1, 1
+            mapview.draw_cell(cairo.Context(surface), self._game_map,
+                    view_data, self.x, self.y)
+            self.queue_draw_area(*mapview.get_cell_rect(self._game_map,
+                    self._get_minimap_view_data(), self.x, self.y))
+
+    def _get_hud_layers(self):
+        if not 'minimap' in self._hud_layers:
+            surface = self._create_surface(MINIMAP_SIZE + 2,
+                    MINIMAP_SIZE + 2)
+            view_data = self._get_minimap_view_data()
+            view_data['x'], view_data['y'] = 1, 1
+            ctx = cairo.Context(surface)
+            mapview.draw_walls(ctx, self._game_map, view_data)
+            mapview.draw_fog(ctx, self._game_map, view_data,
+                    self._model.get_visited(self.map_id, self._game_map))
+            self._hud_layers['minimap'] = (surface,
+                    self._width - MINIMAP_SIZE - 1, MINIMAP_Y - 1,
+                    MINIMAP_SIZE + 2, MINIMAP_SIZE + 2)
+        # the questions can be modified in edit mode
+        extents = self._state_view.get_extents()
+        if not 'state' in self._hud_layers or \
+                self._hud_layers['state'][1:] != extents:
+            x, y, width, height = extents
+            surface = self._create_surface(max(width, 1), height)
+            ctx = cairo.Context(surface)
+            ctx.translate(-x, -y)
+            self._state_view.draw(ctx)
+            self._hud_layers['state'] = (surface, x, y, width, height)
+        return self._hud_layers.values()
 
     def update_wall_info(self, x, y, direction, redraw=True):
-        key = str(x) + direction + str(y)
-        if key in self.cache_info:
-            del self.cache_info[key]
-        if self.view_mode == self.MODE_EDIT:
-            self.emit('map-updated', self.x, self.y, self.direction)
+        self._remove_wall_info(str(x) + direction + str(y))
+        map_id = self.map_id
+        self._wall_surfaces.remove_if(
+                lambda key: key[:4] == (map_id, x, y, direction))
         if redraw:
             self.queue_draw()
 
-    def get_information_walls(self, x, y, direction):
-        key = str(x) + direction + str(y)
-        if key in self.cache_info:
-            return self.cache_info[key]
-        else:
-            wall_objects = []
-            objects = self._game_map.get_wall_info(x, y, direction)
-            for wall_object in objects:
-                image_file_name = wall_object['image_file_name']
-                new_dict = {}
-                new_dict.update(wall_object)
-                new_dict['original'] = wall_object
-                if image_file_name.endswith('.svg'):
-                    # create a new dict to add the svg handle
-                    # can't be in the model because can't be put in the json
-                    if not 'svg_image_cache' in wall_object:
-                        svg = Rsvg.Handle.new_from_file(image_file_name)
-                        new_dict['svg_image_cache'] = svg
-                else:
-                    if not 'pxb_image_cache' in wall_object:
-                        pxb = GdkPixbuf.Pixbuf.new_from_file(image_file_name)
-                        new_dict['pxb_image_cache'] = pxb
-
-                wall_objects.append(new_dict)
-
-            # have door?
-            have_door = self._game_map.have_door(x, y, direction)
-            # there are a page at cw direction?
-            cw_direction = self._game_map.get_direction_cw(direction)
-            wall_cw = self._game_map.get_wall_info(x, y, cw_direction) is \
-                    not None
-            # there are a page at ccw direction?
-            ccw_direction = self._game_map.get_direction_ccw(direction)
-            wall_ccw = self._game_map.get_wall_info(x, y, ccw_direction) is \
-                    not None
-            # Wall color?
-            wall_color = self._game_map.get_wall_color(x, y)
-            info = {'have_door': have_door, 'wall_cw': wall_cw,
-                    'wall_ccw': wall_ccw, 'wall_color': wall_color,
-                    'objects': wall_objects}
-            self.cache_info[key] = info
-            return info
+    def _get_wall_surface(self, x, y, direction):
+        """ Return a surface with the wall rendered, from the cache
+            or rendered if is not in the cache"""
+        key = (self.map_id, x, y, direction, self._width, self._height)
+        surface = self._wall_surfaces.get(key)
+        if surface is None:
+            tracing.count(tracing.DRAW, 'wall_cache_miss')
+            tracing.trace(tracing.DRAW, 'render wall %d %d %s', x, y,
+                    direction)
+            surface = self._create_surface(self._width, self._height)
+            ctx = cairo.Context(surface)
+            with tracing.span(tracing.DRAW, 'render_wall'):
+                self.render_wall(ctx, x, y, direction)
+            self._wall_surfaces.put(key, surface, self._width, self._height)
+        return surface
 
     def draw(self, ctx, clip_x, clip_y, clip_width, clip_height):
-        def darken(color, factor=0.8):
-            return tuple(c * factor for c in color)
+        if self._transition is not None:
+            self._draw_transition(ctx)
+            return
+        surface = self._get_wall_surface(self.x, self.y, self.direction)
         ctx.save()
-        x, y = self.x, self.y
-        info_walls = self.get_information_walls(x, y, self.direction)
-        # draw back wall
-        ctx.rectangle(0, 0, self._width, self._height - self._grid_size)
-        fill = info_walls['wall_color']
-        stroke = (0, 0, 0)
-        ctx.set_source_rgb(*fill)
-        ctx.fill_preserve()
-        ctx.set_source_rgb(*stroke)
-        ctx.stroke()
-
-        # draw floor
-
-        ctx.rectangle(0, self._height - self._grid_size, self._width,
-                self._grid_size)
-        fill = (0, 0, 0)
-        stroke = (1, 1, 1)
-        ctx.set_source_rgb(*fill)
-        ctx.fill_preserve()
-        ctx.set_source_rgb(*stroke)
-        ctx.stroke()
-
-        if info_walls['have_door'] != []:
-            x_door = self._get_door_x()
-            self.draw_door(ctx, x_door, info_walls['have_door'])
-
-        if info_walls['wall_cw']:
-            ctx.move_to(self._width - self._grid_size, 0)
-            ctx.line_to(self._width, 0)
-            ctx.line_to(self._width, self._height)
-            ctx.line_to(self._width - self._grid_size,
-                    self._height - self._grid_size)
-            ctx.close_path()
-            fill = darken(info_walls['wall_color'])
-            stroke = (0, 0, 0)
-            ctx.set_source_rgb(*fill)
-            ctx.fill_preserve()
-            ctx.set_source_rgb(*stroke)
-            ctx.stroke()
-
-        if info_walls['wall_ccw']:
-            ctx.move_to(0, 0)
-            ctx.line_to(self._grid_size, 0)
-            ctx.line_to(self._grid_size,
-                    self._height - self._grid_size)
-            ctx.line_to(0, self._height)
-            ctx.close_path()
-            fill = darken(info_walls['wall_color'])
-            stroke = (0, 0, 0)
-            ctx.set_source_rgb(*fill)
-            ctx.fill_preserve()
-            ctx.set_source_rgb(*stroke)
-            ctx.stroke()
+        ctx.rectangle(clip_x, clip_y, clip_width, clip_height)
+        ctx.clip()
+        ctx.set_source_surface(surface, 0, 0)
+        ctx.paint()
         ctx.restore()
-        if info_walls['objects']:
-            for wall_object in info_walls['objects']:
-                image_file_name = wall_object['image_file_name']
-                wall_x, wall_y = wall_object['wall_x'], wall_object['wall_y']
-                wall_x, wall_y = self.wall_to_view(wall_x, wall_y)
-                wall_scale = wall_object['wall_scale']
-                ctx.save()
-                if image_file_name.endswith('.svg'):
-                    svg = wall_object['svg_image_cache']
-                    scale = float(self._height) * wall_scale / \
-                            float(svg.props.height)
-                    width = int(svg.props.width * scale)
-                    height = int(svg.props.height * scale)
-
-                    # verify if is out of the clip area
-                    if wall_x + width < clip_x or \
-                        wall_x > clip_x + clip_width or \
-                        wall_y + height < clip_y or \
-                        wall_y > clip_y + clip_height:
-                        break
-                    #logging.error('Drawing object %s at %d %d w %d h %d',
-                    #        image_file_name, wall_x, wall_y, width, height)
-
-                    ctx.translate(wall_x, wall_y)
-                    ctx.scale(scale, scale)
-                    svg.render_cairo(ctx)
-                else:
-                    pxb = wall_object['pxb_image_cache']
-                    scale = float(self._height) * wall_scale / \
-                            float(pxb.get_height())
-                    width = int(pxb.get_width() * scale)
-                    height = int(pxb.get_height() * scale)
-
-                    # verify if is out of the clip area
-                    if wall_x + width < clip_x or \
-                        wall_x > clip_x + clip_width or \
-                        wall_y + height < clip_y or \
-                        wall_y > clip_y + clip_height:
-                        break
-                    logging.error('Drawing object %s at %d %d w %d h %d',
-                            image_file_name, wall_x, wall_y, width, height)
-
-                    ctx.translate(wall_x, wall_y)
-                    ctx.scale(scale, scale)
-                    Gdk.cairo_set_source_pixbuf(ctx, pxb, 0, 0)
-                    ctx.paint()
-                wall_object['width'] = width
-                wall_object['height'] = height
-
-                if self.view_mode == self.MODE_EDIT and \
-                    self.selected is not None and \
-                    self.selected.data['original'] == wall_object['original']:
-                    # draw controls
-                    ctx.set_line_width(WIDTH_CONTROL_LINES)
-                    ctx.set_source_rgb(1, 1, 1)
-                    ctx.rectangle(wall_x - 2, wall_y - 2,
-                            width + 4, height + 4)
-                    ctx.stroke()
-                    ctx.set_source_rgb(1, 1, 1)
-                    ctx.rectangle(wall_x - RESIZE_HANDLE_SIZE / 2,
-                            wall_y - RESIZE_HANDLE_SIZE / 2,
-                            RESIZE_HANDLE_SIZE, RESIZE_HANDLE_SIZE)
-                    ctx.stroke()
-                ctx.restore()
 
-    def _get_door_x(self):
-        if self.direction in ('N', 'W'):
-            # door is at rigth of the wall
-            return self._width - self._grid_size * (self._door_width + 2)
-        else:
-            return self._grid_size * 2
-
-    def _get_door_y(self):
-        return self._height - self._grid_size * (self._door_height + 1)
-
-    def draw_door(self, ctx, x, doors):
-        y = self._get_door_y()
-        ctx.rectangle(x, y, self._grid_size * self._door_width,
-                self._grid_size * self._door_height)
-        fill = (style.Color('#8B6914').get_rgba())
-        stroke = (0, 0, 0)
-        ctx.set_source_rgba(*fill)
-        ctx.fill_preserve()
-        ctx.set_source_rgb(*stroke)
-        ctx.stroke()
-
-        # frame
-        frame_width = self._grid_size * self._door_width / 8
-        fill = (style.Color('#6B4904').get_rgba())
-        ctx.set_source_rgba(*fill)
-        ctx.rectangle(x, y, self._grid_size * self._door_width, frame_width)
-        ctx.fill()
-        ctx.rectangle(x, y, frame_width, self._grid_size * self._door_height)
-        ctx.fill()
-        ctx.rectangle(x + self._grid_size * self._door_width - frame_width, y,
-                frame_width, self._grid_size * self._door_height)
-        ctx.fill()
-
-        # handle
-        if self.direction in ('N', 'W'):
-            # door is at rigth of the wall
-            x_handle = x + frame_width * 1.5
-        else:
-            x_handle = x + self._grid_size * self._door_width - \
-                    frame_width * 2.5
-        y_handle = y + self._grid_size * self._door_height / 2
-
-        ctx.rectangle(x_handle, y_handle, frame_width, frame_width / 4)
-        ctx.fill()
-
-        # draw room name
-        room_key = self._game_map.get_next_room(self.x, self.y, self.direction)
-        room_name = self._game_map.get_room_name(room_key)
-        if room_name != '':
-            x_text = x + self._grid_size * self._door_width / 2
-            y_text = y + self._grid_size * self._door_height / 4
-            door_info = self._game_map.get_door_info(doors[0], self.direction)
-            if 'room_name' in door_info:
-                # check if the room  name has changed
-                if door_info['room_name'] != room_name:
-                    door_info = {}
-            if 'font_size' in door_info:
-                font_size = door_info['font_size']
-                logging.error('take font_size from door_info %d', font_size)
-            else:
-                max_width = self._grid_size * self._door_width / 2
-                font_size = self.calculate_font_size(ctx, max_width, room_name)
-                door_info['font_size'] = font_size
-                door_info['room_name'] = room_name
-                self._game_map.set_door_info(doors[0], self.direction,
-                        door_info)
-                self.update_wall_info(self.x, self.y, self.direction,
-                        redraw=False)
-            self.draw_centered_text(ctx, x_text, y_text, room_name, font_size)
-
-    def calculate_font_size(self, ctx, max_width, text):
-        # get the widest row
-        font_size = 20
-        ctx.set_font_size(font_size)
-        widest_row = ''
-        max_row_width = 0
-        rows = text.split()
-        for row in rows:
-            xbearing, ybearing, width, height, xadvance, yadvance = \
-                    ctx.text_extents(row)
-            if width > max_row_width:
-                widest_row = row
-                max_row_width = width
-        # calculate font size
-        xbearing, ybearing, width, height, xadvance, yadvance = \
-                ctx.text_extents(widest_row)
-
-        while width > max_width:
-            font_size -= 1
-            ctx.set_font_size(font_size)
-            xbearing, ybearing, width, height, xadvance, yadvance = \
-                    ctx.text_extents(widest_row)
-        return font_size
-
-    def draw_centered_text(self, ctx, x, y, text, font_size, with_border=True):
-        ctx.set_font_size(font_size)
-        rows = text.split()
-
-        # calc text size
-        if with_border:
+        if self.view_mode == self.MODE_EDIT and self.selected is not None:
+            # draw controls
+            wall_object = self.selected.data
+            wall_x, wall_y = self.wall_to_view(
+                    wall_object['original']['wall_x'],
+                    wall_object['original']['wall_y'])
+            width, height = self.get_object_size(wall_object)
             ctx.save()
-            text_width = 0
-            text_height = 0
-            for i, row in enumerate(rows):
-                logging.error('row "%s"', row)
-                xbearing, ybearing, width, height, xadvance, yadvance = \
-                ctx.text_extents(row.replace(" ", "-"))
-                text_height = text_height + height
-                if width > text_width:
-                    text_width = width
-            margin = self._grid_size * self._door_width / 12
-            ctx.rectangle(x - text_width / 2 - margin,
-                    y - (text_height / 2),
-                    text_width + margin * 2, text_height + margin)
+            ctx.set_line_width(WIDTH_CONTROL_LINES)
             ctx.set_source_rgb(1, 1, 1)
-            ctx.fill_preserve()
-            ctx.set_source_rgb(0, 0, 0)
+            ctx.rectangle(wall_x - 2, wall_y - 2, width + 4, height + 4)
+            ctx.stroke()
+            ctx.rectangle(wall_x - RESIZE_HANDLE_SIZE / 2,
+                    wall_y - RESIZE_HANDLE_SIZE / 2,
+                    RESIZE_HANDLE_SIZE, RESIZE_HANDLE_SIZE)
             ctx.stroke()
             ctx.restore()
 
-        ctx.set_source_rgb(0, 0, 0)
-        for i, row in enumerate(rows):
-            xbearing, ybearing, width, height, xadvance, yadvance = \
-            ctx.text_extents(row.replace(" ", "-"))
-            ctx.move_to(x - width / 2, y + (i - len(rows) / 2 + 1) * height)
-            ctx.show_text(row)
-        ctx.stroke()
-
 
 def show_position(nav_view, x, y, direction, top_view):
     top_view.show_position(x, y, direction)
@@ -5,110 +5,404 @@
 #
 # The class TopMapView draw a map from the top
 
+from math import ceil, floor
+
 from gi.repository import Gtk
-from game_map import GameMap
+from gi.repository import Gdk
+import cairo
+
+from game_map import GameMap, CELLS_CHANGED, DOOR_INFO_CHANGED, \
+        DIRECTION_BITS
 
 # view_data =  width, height, show_position
+# and optionally:
+#   x, y: position of the view in the context
+#   cell_size: size in pixels of the cells, if is not set the map is
+#       scaled to display all the map in the view
+#   origin: (x, y) the cell displayed in the top left corner of the view,
+#       used with cell_size to display a part of the map
+#
+# The walls are drawn in a surface stored until the map is modified,
+# and the position of the user is drawn over it, then when the user
+# moves only the area of the position is painted again.
+#
+# Only the cells inside the view are drawn. When the cells are smaller
+# than LOD_CELL_SIZE, only the limits between the rooms are drawn,
+# checking one of every some cells, then the time used to draw depends
+# on the size of the view and not on the size of the map.
+#
+# The minimap of the game cover with fog the cells not visited,
+# and when the user visit a new cell only that cell is drawn again.
 
+MARKER_BORDER = 3
+MIN_MARKER_SIZE = 8
 
-def draw(ctx, game_map, view_data):
-    # calculate cell size
-    cell_width = view_data['width'] / game_map.data['max_x']
-    cell_height = view_data['height'] / game_map.data['max_y']
-    cell_size = min(cell_width, cell_height)
+# the cells not visited by the user, if the fog is displayed
+FOG_COLOR = (0.35, 0.35, 0.35)
+
+# with cells smaller than this, draw only the limits of the rooms
+LOD_CELL_SIZE = 4
+
+# the zoom of TopMapView, in pixels by cell
+MIN_CELL_SIZE = 1
+MAX_CELL_SIZE = 64
+ZOOM_FACTOR = 1.5
+
+
+def get_fit_cell_size(game_map, width, height):
+    """ Return the size of the cells to display all the map"""
+    cell_size = min(float(width) / game_map.data['max_x'],
+            float(height) / game_map.data['max_y'])
+    if cell_size >= 1:
+        # integer sizes draw the lines in the same pixels
+        return int(cell_size)
+    return cell_size
+
+
+def get_layout(game_map, view_data):
+    """ Return cell_size, margin_x, margin_y used to draw the map,
+        the margins are the position of the cell 0, 0"""
+    if 'cell_size' in view_data:
+        cell_size = view_data['cell_size']
+        origin_x, origin_y = view_data.get('origin', (0, 0))
+        margin_x = view_data.get('x', 0) - origin_x * cell_size
+        margin_y = view_data.get('y', 0) - origin_y * cell_size
+        return cell_size, margin_x, margin_y
+
+    cell_size = get_fit_cell_size(game_map, view_data['width'],
+            view_data['height'])
     map_width = cell_size * game_map.data['max_x']
     margin_x = (view_data['width'] - map_width) / 2
     map_height = cell_size * game_map.data['max_y']
     margin_y = (view_data['height'] - map_height) / 2
-    door_width = cell_size / 3
 
     if 'x' in view_data:
         margin_x = view_data['x']
     if 'y' in view_data:
         margin_y = view_data['y']
+    return cell_size, margin_x, margin_y
 
-    # background
-    ctx.rectangle(margin_x, margin_y, map_width, map_height)
+
+def get_visible_cells(game_map, view_data):
+    """ Return x1, y1, x2, y2 the range of cells inside the view
+        (x2 and y2 not included)"""
+    cell_size, margin_x, margin_y = get_layout(game_map, view_data)
+    view_x, view_y = view_data.get('x', 0), view_data.get('y', 0)
+    x1 = max(int(floor((view_x - margin_x) / float(cell_size))), 0)
+    y1 = max(int(floor((view_y - margin_y) / float(cell_size))), 0)
+    x2 = min(int(ceil((view_x + view_data['width'] - margin_x) /
+            float(cell_size))), game_map.data['max_x'])
+    y2 = min(int(ceil((view_y + view_data['height'] - margin_y) /
+            float(cell_size))), game_map.data['max_y'])
+    return x1, y1, x2, y2
+
+
+def follow_position(game_map, view_data, x, y):
+    """ Return the origin to use in view_data to display the cell x, y.
+        The origin is changed only if the cell is near of the border
+        of the view, and then the cell is centered"""
+    cell_size = view_data['cell_size']
+    cells_x = view_data['width'] / float(cell_size)
+    cells_y = view_data['height'] / float(cell_size)
+    origin_x, origin_y = view_data.get('origin', (0, 0))
+
+    def follow(origin, position, cells, max_position):
+        if cells >= max_position:
+            return 0
+        # a margin of a quarter of the view
+        if not origin + cells / 4 <= position < origin + cells * 3 / 4:
+            origin = int(position - cells / 2)
+        return max(min(origin, int(ceil(max_position - cells))), 0)
+
+    return (follow(origin_x, x, cells_x, game_map.data['max_x']),
+            follow(origin_y, y, cells_y, game_map.data['max_y']))
+
+
+def zoom_cell_size(game_map, width, height, cell_size, factor):
+    """ Return the size of the cells after multiply cell_size by factor,
+        or None if all the map can be displayed in the view.
+        cell_size is None if all the map is displayed"""
+    fit_cell_size = get_fit_cell_size(game_map, width, height)
+    if cell_size is None:
+        cell_size = fit_cell_size
+    new_cell_size = cell_size * factor
+    if new_cell_size >= 1:
+        # integer sizes draw the lines in the same pixels
+        new_cell_size = int(round(new_cell_size))
+        if new_cell_size == cell_size:
+            new_cell_size += 1 if factor > 1 else -1
+    new_cell_size = min(max(new_cell_size, MIN_CELL_SIZE), MAX_CELL_SIZE)
+    if new_cell_size <= fit_cell_size:
+        return None
+    return new_cell_size
+
+
+def pan_origin(game_map, view_data, cells_x, cells_y):
+    """ Return the origin of view_data moved cells_x, cells_y cells,
+        without go outside of the map"""
+    cell_size = view_data['cell_size']
+    origin_x, origin_y = view_data.get('origin', (0, 0))
+    max_x = int(ceil(game_map.data['max_x'] -
+            view_data['width'] / float(cell_size)))
+    max_y = int(ceil(game_map.data['max_y'] -
+            view_data['height'] / float(cell_size)))
+    return (max(min(int(origin_x + cells_x), max_x), 0),
+            max(min(int(origin_y + cells_y), max_y), 0))
+
+
+def draw(ctx, game_map, view_data):
+    draw_walls(ctx, game_map, view_data)
+    if view_data['show_position'] is not None:
+        draw_position(ctx, game_map, view_data)
+
+
+def draw_walls(ctx, game_map, view_data):
+    """ Draw the map without the position of the user"""
+    cell_size, margin_x, margin_y = get_layout(game_map, view_data)
+    x1, y1, x2, y2 = get_visible_cells(game_map, view_data)
+    all_visible = (x1, y1, x2, y2) == (0, 0, game_map.data['max_x'],
+            game_map.data['max_y'])
     fill = (0, 0, 0)
     stroke = (1, 1, 1)
 
+    ctx.save()
+    if not all_visible:
+        ctx.rectangle(view_data.get('x', 0), view_data.get('y', 0),
+                view_data['width'], view_data['height'])
+        ctx.clip()
+
+    # background
+    ctx.rectangle(margin_x + x1 * cell_size, margin_y + y1 * cell_size,
+            (x2 - x1) * cell_size, (y2 - y1) * cell_size)
     ctx.set_source_rgb(*fill)
-    ctx.fill_preserve()
+    ctx.fill()
+    ctx.rectangle(margin_x, margin_y, game_map.data['max_x'] * cell_size,
+            game_map.data['max_y'] * cell_size)
     ctx.set_source_rgb(*stroke)
     ctx.stroke()
 
-    # draw cells
-    for x in range(game_map.data['max_x']):
-        for y in range(game_map.data['max_y']):
-            # Draw North
-            direction = 'N'
-            wall_info = game_map.get_wall_info(x, y, direction)
+    if all_visible and cell_size >= LOD_CELL_SIZE:
+        _draw_all_walls(ctx, game_map, cell_size, margin_x, margin_y)
+    else:
+        _draw_cells(ctx, game_map, cell_size, margin_x, margin_y,
+                (x1, y1, x2, y2))
+    ctx.restore()
+
+
+def _draw_cells(ctx, game_map, cell_size, margin_x, margin_y, cells):
+    if cell_size < LOD_CELL_SIZE:
+        _draw_room_limits(ctx, game_map, cell_size, margin_x, margin_y,
+                cells)
+    else:
+        _draw_visible_walls(ctx, game_map, cell_size, margin_x, margin_y,
+                cells)
+
+
+def get_cell_rect(game_map, view_data, x, y):
+    """ Return x, y, width, height of the area of the cell x, y"""
+    cell_size, margin_x, margin_y = get_layout(game_map, view_data)
+    x_pos = margin_x + x * cell_size
+    y_pos = margin_y + y * cell_size
+    return (int(floor(x_pos)), int(floor(y_pos)),
+            int(ceil(x_pos + cell_size)) - int(floor(x_pos)),
+            int(ceil(y_pos + cell_size)) - int(floor(y_pos)))
+
+
+def draw_fog(ctx, game_map, view_data, visited):
+    """ Cover the cells not visited by the user,
+        visited is a VisitedPositions"""
+    cell_size, margin_x, margin_y = get_layout(game_map, view_data)
+    x1, y1, x2, y2 = get_visible_cells(game_map, view_data)
+    ctx.save()
+    ctx.rectangle(view_data.get('x', 0), view_data.get('y', 0),
+            view_data['width'], view_data['height'])
+    ctx.clip()
+    # the cells not visited together in a row are a single rectangle
+    for y in range(y1, y2):
+        y_pos = margin_y + y * cell_size
+        start = None
+        for x in range(x1, x2 + 1):
+            hidden = x < x2 and not visited.is_cell_visited(x, y)
+            if hidden and start is None:
+                start = x
+            elif not hidden and start is not None:
+                ctx.rectangle(margin_x + start * cell_size, y_pos,
+                        (x - start) * cell_size, cell_size)
+                start = None
+    ctx.set_source_rgb(*FOG_COLOR)
+    ctx.fill()
+    ctx.restore()
+
+
+def draw_cell(ctx, game_map, view_data, x, y):
+    """ Draw again only the cell x, y, used to remove the fog
+        when the user visit a cell"""
+    cell_size, margin_x, margin_y = get_layout(game_map, view_data)
+    ctx.save()
+    ctx.rectangle(margin_x + x * cell_size, margin_y + y * cell_size,
+            cell_size, cell_size)
+    ctx.clip()
+    ctx.set_source_rgb(0, 0, 0)
+    ctx.paint()
+    ctx.set_source_rgb(1, 1, 1)
+    ctx.rectangle(margin_x, margin_y, game_map.data['max_x'] * cell_size,
+            game_map.data['max_y'] * cell_size)
+    ctx.stroke()
+    _draw_cells(ctx, game_map, cell_size, margin_x, margin_y,
+            (x, y, x + 1, y + 1))
+    ctx.restore()
+
+
+def _draw_all_walls(ctx, game_map, cell_size, margin_x, margin_y):
+    door_width = cell_size / 3
+
+    # all the walls in a single path
+    for x1, y1, x2, y2 in game_map.get_wall_runs():
+        ctx.move_to(margin_x + x1 * cell_size, margin_y + y1 * cell_size)
+        ctx.line_to(margin_x + x2 * cell_size, margin_y + y2 * cell_size)
+    ctx.stroke()
+
+    # the doors are a hole in the middle of the wall
+    ctx.save()
+    ctx.set_source_rgb(0, 0, 0)
+    ctx.set_line_width(ctx.get_line_width() + 1)
+    for x1, y1, x2, y2 in game_map.get_door_segments():
+        x_pos = margin_x + x1 * cell_size
+        y_pos = margin_y + y1 * cell_size
+        if y1 == y2:
+            ctx.move_to(x_pos + door_width, y_pos)
+            ctx.line_to(x_pos + door_width * 2, y_pos)
+        else:
+            ctx.move_to(x_pos, y_pos + door_width)
+            ctx.line_to(x_pos, y_pos + door_width * 2)
+    ctx.stroke()
+    ctx.restore()
+
+
+def _draw_visible_walls(ctx, game_map, cell_size, margin_x, margin_y,
+        visible_cells):
+    """ Draw the north and west walls of the cells in the view,
+        and the south and east walls of the last row and column"""
+    x1, y1, x2, y2 = visible_cells
+    door_width = cell_size / 3
+    bit_n, bit_e = DIRECTION_BITS['N'], DIRECTION_BITS['E']
+    bit_s, bit_w = DIRECTION_BITS['S'], DIRECTION_BITS['W']
+
+    def horizontal(x_pos, y_pos, door):
+        if door:
+            ctx.move_to(x_pos, y_pos)
+            ctx.line_to(x_pos + door_width, y_pos)
+            ctx.move_to(x_pos + door_width * 2, y_pos)
+        else:
+            ctx.move_to(x_pos, y_pos)
+        ctx.line_to(x_pos + cell_size, y_pos)
+
+    def vertical(x_pos, y_pos, door):
+        if door:
+            ctx.move_to(x_pos, y_pos)
+            ctx.line_to(x_pos, y_pos + door_width)
+            ctx.move_to(x_pos, y_pos + door_width * 2)
+        else:
+            ctx.move_to(x_pos, y_pos)
+        ctx.line_to(x_pos, y_pos + cell_size)
+
+    for y in range(y1, y2):
+        y_pos = margin_y + y * cell_size
+        for x in range(x1, x2):
+            walls = game_map.get_wall_bits(x, y)
+            if not walls:
+                continue
+            doors = game_map.get_door_bits(x, y)
+            x_pos = margin_x + x * cell_size
+            if walls & bit_n:
+                horizontal(x_pos, y_pos, doors & bit_n)
+            if walls & bit_w:
+                vertical(x_pos, y_pos, doors & bit_w)
+            if walls & bit_s and y == y2 - 1:
+                horizontal(x_pos, y_pos + cell_size, doors & bit_s)
+            if walls & bit_e and x == x2 - 1:
+                vertical(x_pos + cell_size, y_pos, doors & bit_e)
+    ctx.stroke()
+
+
+def _draw_room_limits(ctx, game_map, cell_size, margin_x, margin_y,
+        visible_cells):
+    """ Draw a line where the room change, checking only one of every
+        step cells, used when the cells are too small to see the doors"""
+    x1, y1, x2, y2 = visible_cells
+    step = int(ceil(LOD_CELL_SIZE / float(cell_size)))
+    # start in multiples of step, to draw the same lines when the view
+    # is moved
+    x1, y1 = x1 - x1 % step, y1 - y1 % step
+    length = step * cell_size
+    for y in range(y1, y2, step):
+        y_pos = margin_y + y * cell_size
+        for x in range(x1, x2, step):
+            room = game_map.get_room(x, y)
             x_pos = margin_x + x * cell_size
-            y_pos = margin_y + y * cell_size
-            if wall_info is not None:
-                if game_map.have_door(x, y, direction):
-                    # draw door
-                    ctx.move_to(x_pos, y_pos)
-                    ctx.line_to(x_pos + door_width, y_pos)
-                    ctx.stroke()
-                    ctx.move_to(x_pos + door_width * 2, y_pos)
-                    ctx.line_to(x_pos + cell_size, y_pos)
-                else:
-                    ctx.move_to(x_pos, y_pos)
-                    ctx.line_to(x_pos + cell_size, y_pos)
-                ctx.stroke()
-
-            # Draw West
-            direction = 'W'
-            wall_info = game_map.get_wall_info(x, y, direction)
-            if wall_info is not None:
-                if game_map.have_door(x, y, direction):
-                    # draw door
-                    ctx.move_to(x_pos, y_pos)
-                    ctx.line_to(x_pos, y_pos + door_width)
-                    ctx.stroke()
-                    ctx.move_to(x_pos, y_pos + door_width * 2)
-                    ctx.line_to(x_pos, y_pos + cell_size)
-                else:
-                    ctx.move_to(x_pos, y_pos)
-                    ctx.line_to(x_pos, y_pos + cell_size)
-                    ctx.stroke()
+            if x + step < game_map.data['max_x'] and \
+                    game_map.get_room(x + step, y) != room:
+                ctx.move_to(x_pos + length, y_pos)
+                ctx.line_to(x_pos + length, y_pos + length)
+            if y + step < game_map.data['max_y'] and \
+                    game_map.get_room(x, y + step) != room:
+                ctx.move_to(x_pos, y_pos + length)
+                ctx.line_to(x_pos + length, y_pos + length)
+    ctx.stroke()
 
-    if view_data['show_position'] is not None:
-        x = view_data['show_position']['x']
-        y = view_data['show_position']['y']
-        direction = view_data['show_position']['direction']
-        x_pos = margin_x + x * cell_size + cell_size / 2
-        y_pos = margin_y + y * cell_size + cell_size / 2
-        border = 3
-        if direction == 'N':
-            point2_x = margin_x + x * cell_size + border
-            point2_y = margin_y + y * cell_size + border
-            point3_x = margin_x + (x + 1) * cell_size - border
-            point3_y = margin_y + y * cell_size + border
-        elif direction == 'E':
-            point2_x = margin_x + (x + 1) * cell_size - border
-            point2_y = margin_y + y * cell_size + border
-            point3_x = margin_x + (x + 1) * cell_size - border
-            point3_y = margin_y + (y + 1) * cell_size - border
-        elif direction == 'S':
-            point2_x = margin_x + (x + 1) * cell_size - border
-            point2_y = margin_y + (y + 1) * cell_size - border
-            point3_x = margin_x + x * cell_size + border
-            point3_y = margin_y + (y + 1) * cell_size - border
-        elif direction == 'W':
-            point2_x = margin_x + x * cell_size + border
-            point2_y = margin_y + (y + 1) * cell_size - border
-            point3_x = margin_x + x * cell_size + border
-            point3_y = margin_y + y * cell_size + border
-
-        ctx.move_to(x_pos, y_pos)
-        ctx.line_to(point2_x, point2_y)
-        ctx.line_to(point3_x, point3_y)
-        ctx.close_path()
-        fill = (1, 0, 0)
-        ctx.set_source_rgb(*fill)
-        ctx.fill()
+
+def _get_marker_box(game_map, view_data):
+    """ Return x, y, size of the square where the marker is drawn,
+        is the cell of the user, but not smaller than MIN_MARKER_SIZE"""
+    cell_size, margin_x, margin_y = get_layout(game_map, view_data)
+    x = view_data['show_position']['x']
+    y = view_data['show_position']['y']
+    size = max(cell_size, MIN_MARKER_SIZE)
+    return (margin_x + x * cell_size + (cell_size - size) / 2.0,
+            margin_y + y * cell_size + (cell_size - size) / 2.0, size)
+
+
+def get_position_rect(game_map, view_data):
+    """ Return x, y, width, height of the area painted by draw_position"""
+    box_x, box_y, size = _get_marker_box(game_map, view_data)
+    return (int(floor(box_x)) - 1, int(floor(box_y)) - 1,
+            int(ceil(size)) + 3, int(ceil(size)) + 3)
+
+
+def draw_position(ctx, game_map, view_data):
+    box_x, box_y, size = _get_marker_box(game_map, view_data)
+    direction = view_data['show_position']['direction']
+    x_pos = box_x + size / 2
+    y_pos = box_y + size / 2
+    border = MARKER_BORDER
+    if direction == 'N':
+        point2_x = box_x + border
+        point2_y = box_y + border
+        point3_x = box_x + size - border
+        point3_y = box_y + border
+    elif direction == 'E':
+        point2_x = box_x + size - border
+        point2_y = box_y + border
+        point3_x = box_x + size - border
+        point3_y = box_y + size - border
+    elif direction == 'S':
+        point2_x = box_x + size - border
+        point2_y = box_y + size - border
+        point3_x = box_x + border
+        point3_y = box_y + size - border
+    elif direction == 'W':
+        point2_x = box_x + border
+        point2_y = box_y + size - border
+        point3_x = box_x + border
+        point3_y = box_y + border
+
+    ctx.move_to(x_pos, y_pos)
+    ctx.line_to(point2_x, point2_y)
+    ctx.line_to(point3_x, point3_y)
+    ctx.close_path()
+    fill = (1, 0, 0)
+    ctx.set_source_rgb(*fill)
+    ctx.fill()
 
 
 class TopMapView(Gtk.DrawingArea):
@@ -118,29 +412,139 @@ class TopMapView(Gtk.DrawingArea):
         self._width = width
         self._height = height
         self._show_position = None
+        # None to display all the map, or the size of the cells
+        # and the cell in the top left corner
+        self._cell_size = None
+        self._origin = (0, 0)
+        self._drag_start = None
+        # the walls already drawn
+        self._walls_surface = None
         super(TopMapView, self).__init__()
         self.set_size_request(width, height)
+        self.add_events(Gdk.EventMask.SCROLL_MASK |
+                Gdk.EventMask.BUTTON_PRESS_MASK |
+                Gdk.EventMask.BUTTON_RELEASE_MASK |
+                Gdk.EventMask.BUTTON1_MOTION_MASK)
         self.connect('draw', self.__draw_cb)
+        self.connect('scroll-event', self.__scroll_event_cb)
+        self.connect('button-press-event', self.__button_press_event_cb)
+        self.connect('motion-notify-event', self.__motion_notify_event_cb)
+        self.connect('button-release-event', self.__button_release_event_cb)
+        self._game_map.connect_changed(self.__map_changed_cb)
+
+    def __map_changed_cb(self, game_map, event, keys, details):
+        # the objects in the walls are not displayed
+        if event in (CELLS_CHANGED, DOOR_INFO_CHANGED):
+            self._invalidate()
+
+    def _invalidate(self):
+        self._walls_surface = None
+        self.queue_draw()
+
+    def _get_view_data(self):
+        view_data = {'width': self._width, 'height': self._height,
+                'show_position': self._show_position}
+        if self._cell_size is not None:
+            view_data['cell_size'] = self._cell_size
+            view_data['origin'] = self._origin
+        return view_data
+
+    def set_zoom(self, cell_size):
+        """ Display the cells with cell_size pixels,
+            or all the map if cell_size is None"""
+        if cell_size is not None:
+            cell_size = min(max(cell_size, MIN_CELL_SIZE), MAX_CELL_SIZE)
+            if cell_size <= get_fit_cell_size(self._game_map, self._width,
+                    self._height):
+                cell_size = None
+        self._cell_size = cell_size
+        if cell_size is not None and self._show_position is not None:
+            self._origin = (0, 0)
+            self._follow_position()
+        self._invalidate()
+
+    def zoom_in(self):
+        self.set_zoom(zoom_cell_size(self._game_map, self._width,
+                self._height, self._cell_size, ZOOM_FACTOR))
+
+    def zoom_out(self):
+        if self._cell_size is not None:
+            self.set_zoom(zoom_cell_size(self._game_map, self._width,
+                    self._height, self._cell_size, 1 / ZOOM_FACTOR))
+
+    def pan(self, cells_x, cells_y):
+        """ Move the part of the map displayed"""
+        if self._cell_size is None:
+            return
+        self._origin = pan_origin(self._game_map, self._get_view_data(),
+                cells_x, cells_y)
+        self._invalidate()
+
+    def _follow_position(self):
+        """ Move the part of the map displayed to show the user,
+            return True if was moved"""
+        if self._cell_size is None:
+            return False
+        origin = follow_position(self._game_map, self._get_view_data(),
+                self._show_position['x'], self._show_position['y'])
+        if origin == self._origin:
+            return False
+        self._origin = origin
+        return True
+
+    def _queue_draw_position(self):
+        if self._show_position is not None:
+            x, y, width, height = get_position_rect(self._game_map,
+                    self._get_view_data())
+            self.queue_draw_area(x, y, width, height)
 
     def show_position(self, x, y, direction):
+        self._queue_draw_position()
         self._show_position = {'x': x, 'y': y, 'direction': direction}
-        self.queue_draw()
+        if self._follow_position():
+            self._invalidate()
+        else:
+            self._queue_draw_position()
 
     def hide_position(self, x, y, direction):
+        self._queue_draw_position()
         self._show_position = None
-        self.queue_draw()
 
-    def __draw_cb(self, widget, ctx):
-        ctx.save()
-        # set a clip region for the expose event
-        #ctx.rectangle(event.area.x, event.area.y, event.area.width,
-        #        event.area.height)
-        #ctx.clip()
-        view_data = {'width': self._width, 'height': self._height,
-                'show_position': self._show_position}
+    def __scroll_event_cb(self, widget, event):
+        if event.direction == Gdk.ScrollDirection.UP:
+            self.zoom_in()
+        elif event.direction == Gdk.ScrollDirection.DOWN:
+            self.zoom_out()
+        return True
+
+    def __button_press_event_cb(self, widget, event):
+        self._drag_start = (event.x, event.y)
+
+    def __motion_notify_event_cb(self, widget, event):
+        if self._drag_start is None or self._cell_size is None:
+            return
+        start_x, start_y = self._drag_start
+        cells_x = int((start_x - event.x) / self._cell_size)
+        cells_y = int((start_y - event.y) / self._cell_size)
+        if cells_x != 0 or cells_y != 0:
+            self._drag_start = (start_x - cells_x * self._cell_size,
+                    start_y - cells_y * self._cell_size)
+            self.pan(cells_x, cells_y)
 
-        draw(ctx, self._game_map, view_data)
-        ctx.restore()
+    def __button_release_event_cb(self, widget, event):
+        self._drag_start = None
+
+    def __draw_cb(self, widget, ctx):
+        view_data = self._get_view_data()
+        if self._walls_surface is None:
+            self._walls_surface = self.get_window().create_similar_surface(
+                    cairo.CONTENT_COLOR_ALPHA, self._width, self._height)
+            draw_walls(cairo.Context(self._walls_surface), self._game_map,
+                    view_data)
+        ctx.set_source_surface(self._walls_surface, 0, 0)
+        ctx.paint()
+        if self._show_position is not None:
+            draw_position(ctx, self._game_map, view_data)
         return False
 
 
@@ -4,8 +4,18 @@ import json
 from sugar3.activity import activity
 import zipfile
 
+import tracing
+from events import ChangeNotifier
+from world import GameWorld, get_maps_path
+from visited import VisitedPositions
 
-class GameModel:
+# events notified to the callbacks connected with connect_changed
+QUESTION_DISPLAYED = 'question-displayed'
+QUESTION_REPLIED = 'question-replied'
+POSITION_VISITED = 'position-visited'
+
+
+class GameModel(ChangeNotifier):
 
     QUESTION_TYPE_TEXT = 'TEXT'
     QUESTION_TYPE_GRAPHIC = 'GRAPHIC'
@@ -32,13 +42,26 @@ class GameModel:
         self.data['last_question_id'] = 0
 
         self.data['map_data'] = None
+        # ids of the maps stored outside of data, and the doors connecting
+        # the maps, are managed by GameWorld
+        self.data['maps'] = []
+        self.data['portals'] = {}
+        self._world = None
+        # map_id -> VisitedPositions, stored in the state when is saved
+        self._visited = {}
 
         state = {'displayed_questions': [],
                 'replied_questions': [],
-                'actions_log': []}
+                'actions_log': [],
+                'visited': {}}
 
         self.data['state'] = state
 
+    def get_world(self):
+        if self._world is None:
+            self._world = GameWorld(self)
+        return self._world
+
     def get_new_resource_id(self):
         self.data['last_resource_id'] = self.data['last_resource_id'] + 1
         return self.data['last_resource_id']
@@ -50,10 +73,43 @@ class GameModel:
     def register_displayed_question(self, id_question):
         if id_question not in self.data['state']['displayed_questions']:
             self.data['state']['displayed_questions'].append(id_question)
+            self.notify_changed(QUESTION_DISPLAYED, [],
+                    id_question=id_question)
 
     def register_replied_question(self, id_question):
         if id_question not in self.data['state']['replied_questions']:
             self.data['state']['replied_questions'].append(id_question)
+            self.notify_changed(QUESTION_REPLIED, [],
+                    id_question=id_question)
+
+    def get_visited(self, map_id, game_map):
+        """ Return the VisitedPositions of the map"""
+        max_x, max_y = game_map.data['max_x'], game_map.data['max_y']
+        visited = self._visited.get(map_id)
+        if visited is None or (visited.max_x, visited.max_y) != \
+                (max_x, max_y):
+            # the map was resized in the editor
+            if visited is not None:
+                data = visited.get_data()
+            else:
+                data = self.data['state'].setdefault('visited',
+                        {}).get(map_id)
+            visited = VisitedPositions(max_x, max_y, data)
+            self._visited[map_id] = visited
+        return visited
+
+    def register_visited_position(self, map_id, game_map, x, y, direction):
+        """ Return True if the cell was not visited before"""
+        if self.get_visited(map_id, game_map).visit(x, y, direction):
+            self.notify_changed(POSITION_VISITED, [(x, y, direction)],
+                    map_id=map_id)
+            return True
+        return False
+
+    def _store_visited(self):
+        visited_data = self.data['state'].setdefault('visited', {})
+        for map_id, visited in self._visited.items():
+            visited_data[map_id] = visited.get_data()
 
     def get_resource(self, id_resource):
         id_resource = int(id_resource)
@@ -70,9 +126,11 @@ class GameModel:
         logging.error('ERROR: question %s not found', id_question)
         return None
 
+    @tracing.traced(tracing.SAVE, 'model.write')
     def write(self, file_name):
 
         instance_path = os.path.join(activity.get_activity_root(), 'instance')
+        self._store_visited()
 
         data_file_name = 'data.json'
         f = open(os.path.join(instance_path, data_file_name), 'w')
@@ -81,7 +139,7 @@ class GameModel:
         finally:
             f.close()
 
-        logging.error('write file_name %s', file_name)
+        tracing.trace(tracing.SAVE, 'write file_name %s', file_name)
 
         z = zipfile.ZipFile(file_name, 'w')
         z.write(os.path.join(instance_path, data_file_name).encode('ascii',
@@ -101,18 +159,30 @@ class GameModel:
                         os.path.join('resources',
                         os.path.basename(question['file_image_reply'])))
 
+        if self._world is not None:
+            maps_file_names = self._world.save()
+        else:
+            maps_file_names = [os.path.join(get_maps_path(),
+                    '%s.json' % map_id) for map_id in self.data['maps']]
+        for map_file_name in maps_file_names:
+            z.write(map_file_name, os.path.join('maps',
+                    os.path.basename(map_file_name)))
+
         z.close()
 
+    @tracing.traced(tracing.SAVE, 'model.read')
     def read(self, file_name):
 
-        logging.error('model.read %s', file_name)
+        tracing.trace(tracing.SAVE, 'model.read %s', file_name)
         instance_path = os.path.join(activity.get_activity_root(), 'instance')
         z = zipfile.ZipFile(file_name, 'r')
         self.check_resources_directory()
+        if not os.path.exists(get_maps_path()):
+            os.makedirs(get_maps_path())
         for zipped_file in z.namelist():
             if (zipped_file != './'):
                 try:
-                    logging.error('extrayendo %s', zipped_file)
+                    tracing.trace(tracing.SAVE, 'extrayendo %s', zipped_file)
                     # la version de python en las xo no permite hacer
                     # extract :(
                     # z.extract(file_name,instance_path)
@@ -131,6 +201,14 @@ class GameModel:
 
             if not 'resources' in self.data:
                 self.data['resources'] = []
+            if not 'maps' in self.data:
+                self.data['maps'] = []
+            if not 'portals' in self.data:
+                self.data['portals'] = {}
+            if not 'visited' in self.data['state']:
+                self.data['state']['visited'] = {}
+            self._world = None
+            self._visited = {}
 
         finally:
             f.close()
@@ -0,0 +1,240 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+#
+# Render the walls of a game saved in the Journal to png files,
+# without a display. Can be used to create previews, review the games,
+# or compare the images rendered by different versions.
+#
+#   python render_views.py game.zip -o /tmp/views
+#   python render_views.py game.zip 0,0,N 1,0,E --size 800x600
+#   python render_views.py game.zip --map map_1 --minimap --processes 4
+#
+# The views are rendered in parallel by many processes.
+
+import os
+import sys
+import json
+import shutil
+import zipfile
+import tempfile
+import argparse
+import multiprocessing
+
+import cairo
+
+from game_map import GameMap, DIRECTIONS
+from wallview import WallRenderer
+import mapview
+
+MINIMAP_SIZE = 400
+
+# id of the map stored in data['map_data'], like in world.py,
+# not imported to not need sugar
+MAIN_MAP = 'main'
+
+# the furniture and icons are in the activity directory
+ACTIVITY_PATH = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_archive(file_name, extract_path):
+    """ Extract the game saved in file_name to extract_path,
+        and return the data and a dictionary map_id -> map data"""
+    extract_path = os.path.abspath(extract_path)
+    archive = zipfile.ZipFile(file_name, 'r')
+    try:
+        # check all the names before write any file, a name like
+        # ../file or /file would be written out of extract_path
+        output_file_names = []
+        for zipped_file in archive.namelist():
+            if zipped_file.endswith('/'):
+                continue
+            output_file_name = os.path.normpath(os.path.join(extract_path,
+                    zipped_file))
+            if not output_file_name.startswith(extract_path + os.sep):
+                raise ValueError('file %s in %s is out of the game' %
+                        (zipped_file, file_name))
+            output_file_names.append((zipped_file, output_file_name))
+        for zipped_file, output_file_name in output_file_names:
+            if not os.path.exists(os.path.dirname(output_file_name)):
+                os.makedirs(os.path.dirname(output_file_name))
+            with open(output_file_name, 'wb') as output_file:
+                output_file.write(archive.read(zipped_file))
+    finally:
+        archive.close()
+
+    with open(os.path.join(extract_path, 'data.json')) as data_file:
+        data = json.load(data_file)
+    maps = {MAIN_MAP: data['map_data'] or GameMap().data}
+    for map_id in data.get('maps', []):
+        with open(os.path.join(extract_path, 'maps',
+                '%s.json' % map_id)) as map_file:
+            maps[map_id] = json.load(map_file)
+    return data, maps
+
+
+def _index_files(paths):
+    index = {}
+    for path in paths:
+        for directory, dirs, files in os.walk(path):
+            for file_name in files:
+                index.setdefault(file_name, os.path.join(directory,
+                        file_name))
+    return index
+
+
+def remap_paths(map_data, search_paths):
+    """ The images in the game have the paths used in the computer
+        where was saved, are replaced by the files with the same name
+        found in search_paths"""
+    index = _index_files(search_paths)
+    for wall in map_data['walls']:
+        for wall_object in wall.get('objects', []):
+            file_name = wall_object['image_file_name']
+            if os.path.exists(file_name):
+                continue
+            if os.path.exists(os.path.join(ACTIVITY_PATH, file_name)):
+                wall_object['image_file_name'] = os.path.join(ACTIVITY_PATH,
+                        file_name)
+            elif os.path.basename(file_name) in index:
+                wall_object['image_file_name'] = \
+                        index[os.path.basename(file_name)]
+            else:
+                sys.stderr.write('image %s not found\n' % file_name)
+    # remove the objects without image
+    for wall in map_data['walls']:
+        if 'objects' in wall:
+            wall['objects'] = [wall_object for wall_object in wall['objects']
+                    if os.path.exists(wall_object['image_file_name'])]
+
+
+def get_all_views(game_map):
+    views = []
+    for x in range(game_map.data['max_x']):
+        for y in range(game_map.data['max_y']):
+            for direction in DIRECTIONS:
+                if game_map.get_wall_info(x, y, direction) is not None:
+                    views.append((x, y, direction))
+    return views
+
+
+def get_view_file_name(output_path, map_id, x, y, direction):
+    return os.path.join(output_path,
+            '%s_%d_%d_%s.png' % (map_id, x, y, direction))
+
+
+# the renderer used by every process
+_renderer = None
+_render_options = None
+
+
+def _init_process(map_data, width, height, output_path, map_id):
+    global _renderer, _render_options
+    _renderer = WallRenderer(GameMap(map_data), width, height)
+    _render_options = (width, height, output_path, map_id)
+
+
+def _render_view(view):
+    x, y, direction = view
+    width, height, output_path, map_id = _render_options
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width, height)
+    _renderer.render_wall(cairo.Context(surface), x, y, direction)
+    file_name = get_view_file_name(output_path, map_id, x, y, direction)
+    surface.write_to_png(file_name)
+    return file_name
+
+
+def render_views(map_data, views, width, height, output_path,
+        map_id=MAIN_MAP, processes=None):
+    """ Render the views (x, y, direction) of the map to png files,
+        and return the list of file names"""
+    init_args = (map_data, width, height, output_path, map_id)
+    if processes == 1 or len(views) < 2:
+        _init_process(*init_args)
+        return [_render_view(view) for view in views]
+    pool = multiprocessing.Pool(processes, _init_process, init_args)
+    try:
+        return pool.map(_render_view, views)
+    finally:
+        pool.close()
+        pool.join()
+
+
+def render_minimap(map_data, size, file_name):
+    surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, size, size)
+    view_data = {'width': size - 2, 'height': size - 2,
+            'show_position': None, 'x': 1, 'y': 1}
+    mapview.draw(cairo.Context(surface), GameMap(map_data), view_data)
+    surface.write_to_png(file_name)
+    return file_name
+
+
+def _parse_view(text):
+    x, y, direction = text.split(',')
+    direction = direction.upper()
+    if not direction in DIRECTIONS:
+        raise argparse.ArgumentTypeError('invalid direction %s' % direction)
+    return int(x), int(y), direction
+
+
+def _parse_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+            description='Render the walls of a saved game to png files')
+    parser.add_argument('archive', help='game saved in the Journal')
+    parser.add_argument('views', nargs='*', type=_parse_view,
+            help='views to render as x,y,direction (default all)')
+    parser.add_argument('-o', '--output', default='.',
+            help='directory where the png files are written')
+    parser.add_argument('--size', type=_parse_size, default=(1200, 900),
+            help='size of the images, as WIDTHxHEIGHT')
+    parser.add_argument('--map', default=MAIN_MAP, help='map to render')
+    parser.add_argument('--processes', type=int, default=None,
+            help='number of processes used (default one by cpu)')
+    parser.add_argument('--minimap', action='store_true',
+            help='render the map viewed from the top too')
+    args = parser.parse_args()
+
+    extract_path = tempfile.mkdtemp(prefix='ingenium-views-')
+    try:
+        try:
+            data, maps = load_archive(args.archive, extract_path)
+        except ValueError as error:
+            parser.error(str(error))
+        if not args.map in maps:
+            parser.error('map %s not found, the maps are: %s' %
+                    (args.map, ', '.join(sorted(maps.keys()))))
+        map_data = maps[args.map]
+        remap_paths(map_data, [os.path.join(extract_path, 'resources'),
+                os.path.join(ACTIVITY_PATH, 'images'),
+                os.path.join(ACTIVITY_PATH, 'icons')])
+        game_map = GameMap(map_data)
+        for x, y, direction in args.views:
+            if not (0 <= x < map_data['max_x'] and 0 <= y < map_data['max_y']):
+                parser.error('view %d,%d,%s is outside of the map (%dx%d)' %
+                        (x, y, direction, map_data['max_x'],
+                        map_data['max_y']))
+            if game_map.get_wall_info(x, y, direction) is None:
+                parser.error('there are not wall in the view %d,%d,%s' %
+                        (x, y, direction))
+        views = args.views or get_all_views(game_map)
+        if not os.path.exists(args.output):
+            os.makedirs(args.output)
+        width, height = args.size
+        for file_name in render_views(map_data, views, width, height,
+                args.output, args.map, args.processes):
+            print file_name
+        if args.minimap:
+            print render_minimap(map_data, MINIMAP_SIZE,
+                    os.path.join(args.output, '%s_map.png' % args.map))
+    finally:
+        shutil.rmtree(extract_path)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,10 +7,10 @@
 # how many have been read, and how many have been replied.
 
 from gi.repository import Gtk
-from gi.repository import Rsvg
-import cairo
 import math
-import logging
+
+import tracing
+from assets import get_disk_raster_cache
 
 
 class StateView():
@@ -20,19 +20,18 @@ class StateView():
         self._x = x
         self._y = y
         self._cell_size = cell_size
-        svg = Rsvg.Handle.new_from_file('./icons/question.svg')
-        self._tmp_image = cairo.ImageSurface(cairo.FORMAT_ARGB32,
-                svg.props.width, svg.props.height)
-        self._tmp_ctx = cairo.Context(self._tmp_image)
-        svg.render_cairo(self._tmp_ctx)
-        self._svg_width = svg.props.width
-        # last values to avoid redraws
-        self._last_cant_questions = 0
-        self._last_displayed_questions = 0
-        self._last_replied_questions = 0
+        # the icon is rendered at the size displayed
+        self._image = get_disk_raster_cache().get_surface(
+                './icons/question.svg', cell_size)
+
+    def get_extents(self):
+        """ Return x, y, width, height of the area used to draw"""
+        cant_questions = len(self.model.data['questions'])
+        return self._x, self._y, self._cell_size * cant_questions, \
+                self._cell_size
 
     def draw(self, ctx):
-        # calculate cell size
+        # the view is cached by the caller, is drawn only if the state change
         cant_questions = len(self.model.data['questions'])
         if cant_questions == 0:
             return
@@ -41,16 +40,8 @@ class StateView():
         displayed_questions = len(state['displayed_questions'])
         replied_questions = len(state['replied_questions'])
 
-        if self._last_cant_questions != cant_questions or \
-                self._last_displayed_questions != displayed_questions or \
-                self._last_replied_questions != replied_questions:
-            self._last_cant_questions = cant_questions
-            self._last_displayed_questions = displayed_questions
-            self._last_replied_questions = replied_questions
-        else:
-            return
-        scale = float(self._svg_width) / float(self._cell_size)
-        logging.error('draw stateview scale %s', scale)
+        tracing.trace(tracing.DRAW, 'draw stateview %d questions',
+                cant_questions)
         ctx.save()
         ctx.translate(self._x, self._y)
         for n in range(cant_questions):
@@ -60,13 +51,11 @@ class StateView():
                 ctx.set_source_rgb(0.913, 0.733, 0.0)  # eebb00
                 ctx.fill()
 
-            ctx.scale(1.0 / scale, 1.0 / scale)
-            ctx.set_source_surface(self._tmp_image)
+            ctx.set_source_surface(self._image)
             if n < displayed_questions:
                 ctx.paint()
             else:
                 ctx.paint_with_alpha(0.25)
-            ctx.scale(scale, scale)
             ctx.translate(self._cell_size, 0)
         ctx.restore()
 
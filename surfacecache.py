@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+#
+# The class SurfaceCache store cairo surfaces already rendered,
+# using up to max_bytes of memory. When the limit is reached,
+# the surfaces not used recently are removed.
+
+from collections import OrderedDict
+
+
+def get_surface_bytes(surface, width, height):
+    try:
+        return surface.get_stride() * height
+    except (AttributeError, TypeError):
+        # not a image surface, we can't know the real size
+        return width * height * 4
+
+
+class SurfaceCache():
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._surfaces = OrderedDict()
+
+    def __contains__(self, key):
+        return key in self._surfaces
+
+    def __len__(self):
+        return len(self._surfaces)
+
+    def get(self, key):
+        """ Return the surface stored with the key, or None"""
+        if key not in self._surfaces:
+            self.misses += 1
+            return None
+        self.hits += 1
+        surface, size = self._surfaces.pop(key)
+        self._surfaces[key] = (surface, size)
+        return surface
+
+    def put(self, key, surface, width, height):
+        self.remove(key)
+        size = get_surface_bytes(surface, width, height)
+        self._surfaces[key] = (surface, size)
+        self.used_bytes += size
+        # remove the older surfaces, but not the last added
+        while self.used_bytes > self.max_bytes and len(self._surfaces) > 1:
+            old_key, (old_surface, old_size) = \
+                    self._surfaces.popitem(last=False)
+            self.used_bytes -= old_size
+
+    def remove(self, key):
+        if key in self._surfaces:
+            surface, size = self._surfaces.pop(key)
+            self.used_bytes -= size
+
+    def remove_if(self, function):
+        """ Remove all the surfaces with a key where function(key)
+            return True"""
+        for key in [key for key in self._surfaces if function(key)]:
+            self.remove(key)
+
+    def clear(self):
+        self._surfaces.clear()
+        self.used_bytes = 0
@@ -0,0 +1,8 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+#
+# Tests of the modules without gtk, run from the activity directory with
+#
+#   python -m unittest discover -s tests -t .
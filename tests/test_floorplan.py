@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+
+import unittest
+
+from floorplan import FLOOR, WALL, DOOR, SAMPLES_BY_CELL, reduce_classes, \
+        label_components, _assign_cells
+
+
+def _create_plan(width, height, wall_x, door_y=None):
+    """ Return the pixels of a plan with walls in the border and a wall
+        of one pixel in the column wall_x, with a door in door_y"""
+    rows = []
+    for y in range(height):
+        row = [FLOOR] * width
+        row[0] = row[-1] = row[wall_x] = WALL
+        if y == door_y:
+            row[wall_x] = DOOR
+        rows.append(row)
+    rows[0] = rows[-1] = [WALL] * width
+    return rows
+
+
+class FloorPlanTest(unittest.TestCase):
+
+    def test_thin_wall_is_kept(self):
+        # 24 pixels by cell, reduced to SAMPLES_BY_CELL
+        rows = _create_plan(48, 24, 25)
+        samples = reduce_classes(rows, 2 * SAMPLES_BY_CELL, SAMPLES_BY_CELL)
+        self.assertEqual(len(samples), SAMPLES_BY_CELL)
+        self.assertEqual(len(samples[0]), 2 * SAMPLES_BY_CELL)
+        for row in samples[1:-1]:
+            self.assertEqual(row.count(WALL), 3)
+
+    def test_door_over_wall(self):
+        rows = _create_plan(48, 24, 25, door_y=12)
+        samples = reduce_classes(rows, 2 * SAMPLES_BY_CELL, SAMPLES_BY_CELL)
+        self.assertIn(DOOR, samples[2])
+
+    def test_rooms_separated_by_thin_wall(self):
+        rows = reduce_classes(_create_plan(48, 24, 25), 2 * SAMPLES_BY_CELL,
+                SAMPLES_BY_CELL)
+        labels, border_labels = label_components(rows)
+        self.assertEqual(border_labels, set())
+        self.assertEqual(len(set(label for row in labels for label in row
+                if label != 0)), 2)
+        cell_labels = _assign_cells(labels, border_labels, 2, 1)
+        self.assertNotEqual(cell_labels[0][0], cell_labels[0][1])
+
+    def test_floor_in_the_border_is_outside(self):
+        rows = [[FLOOR] * 8 for n in range(4)]
+        labels, border_labels = label_components(rows)
+        self.assertEqual(border_labels, set([labels[0][0]]))
+        self.assertRaises(ValueError, _assign_cells, labels, border_labels,
+                2, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
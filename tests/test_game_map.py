@@ -0,0 +1,239 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+
+import random
+import unittest
+
+from game_map import GameMap, DIRECTIONS, DIRECTION_BITS, derive_walls
+from benchmarks.generator import create_map_data, add_objects
+
+
+class ScanMap():
+    """ The navigation without the compiled table, looking at the cells
+        and scanning the list of walls every time, like was done
+        before GameMap.compile() existed"""
+
+    def __init__(self, data):
+        self.data = data
+
+    def _next_coords(self, x, y, direction):
+        if direction == 'N':
+            y = y - 1
+        elif direction == 'S':
+            y = y + 1
+        elif direction == 'E':
+            x = x + 1
+        else:
+            x = x - 1
+        if x < 0 or y < 0 or x >= self.data['max_x'] or \
+                y >= self.data['max_y']:
+            return None
+        return x, y
+
+    def _find_wall(self, x, y, direction):
+        for wall in self.data['walls']:
+            if wall['position'] == [x, y, direction]:
+                return wall
+        return None
+
+    def is_wall(self, x, y, direction):
+        next_coords = self._next_coords(x, y, direction)
+        if next_coords is None:
+            return True
+        x2, y2 = next_coords
+        return self.data['cells'][y][x] != self.data['cells'][y2][x2]
+
+    def get_wall_info(self, x, y, direction):
+        if not self.is_wall(x, y, direction):
+            return None
+        wall = self._find_wall(x, y, direction)
+        if wall is None:
+            return []
+        return wall.get('objects', [])
+
+    def have_door(self, x, y, direction):
+        if not self.is_wall(x, y, direction):
+            return None
+        wall = self._find_wall(x, y, direction)
+        # look for information in the other side of the wall too
+        next_coords = self._next_coords(x, y, direction)
+        if wall is None and next_coords is not None:
+            reversed_direction = DIRECTIONS[(DIRECTIONS.index(direction) +
+                    2) % 4]
+            wall = self._find_wall(next_coords[0], next_coords[1],
+                    reversed_direction)
+        if wall is not None and wall.get('doors'):
+            return wall['doors']
+        return []
+
+    def go_right(self, x, y, direction):
+        direction_cw = DIRECTIONS[(DIRECTIONS.index(direction) + 1) % 4]
+        if self.is_wall(x, y, direction_cw):
+            return x, y, direction_cw
+        x, y = self._next_coords(x, y, direction_cw)
+        return x, y, direction
+
+    def go_left(self, x, y, direction):
+        direction_ccw = DIRECTIONS[(DIRECTIONS.index(direction) + 3) % 4]
+        if self.is_wall(x, y, direction_ccw):
+            return x, y, direction_ccw
+        x, y = self._next_coords(x, y, direction_ccw)
+        return x, y, direction
+
+    def cross_door(self, x, y, direction):
+        next_coords = self._next_coords(x, y, direction)
+        if not self.have_door(x, y, direction) or next_coords is None:
+            return x, y, direction
+        x, y = next_coords
+        if not self.is_wall(x, y, direction):
+            x, y = self._next_coords(x, y, direction)
+        return x, y, direction
+
+
+def _all_positions(data):
+    for y in range(data['max_y']):
+        for x in range(data['max_x']):
+            for direction in DIRECTIONS:
+                yield x, y, direction
+
+
+def _unit_segments(wall_runs):
+    """ Split the wall runs in segments of one cell"""
+    segments = set()
+    for x1, y1, x2, y2 in wall_runs:
+        if y1 == y2:
+            segments.update((x, y1, x + 1, y1) for x in range(x1, x2))
+        else:
+            segments.update((x1, y, x1, y + 1) for y in range(y1, y2))
+    return segments
+
+
+class CompiledNavigationTest(unittest.TestCase):
+
+    def _check_navigation(self, game_map):
+        scan_map = ScanMap(game_map.data)
+        for x, y, direction in _all_positions(game_map.data):
+            position = (x, y, direction)
+            self.assertEqual(game_map.get_wall_info(x, y, direction),
+                    scan_map.get_wall_info(x, y, direction), position)
+            self.assertEqual(game_map.have_door(x, y, direction),
+                    scan_map.have_door(x, y, direction), position)
+            self.assertEqual(game_map.go_right(x, y, direction),
+                    scan_map.go_right(x, y, direction), position)
+            self.assertEqual(game_map.go_left(x, y, direction),
+                    scan_map.go_left(x, y, direction), position)
+            self.assertEqual(game_map.cross_door(x, y, direction),
+                    scan_map.cross_door(x, y, direction), position)
+
+    def test_default_map(self):
+        self._check_navigation(GameMap())
+
+    def test_generated_maps(self):
+        random_generator = random.Random(1)
+        for max_x, max_y, room_size in ((12, 9, 3), (10, 10, 4), (7, 5, 1)):
+            game_map = GameMap(create_map_data(max_x, max_y, room_size,
+                    random_generator))
+            add_objects(game_map, 20, ['image.svg'], [], random_generator)
+            self._check_navigation(game_map)
+
+    def test_door_in_the_other_side(self):
+        data = {'max_x': 2, 'max_y': 1, 'rooms': {},
+                'cells': ['AB'],
+                'walls': [{'position': [1, 0, 'W'], 'doors': ['door_1']}]}
+        game_map = GameMap(data)
+        self._check_navigation(game_map)
+        self.assertEqual(game_map.cross_door(0, 0, 'E'), (1, 0, 'E'))
+
+    def test_door_in_the_border(self):
+        data = {'max_x': 2, 'max_y': 1, 'rooms': {},
+                'cells': ['AB'],
+                'walls': [{'position': [0, 0, 'N'], 'doors': ['door_1']}]}
+        game_map = GameMap(data)
+        self._check_navigation(game_map)
+        self.assertEqual(game_map.have_door(0, 0, 'N'), ['door_1'])
+        self.assertEqual(game_map.cross_door(0, 0, 'N'), (0, 0, 'N'))
+
+    def test_object_in_the_other_side_of_a_door(self):
+        data = {'max_x': 2, 'max_y': 1, 'rooms': {},
+                'cells': ['AB'],
+                'walls': [{'position': [1, 0, 'W'], 'doors': ['door_1']}]}
+        game_map = GameMap(data)
+        changes = []
+        game_map.connect_changed(lambda *args: changes.append(args[1:3]))
+        game_map.add_object_to_wall(0, 0, 'E', {'wall_x': 10, 'wall_y': 10})
+        self._check_navigation(game_map)
+        self.assertEqual(game_map.cross_door(0, 0, 'E'), (0, 0, 'E'))
+        self.assertEqual(game_map.cross_door(1, 0, 'W'), (0, 0, 'W'))
+        # the door is still visible from the other side
+        self.assertEqual(game_map.get_door_segments(), [(1, 0, 1, 1)])
+        self.assertEqual(changes, [('door-info-changed', [(0, 0, 'E')]),
+                ('object-added', [(0, 0, 'E')])])
+        # same navigation table than compile all the map
+        door_mask = list(game_map._door_mask)
+        game_map.compile()
+        self.assertEqual(list(game_map._door_mask), door_mask)
+        self.assertEqual(game_map.get_door_segments(), [(1, 0, 1, 1)])
+
+    def test_compile_after_set_room(self):
+        game_map = GameMap(create_map_data(8, 8, 4, random.Random(2)))
+        game_map.set_room(4, 4, game_map.get_room(0, 0))
+        self._check_navigation(game_map)
+
+
+class DeriveWallsTest(unittest.TestCase):
+
+    def _check_walls(self, cells):
+        max_x, max_y = len(cells[0]), len(cells)
+        wall_mask, wall_runs = derive_walls(cells)
+        scan_map = ScanMap({'max_x': max_x, 'max_y': max_y, 'cells': cells,
+                'walls': []})
+        # the mask have a bit for every wall in the cells
+        mask_segments = set()
+        for x, y, direction in _all_positions(scan_map.data):
+            is_wall = wall_mask[y * max_x + x] & DIRECTION_BITS[direction]
+            self.assertEqual(bool(is_wall),
+                    scan_map.is_wall(x, y, direction), (x, y, direction))
+            if is_wall:
+                if direction == 'N':
+                    mask_segments.add((x, y, x + 1, y))
+                elif direction == 'S':
+                    mask_segments.add((x, y + 1, x + 1, y + 1))
+                elif direction == 'W':
+                    mask_segments.add((x, y, x, y + 1))
+                else:
+                    mask_segments.add((x + 1, y, x + 1, y + 1))
+        # the runs cover the same walls than the mask
+        self.assertEqual(_unit_segments(wall_runs), mask_segments)
+        # and the runs in the same line are merged
+        runs = set(wall_runs)
+        for x1, y1, x2, y2 in wall_runs:
+            if y1 == y2:
+                self.assertFalse([run for run in runs if run[1] == run[3] ==
+                        y1 and run[0] == x2])
+            else:
+                self.assertFalse([run for run in runs if run[0] == run[2] ==
+                        x1 and run[1] == y2])
+
+    def test_default_map(self):
+        self._check_walls(GameMap.default_data['cells'])
+
+    def test_one_room(self):
+        self._check_walls(['AAA', 'AAA'])
+        wall_mask, wall_runs = derive_walls(['AAA', 'AAA'])
+        self.assertEqual(sorted(wall_runs), [(0, 0, 0, 2), (0, 0, 3, 0),
+                (0, 2, 3, 2), (3, 0, 3, 2)])
+
+    def test_random_cells(self):
+        random_generator = random.Random(3)
+        for n in range(20):
+            max_x = random_generator.randint(1, 8)
+            max_y = random_generator.randint(1, 8)
+            cells = [''.join(random_generator.choice('ABC')
+                    for x in range(max_x)) for y in range(max_y)]
+            self._check_walls(cells)
+
+
+if __name__ == '__main__':
+    unittest.main()
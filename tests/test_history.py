@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+
+import copy
+import unittest
+
+from game_map import GameMap
+from history import EditHistory
+
+
+class EditHistoryTest(unittest.TestCase):
+
+    def setUp(self):
+        # a copy, to not modify the default map used by other tests
+        self.game_map = GameMap(copy.deepcopy(GameMap.default_data))
+        self.history = EditHistory(self.game_map)
+        self.changes = []
+        self.history.connect_changed(lambda *args: self.changes.append(args))
+        self.wall_object = {'wall_x': 10, 'wall_y': 10, 'wall_scale': 0.5,
+                'image_file_name': 'image.svg'}
+        self.game_map.add_object_to_wall(0, 0, 'N', self.wall_object)
+
+    def test_consecutive_moves_are_one_step(self):
+        for n in range(5):
+            self.game_map.move_object(0, 0, 'N', self.wall_object, 20 + n,
+                    30 + n)
+        self.history.undo()
+        self.assertEqual((self.wall_object['wall_x'],
+                self.wall_object['wall_y']), (10, 10))
+        self.history.redo()
+        self.assertEqual((self.wall_object['wall_x'],
+                self.wall_object['wall_y']), (24, 34))
+
+    def test_close_step(self):
+        self.game_map.move_object(0, 0, 'N', self.wall_object, 20, 20)
+        self.history.close_step()
+        self.game_map.move_object(0, 0, 'N', self.wall_object, 30, 30)
+        self.history.undo()
+        self.assertEqual(self.wall_object['wall_x'], 20)
+
+    def test_move_and_resize_are_different_steps(self):
+        self.game_map.move_object(0, 0, 'N', self.wall_object, 20, 20)
+        self.game_map.resize_object(0, 0, 'N', self.wall_object, 0.8)
+        self.history.undo()
+        self.assertEqual(self.wall_object['wall_scale'], 0.5)
+        self.assertEqual(self.wall_object['wall_x'], 20)
+
+    def test_can_undo_and_redo(self):
+        self.history.undo()
+        self.assertFalse(self.history.can_undo())
+        self.assertTrue(self.history.can_redo())
+        self.assertEqual(self.game_map.get_wall_info(0, 0, 'N'), [])
+        self.history.redo()
+        self.assertTrue(self.history.can_undo())
+        self.assertFalse(self.history.can_redo())
+        self.assertEqual(len(self.changes), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
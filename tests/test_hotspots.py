@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+
+import random
+import unittest
+
+from hotspots import HotspotMap, DOOR, OBJECT, RESIZE_HANDLE
+
+
+class HotspotMapTest(unittest.TestCase):
+
+    def test_area_on_top(self):
+        hotspots = HotspotMap(200, 100, cell_size=16)
+        hotspots.add(DOOR, 10, 10, 50, 80, 'door_1')
+        hotspots.add(OBJECT, 40, 20, 100, 30, 'object_1')
+        self.assertEqual(hotspots.find(20, 50), (DOOR, 'door_1'))
+        self.assertEqual(hotspots.find(50, 30), (OBJECT, 'object_1'))
+        self.assertEqual(hotspots.find(50, 30, [DOOR]), (DOOR, 'door_1'))
+        self.assertEqual(hotspots.find(50, 30, [RESIZE_HANDLE]),
+                (None, None))
+
+    def test_outside(self):
+        hotspots = HotspotMap(200, 100, cell_size=16)
+        hotspots.add(OBJECT, -20, -20, 300, 200, 'object_1')
+        self.assertEqual(hotspots.find(0, 0), (OBJECT, 'object_1'))
+        self.assertEqual(hotspots.find(199, 99), (OBJECT, 'object_1'))
+        self.assertEqual(hotspots.find(-1, 50), (None, None))
+        self.assertEqual(hotspots.find(50, 500), (None, None))
+
+    def test_same_result_than_check_all_areas(self):
+        random_generator = random.Random(1)
+        hotspots = HotspotMap(300, 200, cell_size=32)
+        areas = []
+        for n in range(40):
+            area = (random_generator.choice([DOOR, OBJECT]),
+                    random_generator.uniform(-50, 300),
+                    random_generator.uniform(-50, 200),
+                    random_generator.uniform(1, 120),
+                    random_generator.uniform(1, 120), n)
+            areas.append(area)
+            kind, x, y, width, height, data = area
+            hotspots.add(kind, x, y, width, height, data)
+        for n in range(500):
+            x = random_generator.uniform(0, 300)
+            y = random_generator.uniform(0, 200)
+            expected = (None, None)
+            for kind, area_x, area_y, width, height, data in \
+                    reversed(areas):
+                if area_x < x < area_x + width and \
+                        area_y < y < area_y + height:
+                    expected = (kind, data)
+                    break
+            self.assertEqual(hotspots.find(x, y), expected, (x, y))
+
+
+if __name__ == '__main__':
+    unittest.main()
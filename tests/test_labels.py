@@ -0,0 +1,65 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+
+import unittest
+
+try:
+    import cairo
+except ImportError:
+    cairo = None
+
+if cairo is not None:
+    from labels import LabelCache, MIN_FONT_SIZE, MAX_FONT_SIZE
+
+    class CountingLabelCache(LabelCache):
+        """ Use a simple width by character and count the measures"""
+
+        def __init__(self):
+            LabelCache.__init__(self)
+            self.measures = 0
+
+        def _get_widest_row_width(self, rows, font, font_size):
+            self.measures += 1
+            return max(len(row) for row in rows) * font_size * 0.6
+
+
+@unittest.skipIf(cairo is None, 'pycairo is not installed')
+class LabelCacheTest(unittest.TestCase):
+
+    def test_font_size_same_than_linear_search(self):
+        labels = CountingLabelCache()
+        for text in ('Kitchen', 'Living room', 'A very long room name'):
+            for max_width in range(1, 200, 7):
+                expected = MIN_FONT_SIZE
+                for font_size in range(MIN_FONT_SIZE, MAX_FONT_SIZE + 1):
+                    if labels._get_widest_row_width(text.split(), None,
+                            font_size) <= max_width:
+                        expected = font_size
+                self.assertEqual(labels.get_font_size(text, max_width),
+                        expected, (text, max_width))
+
+    def test_font_size_cached(self):
+        labels = CountingLabelCache()
+        font_size = labels.get_font_size('Kitchen', 50)
+        measures = labels.measures
+        self.assertEqual(labels.get_font_size('Kitchen', 50), font_size)
+        self.assertEqual(labels.measures, measures)
+        labels.remove_text('Kitchen')
+        labels.get_font_size('Kitchen', 50)
+        self.assertTrue(labels.measures > measures)
+
+    def test_font_size_with_cairo(self):
+        labels = LabelCache()
+        font_size = labels.get_font_size('Living room', 60)
+        rows = ['Living', 'room']
+        self.assertTrue(font_size == MIN_FONT_SIZE or
+                labels._get_widest_row_width(rows, None, font_size) <= 60)
+        if font_size < MAX_FONT_SIZE:
+            self.assertTrue(labels._get_widest_row_width(rows, None,
+                    font_size + 1) > 60)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+
+import os
+import json
+import shutil
+import zipfile
+import tempfile
+import unittest
+
+try:
+    import render_views
+except ImportError:
+    # need cairo and gtk
+    render_views = None
+
+
+@unittest.skipIf(render_views is None, 'pycairo or gtk are not installed')
+class LoadArchiveTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.extract_path = os.path.join(self.path, 'extract')
+        os.makedirs(self.extract_path)
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def _create_archive(self, names):
+        file_name = os.path.join(self.path, 'game.zip')
+        archive = zipfile.ZipFile(file_name, 'w')
+        archive.writestr('data.json', json.dumps({'map_data': None}))
+        for name in names:
+            archive.writestr(name, 'data')
+        archive.close()
+        return file_name
+
+    def test_load(self):
+        file_name = self._create_archive(['images/a.svg'])
+        data, maps = render_views.load_archive(file_name, self.extract_path)
+        self.assertEqual(sorted(maps.keys()), [render_views.MAIN_MAP])
+        self.assertTrue(os.path.exists(os.path.join(self.extract_path,
+                'images', 'a.svg')))
+
+    def test_files_out_of_the_extract_path(self):
+        for name in ('../a.svg', 'images/../../a.svg', '/tmp/a.svg'):
+            file_name = self._create_archive([name])
+            self.assertRaises(ValueError, render_views.load_archive,
+                    file_name, self.extract_path)
+            self.assertFalse(os.path.exists(os.path.join(self.path,
+                    'a.svg')))
+            # nothing is written if a name is wrong
+            self.assertFalse(os.path.exists(os.path.join(self.extract_path,
+                    'data.json')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+
+import unittest
+
+from surfacecache import SurfaceCache
+
+
+class FakeSurface():
+    """ Only the method used by SurfaceCache to know the size"""
+
+    def __init__(self, stride):
+        self._stride = stride
+
+    def get_stride(self):
+        return self._stride
+
+
+class SurfaceCacheTest(unittest.TestCase):
+
+    def test_size_of_the_surfaces(self):
+        cache = SurfaceCache(10000)
+        cache.put('a', FakeSurface(40), 10, 10)
+        self.assertEqual(cache.used_bytes, 400)
+        # without stride the size is calculated with 4 bytes by pixel
+        cache.put('b', object(), 10, 5)
+        self.assertEqual(cache.used_bytes, 600)
+        # replace a surface do not count it two times
+        cache.put('a', FakeSurface(40), 10, 20)
+        self.assertEqual(cache.used_bytes, 1000)
+        cache.remove('b')
+        self.assertEqual(cache.used_bytes, 800)
+        cache.clear()
+        self.assertEqual((cache.used_bytes, len(cache)), (0, 0))
+
+    def test_remove_not_used_recently(self):
+        cache = SurfaceCache(1000)
+        for key in ('a', 'b', 'c'):
+            cache.put(key, FakeSurface(100), 10, 3)
+        self.assertTrue(cache.get('a') is not None)
+        cache.put('d', FakeSurface(100), 10, 3)
+        self.assertFalse('b' in cache)
+        self.assertEqual(sorted(cache._surfaces.keys()), ['a', 'c', 'd'])
+        self.assertTrue(cache.used_bytes <= cache.max_bytes)
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+        self.assertTrue(cache.get('b') is None)
+        self.assertEqual(cache.misses, 1)
+
+    def test_surface_bigger_than_the_limit(self):
+        cache = SurfaceCache(1000)
+        cache.put('a', FakeSurface(100), 10, 5)
+        cache.put('b', FakeSurface(100), 10, 20)
+        # the last surface is kept, to be able to use it
+        self.assertEqual(list(cache._surfaces.keys()), ['b'])
+        self.assertEqual(cache.used_bytes, 2000)
+
+    def test_remove_if(self):
+        cache = SurfaceCache(10000)
+        for n in range(6):
+            cache.put((n % 2, n), FakeSurface(10), 10, 1)
+        cache.remove_if(lambda key: key[0] == 1)
+        self.assertEqual(sorted(cache._surfaces.keys()),
+                [(0, 0), (0, 2), (0, 4)])
+        self.assertEqual(cache.used_bytes, 30)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+
+import unittest
+
+from visited import VisitedPositions
+
+
+class VisitedPositionsTest(unittest.TestCase):
+
+    def test_visit(self):
+        visited = VisitedPositions(3, 3)
+        self.assertTrue(visited.visit(1, 1, 'N'))
+        self.assertFalse(visited.visit(1, 1, 'E'))
+        self.assertTrue(visited.visit(2, 1, 'W'))
+        self.assertTrue(visited.is_visited(1, 1, 'E'))
+        self.assertFalse(visited.is_visited(1, 1, 'S'))
+        self.assertTrue(visited.is_cell_visited(2, 1))
+        self.assertFalse(visited.is_cell_visited(0, 1))
+        self.assertEqual(visited.count_positions(), 3)
+        self.assertEqual(visited.count_cells(), 2)
+
+    def test_load_same_size(self):
+        visited = VisitedPositions(5, 3)
+        visited.visit(0, 0, 'N')
+        visited.visit(4, 2, 'W')
+        loaded = VisitedPositions(5, 3, visited.get_data())
+        self.assertTrue(loaded.is_visited(0, 0, 'N'))
+        self.assertTrue(loaded.is_visited(4, 2, 'W'))
+        self.assertEqual(loaded.count_positions(), 2)
+
+    def test_load_after_resize(self):
+        visited = VisitedPositions(5, 3)
+        visited.visit(1, 1, 'S')
+        visited.visit(4, 0, 'E')
+        visited.visit(2, 2, 'N')
+        data = visited.get_data()
+        # a smaller map lost the cells out of it
+        smaller = VisitedPositions(3, 2, data)
+        self.assertTrue(smaller.is_visited(1, 1, 'S'))
+        self.assertEqual(smaller.count_positions(), 1)
+        # a bigger map keep the cells in the same position
+        bigger = VisitedPositions(7, 4, data)
+        self.assertTrue(bigger.is_visited(1, 1, 'S'))
+        self.assertTrue(bigger.is_visited(4, 0, 'E'))
+        self.assertTrue(bigger.is_visited(2, 2, 'N'))
+        self.assertEqual(bigger.count_positions(), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+#
+# Trace messages, counters and time spans by category.
+#
+# All the categories are disabled by default, and when a category is
+# disabled the calls only check a set, the messages are not formatted.
+# The categories can be enabled setting the environment variable
+# INGENIUM_TRACE with a list separated by commas (or 'all'),
+# or calling enable() at runtime.
+#
+#   tracing.trace(tracing.DRAW, 'render wall %d %d %s', x, y, direction)
+#   tracing.count(tracing.DRAW, 'wall_cache_miss')
+#   with tracing.span(tracing.DRAW, 'render_wall'):
+#       ...
+#   @tracing.traced(tracing.SAVE, 'write')
+#   def write(self, file_name):
+
+import os
+import time
+import logging
+
+DRAW = 'draw'
+WALL_INFO = 'wall-info'
+ASSETS = 'assets'
+SAVE = 'save'
+INPUT = 'input'
+
+CATEGORIES = [DRAW, WALL_INFO, ASSETS, SAVE, INPUT]
+
+_logger = logging.getLogger('ingenium.trace')
+
+_enabled = set()
+# (category, name) -> value
+_counters = {}
+# (category, name) -> [calls, total seconds, max seconds]
+_spans = {}
+
+
+def enabled(category):
+    return category in _enabled
+
+
+def enable(category, value=True):
+    """ Enable or disable a category, or all if category is 'all'"""
+    categories = CATEGORIES if category == 'all' else [category]
+    for category in categories:
+        if value:
+            _enabled.add(category)
+        else:
+            _enabled.discard(category)
+    # the messages are logged at debug level, and should be displayed
+    # even if the activity log level is higher
+    _logger.setLevel(logging.DEBUG if _enabled else logging.WARNING)
+
+
+def disable(category):
+    enable(category, False)
+
+
+def trace(category, message, *args):
+    if category in _enabled:
+        _logger.debug('[%s] ' + message, category, *args)
+
+
+def count(category, name, increment=1):
+    if category in _enabled:
+        key = (category, name)
+        _counters[key] = _counters.get(key, 0) + increment
+
+
+class _Span():
+
+    def __init__(self, category, name):
+        self._key = (category, name)
+
+    def __enter__(self):
+        self._start = time.time()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        elapsed = time.time() - self._start
+        if self._key not in _spans:
+            _spans[self._key] = [0, 0.0, 0.0]
+        values = _spans[self._key]
+        values[0] += 1
+        values[1] += elapsed
+        values[2] = max(values[2], elapsed)
+        return False
+
+
+class _NullSpan():
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+_null_span = _NullSpan()
+
+
+def span(category, name):
+    """ Return a context manager measuring the time used in the block"""
+    if category in _enabled:
+        return _Span(category, name)
+    return _null_span
+
+
+def traced(category, name):
+    """ Decorator to record a span in every call to the function"""
+    def decorator(function):
+        def wrapper(*args, **kwargs):
+            if category not in _enabled:
+                return function(*args, **kwargs)
+            with _Span(category, name):
+                return function(*args, **kwargs)
+        wrapper.__name__ = function.__name__
+        wrapper.__doc__ = function.__doc__
+        return wrapper
+    return decorator
+
+
+def get_stats():
+    """ Return a dictionary with the counters and the spans
+        (calls, total seconds, max seconds) recorded,
+        with keys 'category:name'"""
+    counters = dict(('%s:%s' % key, value)
+            for key, value in _counters.items())
+    spans = dict(('%s:%s' % key, tuple(values))
+            for key, values in _spans.items())
+    return {'counters': counters, 'spans': spans}
+
+
+def log_stats():
+    stats = get_stats()
+    for name in sorted(stats['counters']):
+        _logger.debug('counter %s: %d', name, stats['counters'][name])
+    for name in sorted(stats['spans']):
+        calls, total, maximum = stats['spans'][name]
+        _logger.debug('span %s: %d calls, %.4f s total, %.4f s max', name,
+                calls, total, maximum)
+
+
+def reset():
+    _counters.clear()
+    _spans.clear()
+
+
+for _category in os.environ.get('INGENIUM_TRACE', '').split(','):
+    if _category.strip():
+        enable(_category.strip())
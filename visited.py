@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+#
+# The class VisitedPositions store the walls of a map viewed by the user,
+# using one bit by every position (x, y, direction). The four bits
+# of a cell are together, then a byte have the information of two cells.
+#
+# Is saved in the state of the game compressed and encoded in base64,
+# to know what part of the map was explored.
+
+import base64
+import zlib
+
+from game_map import DIRECTIONS
+
+DIRECTION_INDEX = dict((direction, n) for n, direction in
+        enumerate(DIRECTIONS))
+
+
+class VisitedPositions():
+
+    def __init__(self, max_x, max_y, data=None):
+        self.max_x = max_x
+        self.max_y = max_y
+        self._bits = bytearray((max_x * max_y + 1) / 2)
+        if data is not None:
+            self._load(data)
+
+    def _get_index(self, x, y):
+        """ Return the byte and the shift of the bits of the cell"""
+        cell = y * self.max_x + x
+        return cell / 2, (cell % 2) * 4
+
+    def visit(self, x, y, direction):
+        """ Mark the position as visited, and return True
+            if the cell was not visited before"""
+        index, shift = self._get_index(x, y)
+        value = self._bits[index]
+        cell_bits = (value >> shift) & 0xf
+        self._bits[index] = value | \
+                (1 << (shift + DIRECTION_INDEX[direction]))
+        return cell_bits == 0
+
+    def is_visited(self, x, y, direction):
+        index, shift = self._get_index(x, y)
+        return bool(self._bits[index] &
+                (1 << (shift + DIRECTION_INDEX[direction])))
+
+    def is_cell_visited(self, x, y):
+        """ Return True if any of the walls of the cell was visited"""
+        index, shift = self._get_index(x, y)
+        return bool((self._bits[index] >> shift) & 0xf)
+
+    def count_positions(self):
+        return sum(bin(value).count('1') for value in self._bits)
+
+    def count_cells(self):
+        return sum(bool(value & 0xf) + bool(value & 0xf0)
+                for value in self._bits)
+
+    def get_data(self):
+        """ Return a dictionary to store in the state of the game"""
+        return {'max_x': self.max_x, 'max_y': self.max_y,
+                'bits': base64.b64encode(zlib.compress(str(self._bits)))}
+
+    def _load(self, data):
+        bits = bytearray(zlib.decompress(base64.b64decode(data['bits'])))
+        if (data['max_x'], data['max_y']) == (self.max_x, self.max_y):
+            self._bits[:len(bits)] = bits[:len(self._bits)]
+            return
+        # the size of the map was changed, copy the cells still existing
+        stored = VisitedPositions(data['max_x'], data['max_y'])
+        stored._bits[:len(bits)] = bits[:len(stored._bits)]
+        for y in range(min(self.max_y, stored.max_y)):
+            for x in range(min(self.max_x, stored.max_x)):
+                stored_index, stored_shift = stored._get_index(x, y)
+                cell_bits = (stored._bits[stored_index] >> stored_shift) & 0xf
+                index, shift = self._get_index(x, y)
+                self._bits[index] |= cell_bits << shift
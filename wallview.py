@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+#
+# The class WallRenderer draw the walls of a GameMap, as are viewed
+# by the user inside the map, in any cairo context.
+#
+# Is used by MapNavView to draw in the screen, and can be used without
+# a window to render the walls in a cairo.ImageSurface:
+#
+#   renderer = WallRenderer(game_map, 800, 600)
+#   surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, 800, 600)
+#   renderer.render_wall(cairo.Context(surface), x, y, direction)
+
+import tracing
+from labels import LabelCache
+from assets import get_asset_cache, get_raster_cache, get_asset_size
+
+# colors used before from sugar style, #8B6914 and #6B4904
+DOOR_COLOR = (0x8B / 255.0, 0x69 / 255.0, 0x14 / 255.0)
+DOOR_FRAME_COLOR = (0x6B / 255.0, 0x49 / 255.0, 0x04 / 255.0)
+
+
+def get_wall_object_asset(wall_object):
+    """ Return the svg handle or pixbuf of a object returned
+        by get_information_walls"""
+    if 'svg_image_cache' in wall_object:
+        return wall_object['svg_image_cache']
+    return wall_object['pxb_image_cache']
+
+
+class WallRenderer():
+
+    def __init__(self, game_map, width=None, height=None):
+        self._game_map = game_map
+        self.cache_info = {}
+        self._labels = LabelCache()
+        if width is not None and height is not None:
+            self.calculate_sizes(width, height)
+
+    def set_game_map(self, game_map):
+        self.clear_wall_info()
+        self._game_map = game_map
+
+    def clear_wall_info(self):
+        for key in list(self.cache_info.keys()):
+            self._remove_wall_info(key)
+
+    def calculate_sizes(self, width, height):
+        self._width = width
+        self._height = height
+        # used as unity 1/12 of the height
+        self._grid_size = self._height / 12
+        # the door is 3 units width and 6 units hight
+        self._door_width = 3
+        self._door_height = 6
+
+    def wall_to_view(self, x, y):
+        # receive float, float from 0 to 100 and return
+        # int, int relative to the height and width of the view
+        x2 = x * float(self._width) / 100.0
+        y2 = y * float(self._height) / 100.0
+        return int(x2), int(y2)
+
+    def view_to_wall(self, x, y):
+        # receive int, int and return
+        # float, float from 0 to 100 relative
+        # to the height and width of the view
+        # we save in the model this values and calculate again before display
+        x2 = float(x) * 100.0 / float(self._width)
+        y2 = float(y) * 100.0 / float(self._height)
+        return x2, y2
+
+    def _remove_wall_info(self, key):
+        if key in self.cache_info:
+            self._release_wall_info(self.cache_info.pop(key))
+
+    def _release_wall_info(self, info):
+        """ Release the images used by the objects of the wall"""
+        asset_cache = get_asset_cache()
+        for wall_object in info['objects']:
+            asset_cache.release(get_wall_object_asset(wall_object))
+
+    def get_information_walls(self, x, y, direction):
+        key = str(x) + direction + str(y)
+        if key in self.cache_info:
+            return self.cache_info[key]
+        tracing.count(tracing.WALL_INFO, 'resolved')
+        with tracing.span(tracing.WALL_INFO, 'get_information_walls'):
+            wall_objects = []
+            objects = self._game_map.get_wall_info(x, y, direction)
+            for wall_object in objects:
+                image_file_name = wall_object['image_file_name']
+                new_dict = {}
+                new_dict.update(wall_object)
+                new_dict['original'] = wall_object
+                # create a new dict to add the svg handle or the pixbuf,
+                # can't be in the model because can't be put in the json.
+                # the images are shared with the other views
+                asset = get_asset_cache().acquire(image_file_name)
+                if image_file_name.endswith('.svg'):
+                    new_dict['svg_image_cache'] = asset
+                else:
+                    new_dict['pxb_image_cache'] = asset
+
+                wall_objects.append(new_dict)
+
+            # have door?
+            have_door = self._game_map.have_door(x, y, direction)
+            # there are a page at cw direction?
+            cw_direction = self._game_map.get_direction_cw(direction)
+            wall_cw = self._game_map.get_wall_info(x, y, cw_direction) is \
+                    not None
+            # there are a page at ccw direction?
+            ccw_direction = self._game_map.get_direction_ccw(direction)
+            wall_ccw = self._game_map.get_wall_info(x, y, ccw_direction) is \
+                    not None
+            # Wall color?
+            wall_color = self._game_map.get_wall_color(x, y)
+            info = {'have_door': have_door, 'wall_cw': wall_cw,
+                    'wall_ccw': wall_ccw, 'wall_color': wall_color,
+                    'objects': wall_objects}
+            self.cache_info[key] = info
+            return info
+
+    def get_object_size(self, wall_object):
+        """ Return the size in pixels of a object displayed in the wall"""
+        image_width, image_height = get_asset_size(
+                get_wall_object_asset(wall_object))
+        # the scale can be modified after the information was cached
+        wall_scale = wall_object['original']['wall_scale']
+        scale = float(self._height) * wall_scale / float(image_height)
+        return int(image_width * scale), int(image_height * scale)
+
+    def render_wall(self, ctx, x, y, direction):
+        """ Draw the wall in the position x, y, direction,
+            without the controls used in edit mode"""
+        def darken(color, factor=0.8):
+            return tuple(c * factor for c in color)
+        ctx.save()
+        info_walls = self.get_information_walls(x, y, direction)
+        # draw back wall
+        ctx.rectangle(0, 0, self._width, self._height - self._grid_size)
+        fill = info_walls['wall_color']
+        stroke = (0, 0, 0)
+        ctx.set_source_rgb(*fill)
+        ctx.fill_preserve()
+        ctx.set_source_rgb(*stroke)
+        ctx.stroke()
+
+        # draw floor
+
+        ctx.rectangle(0, self._height - self._grid_size, self._width,
+                self._grid_size)
+        fill = (0, 0, 0)
+        stroke = (1, 1, 1)
+        ctx.set_source_rgb(*fill)
+        ctx.fill_preserve()
+        ctx.set_source_rgb(*stroke)
+        ctx.stroke()
+
+        if info_walls['have_door'] != []:
+            x_door = self._get_door_x(direction)
+            self.draw_door(ctx, x_door, x, y, direction)
+
+        if info_walls['wall_cw']:
+            ctx.move_to(self._width - self._grid_size, 0)
+            ctx.line_to(self._width, 0)
+            ctx.line_to(self._width, self._height)
+            ctx.line_to(self._width - self._grid_size,
+                    self._height - self._grid_size)
+            ctx.close_path()
+            fill = darken(info_walls['wall_color'])
+            stroke = (0, 0, 0)
+            ctx.set_source_rgb(*fill)
+            ctx.fill_preserve()
+            ctx.set_source_rgb(*stroke)
+            ctx.stroke()
+
+        if info_walls['wall_ccw']:
+            ctx.move_to(0, 0)
+            ctx.line_to(self._grid_size, 0)
+            ctx.line_to(self._grid_size,
+                    self._height - self._grid_size)
+            ctx.line_to(0, self._height)
+            ctx.close_path()
+            fill = darken(info_walls['wall_color'])
+            stroke = (0, 0, 0)
+            ctx.set_source_rgb(*fill)
+            ctx.fill_preserve()
+            ctx.set_source_rgb(*stroke)
+            ctx.stroke()
+        ctx.restore()
+        for wall_object in info_walls['objects']:
+            wall_x, wall_y = wall_object['wall_x'], wall_object['wall_y']
+            wall_x, wall_y = self.wall_to_view(wall_x, wall_y)
+            width, height = self.get_object_size(wall_object)
+            # the image is rendered only the first time is displayed
+            # with this size
+            surface, raster_height = get_raster_cache().get_surface(
+                    get_wall_object_asset(wall_object), height)
+            scale = float(height) / float(raster_height)
+            ctx.save()
+            ctx.translate(wall_x, wall_y)
+            ctx.scale(scale, scale)
+            ctx.set_source_surface(surface, 0, 0)
+            ctx.paint()
+            ctx.restore()
+
+    def _get_door_x(self, direction):
+        if direction in ('N', 'W'):
+            # door is at rigth of the wall
+            return self._width - self._grid_size * (self._door_width + 2)
+        else:
+            return self._grid_size * 2
+
+    def _get_door_y(self):
+        return self._height - self._grid_size * (self._door_height + 1)
+
+    def draw_door(self, ctx, x, map_x, map_y, direction):
+        y = self._get_door_y()
+        ctx.rectangle(x, y, self._grid_size * self._door_width,
+                self._grid_size * self._door_height)
+        fill = DOOR_COLOR
+        stroke = (0, 0, 0)
+        ctx.set_source_rgb(*fill)
+        ctx.fill_preserve()
+        ctx.set_source_rgb(*stroke)
+        ctx.stroke()
+
+        # frame
+        frame_width = self._grid_size * self._door_width / 8
+        fill = DOOR_FRAME_COLOR
+        ctx.set_source_rgb(*fill)
+        ctx.rectangle(x, y, self._grid_size * self._door_width, frame_width)
+        ctx.fill()
+        ctx.rectangle(x, y, frame_width, self._grid_size * self._door_height)
+        ctx.fill()
+        ctx.rectangle(x + self._grid_size * self._door_width - frame_width, y,
+                frame_width, self._grid_size * self._door_height)
+        ctx.fill()
+
+        # handle
+        if direction in ('N', 'W'):
+            # door is at rigth of the wall
+            x_handle = x + frame_width * 1.5
+        else:
+            x_handle = x + self._grid_size * self._door_width - \
+                    frame_width * 2.5
+        y_handle = y + self._grid_size * self._door_height / 2
+
+        ctx.rectangle(x_handle, y_handle, frame_width, frame_width / 4)
+        ctx.fill()
+
+        # draw room name
+        room_key = self._game_map.get_next_room(map_x, map_y, direction)
+        if room_key is None:
+            # the door is in the border of the map
+            return
+        room_name = self._game_map.get_room_name(room_key)
+        if room_name.strip() != '':
+            x_text = x + self._grid_size * self._door_width / 2
+            y_text = y + self._grid_size * self._door_height / 4
+            max_width = self._grid_size * self._door_width / 2
+            margin = self._grid_size * self._door_width / 12
+            surface, x_center, y_center = self._labels.get_label(room_name,
+                    max_width, margin)
+            ctx.set_source_surface(surface, x_text - x_center,
+                    y_text - y_center)
+            ctx.paint()
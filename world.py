@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# Copyright (C) 2012, One Laptop Per Child
+# Author, Gonzalo Odiard
+# License: LGPLv2
+#
+# The class GameWorld manage a set of GameMaps connected by portal doors.
+#
+# The main map is stored in model.data['map_data'] like before,
+# the other maps are stored in the instance directory (and in the zip
+# saved in the Journal) as maps/<map_id>.json, and are loaded only when
+# are needed. When the loaded maps have more than max_loaded_cells cells,
+# the maps not used recently are saved and removed from memory.
+
+import os
+import json
+import logging
+from collections import OrderedDict
+
+from sugar3.activity import activity
+
+import tracing
+from game_map import GameMap
+
+MAIN_MAP = 'main'
+
+# 4 maps of 100 x 100 cells
+MAX_LOADED_CELLS = 40000
+
+
+def get_maps_path():
+    return os.path.join(activity.get_activity_root(), 'instance', 'maps')
+
+
+class GameWorld():
+
+    def __init__(self, model, max_loaded_cells=MAX_LOADED_CELLS):
+        self._model = model
+        self._max_loaded_cells = max_loaded_cells
+        self._loaded_maps = OrderedDict()
+        self._evicted_callbacks = []
+        if not 'maps' in self._model.data:
+            self._model.data['maps'] = []
+        if not 'portals' in self._model.data:
+            self._model.data['portals'] = {}
+
+    def connect_evicted(self, callback):
+        """ callback(map_id, game_map) is called when a map is removed
+            from memory, to remove the caches associated to the map"""
+        self._evicted_callbacks.append(callback)
+
+    def get_map_ids(self):
+        return [MAIN_MAP] + self._model.data['maps']
+
+    def get_map(self, map_id):
+        """ Return the GameMap, loading it if is not in memory"""
+        if map_id in self._loaded_maps:
+            game_map = self._loaded_maps.pop(map_id)
+            self._loaded_maps[map_id] = game_map
+            return game_map
+        if map_id == MAIN_MAP:
+            if self._model.data['map_data'] is None:
+                self._model.data['map_data'] = GameMap().data
+            game_map = GameMap(self._model.data['map_data'])
+        else:
+            if not map_id in self._model.data['maps']:
+                raise KeyError('map %s not found' % map_id)
+            tracing.trace(tracing.SAVE, 'loading map %s', map_id)
+            with tracing.span(tracing.SAVE, 'load_map'), \
+                    open(self._get_map_file_name(map_id), 'r') as map_file:
+                game_map = GameMap(json.load(map_file))
+        self._loaded_maps[map_id] = game_map
+        self._evict()
+        return game_map
+
+    def add_map(self, map_data):
+        """ Add a new map to the world, and return the map id"""
+        map_id = 'map_%d' % (len(self._model.data['maps']) + 1)
+        while map_id in self._model.data['maps']:
+            map_id = map_id + '_'
+        self._model.data['maps'].append(map_id)
+        self._save_map(map_id, map_data)
+        return map_id
+
+    def _get_map_file_name(self, map_id):
+        return os.path.join(get_maps_path(), '%s.json' % map_id)
+
+    @tracing.traced(tracing.SAVE, 'save_map')
+    def _save_map(self, map_id, map_data):
+        maps_path = get_maps_path()
+        if not os.path.exists(maps_path):
+            os.makedirs(maps_path)
+        with open(self._get_map_file_name(map_id), 'w') as map_file:
+            json.dump(map_data, map_file)
+
+    def save(self):
+        """ Save the maps loaded in the instance directory.
+            Return the list of file names of all the maps stored
+            outside of model.data"""
+        for map_id, game_map in self._loaded_maps.items():
+            if map_id != MAIN_MAP:
+                self._save_map(map_id, game_map.data)
+        return [self._get_map_file_name(map_id)
+                for map_id in self._model.data['maps']]
+
+    def _evict(self):
+        loaded_cells = sum(game_map.data['max_x'] * game_map.data['max_y']
+                for game_map in self._loaded_maps.values())
+        # the last map loaded is never removed
+        for map_id in list(self._loaded_maps.keys())[:-1]:
+            if loaded_cells <= self._max_loaded_cells:
+                break
+            if map_id == MAIN_MAP:
+                # is in model.data, nothing to free
+                continue
+            game_map = self._loaded_maps.pop(map_id)
+            self._save_map(map_id, game_map.data)
+            loaded_cells -= game_map.data['max_x'] * game_map.data['max_y']
+            logging.debug('map %s removed from memory', map_id)
+            for callback in self._evicted_callbacks:
+                callback(map_id, game_map)
+
+    def _portal_key(self, map_id, x, y, direction):
+        return '%s:%d:%d:%s' % (map_id, x, y, direction)
+
+    def set_portal(self, map_id, x, y, direction, to_map_id, to_x, to_y,
+            to_direction):
+        """ Connect the door in the position x, y, direction in the map
+            map_id, with the position to_x, to_y, to_direction
+            in the map to_map_id"""
+        key = self._portal_key(map_id, x, y, direction)
+        self._model.data['portals'][key] = {'map': to_map_id,
+                'x': to_x, 'y': to_y, 'direction': to_direction}
+
+    def get_portal(self, map_id, x, y, direction):
+        key = self._portal_key(map_id, x, y, direction)
+        return self._model.data['portals'].get(key)
+
+    def cross_door(self, map_id, x, y, direction):
+        """ Return the map id and the position if the user cross the door,
+            the door can go to a position in another map"""
+        game_map = self.get_map(map_id)
+        portal = self.get_portal(map_id, x, y, direction)
+        if portal is not None and game_map.have_door(x, y, direction):
+            return portal['map'], portal['x'], portal['y'], \
+                    portal['direction']
+        new_x, new_y, new_direction = game_map.cross_door(x, y, direction)
+        return map_id, new_x, new_y, new_direction